@@ -0,0 +1,114 @@
+import json
+import os
+import sys
+from multiprocessing import get_all_start_methods, get_context
+import numpy as np
+
+# Set in the parent before the pool forks, so workers share the loaded graph
+# and partition copy-on-write instead of reloading or unpickling them. The
+# workers' copies are thrown away, so handlers must treat the state as
+# read-only; changes belong in the record step, which runs in the parent.
+batch_state = None
+batch_handler = None
+
+
+def read_jobs(stream, key):
+    # One job per line: a JSON object ({"<key>": ..., "message": ...}) or a
+    # tab separated "<key>\t<message>" pair. Blank and '#' lines are skipped.
+    for line in stream:
+        line = line.rstrip('\r\n')
+        if not line.strip() or line.startswith('#'):
+            continue
+        if line.lstrip().startswith('{'):
+            job = json.loads(line)
+        else:
+            target, _, message = line.partition('\t')
+            job = {key: target.strip(), "message": message}
+        job.setdefault("message", "")
+        yield job
+
+
+def to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (np.ndarray, set)):
+        return sorted(value.tolist() if isinstance(value, np.ndarray) else value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def init_worker(state, handler):
+    global batch_state, batch_handler
+    batch_state = state
+    batch_handler = handler
+
+
+def run_job(numbered_job):
+    # The handler gets the job's input position, e.g. to key its random stream
+    index, job = numbered_job
+    try:
+        result = batch_handler(batch_state, job, index)
+    except Exception as error:
+        result = {"error": f"{type(error).__name__}: {error}"}
+    return index, job, result
+
+
+def record_results(state, record, numbered_results):
+    # Applies each job's changes to the parent's state in input order, as a
+    # serial run would, so results do not depend on the worker count
+    for index, job, result in numbered_results:
+        if record is not None and "error" not in result:
+            try:
+                result = record(state, job, index, result)
+            except Exception as error:
+                result = {"error": f"{type(error).__name__}: {error}"}
+        yield {**job, **result}
+
+
+def open_stream(path, mode):
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    return open(path, mode)
+
+
+def run_batch(state, handler, record, input_path, output_path, key, workers=None, chunksize=16):
+    # handler(state, job, index) computes a job's result from the read-only
+    # state; record(state, job, index, result), when given, then runs in the
+    # parent in input order and returns the final result, e.g. after logging
+    # the job's message. Results are written as JSON lines in input order.
+    # With fork the pool inherits `state`; elsewhere it is pickled once per
+    # worker.
+    global batch_state, batch_handler
+    batch_state = state
+    batch_handler = handler
+    workers = workers or os.cpu_count() or 1
+
+    source = open_stream(input_path, 'r')
+    sink = open_stream(output_path, 'w')
+    try:
+        jobs = enumerate(read_jobs(source, key))
+        if workers == 1:
+            write_results(record_results(state, record, map(run_job, jobs)), sink)
+        else:
+            if 'fork' in get_all_start_methods():
+                pool = get_context('fork').Pool(workers)
+            else:
+                pool = get_context().Pool(workers, initializer=init_worker, initargs=(state, handler))
+            with pool:
+                write_results(record_results(state, record, pool.imap(run_job, jobs, chunksize)), sink)
+    finally:
+        # Do not keep the state (and any snapshot it maps) alive past the batch
+        batch_state = batch_handler = None
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+        else:
+            sink.flush()
+
+
+def write_results(results, sink):
+    count = 0
+    for result in results:
+        sink.write(json.dumps(result, default=to_json) + "\n")
+        count += 1
+    return count
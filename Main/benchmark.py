@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from queue import Empty
+import numpy as np
+from messdynmic import LouvainCommunityDetection
+from edgeloader import count_nodes
+from egonet import generate_ego_networks
+
+STAGES = ["load_graph", "detect_communities", "calculate_modularity", "propagate_message",
+          "get_node_info", "calculate_potential_impact"]
+
+
+def barabasi_albert_edges(num_nodes, edges_per_node, rng):
+    # Batagelj-Brandes: edge e copies a uniformly chosen earlier endpoint. An
+    # odd (target) position points at another copy, so the choices are resolved
+    # together by pointer jumping instead of a Python loop.
+    m = edges_per_node
+    num_edges = (num_nodes - 1) * m
+    edge = np.arange(num_edges)
+    source = edge // m + 1
+    choice = (rng.random(num_edges) * (2 * edge + 1)).astype(np.int64)
+    pointer = choice.copy()
+    unresolved = pointer % 2 == 1
+    while unresolved.any():
+        pointer[unresolved] = choice[pointer[unresolved] // 2]
+        unresolved = pointer % 2 == 1
+    # Even position 2e holds the source of edge e
+    target = source[pointer // 2]
+    keep = source != target
+    return source[keep], target[keep]
+
+
+def lfr_like_edges(num_nodes, average_degree, mixing, rng, degree_exponent=2.5, community_exponent=1.5):
+    # LFR-style benchmark: power-law degrees and community sizes; a fraction
+    # `mixing` of every node's stubs is wired across communities, the rest inside.
+    degrees = np.minimum((rng.pareto(degree_exponent - 1, num_nodes) + 1) * average_degree / 2, num_nodes ** 0.5)
+    degrees = np.maximum(degrees.astype(np.int64), 1)
+    sizes = []
+    remaining = num_nodes
+    while remaining > 0:
+        size = int(min(remaining, max(10, (rng.pareto(community_exponent - 1) + 1) * 20)))
+        sizes.append(size)
+        remaining -= size
+    community = np.repeat(np.arange(len(sizes)), sizes)
+
+    external = rng.binomial(degrees, mixing)
+    internal = degrees - external
+
+    def pair_stubs(stubs, groups):
+        # Random matching of stubs inside each group
+        order = np.lexsort((rng.random(len(stubs)), groups))
+        stubs, groups = stubs[order], groups[order]
+        same = groups[:-1:2] == groups[1::2]
+        return stubs[:-1:2][same], stubs[1::2][same]
+
+    inside = np.repeat(np.arange(num_nodes), internal)
+    outside = np.repeat(np.arange(num_nodes), external)
+    a, b = pair_stubs(inside, community[inside])
+    c, d = pair_stubs(outside, np.zeros(len(outside), dtype=np.int64))
+    sources = np.concatenate([a, c])
+    targets = np.concatenate([b, d])
+    keep = sources != targets
+    return sources[keep], targets[keep]
+
+
+def rmat_edges(scale, num_edges, rng, probabilities=(0.57, 0.19, 0.19, 0.05)):
+    # R-MAT / Kronecker generator used for the SNAP-like (skewed, sparse) graphs
+    a, b, c, _ = probabilities
+    sources = np.zeros(num_edges, dtype=np.int64)
+    targets = np.zeros(num_edges, dtype=np.int64)
+    for bit in range(scale):
+        r = rng.random(num_edges)
+        right = (r >= a) & (r < a + b) | (r >= a + b + c)
+        down = r >= a + b
+        sources |= down.astype(np.int64) << bit
+        targets |= right.astype(np.int64) << bit
+    keep = sources != targets
+    return sources[keep], targets[keep]
+
+
+def generate_graph(kind, num_edges, rng):
+    if kind == "ba":
+        return barabasi_albert_edges(max(num_edges // 5, 10), 5, rng)
+    if kind == "lfr":
+        return lfr_like_edges(max(num_edges // 5, 20), 10, 0.2, rng)
+    if kind == "snap":
+        scale = max(int(np.ceil(np.log2(max(num_edges // 8, 2)))), 4)
+        return rmat_edges(scale, num_edges, rng)
+    if kind == "ego":
+        # About 900 edges per ego with the default follower/following ranges
+        networks = generate_ego_networks(max(num_edges // 900, 1), rng)
+        return networks.sources, networks.targets
+    raise ValueError(f"unknown graph kind: {kind}")
+
+
+def write_edge_list(path, sources, targets, kind):
+    with open(path, 'w') as file:
+        file.write(f"# Synthetic {kind} graph\n")
+        file.write(f"# Nodes: {count_nodes(np.stack([sources, targets], axis=1))} Edges: {len(sources)}\n")
+        file.write("# FromNodeId\tToNodeId\n")
+        np.savetxt(file, np.stack([sources, targets], axis=1), fmt="%d", delimiter="\t")
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(kind, num_edges, stages, queries, seed, queue):
+    # Runs in a fresh process so peak RSS belongs to this case only. Always
+    # puts one list on the queue: the stages that finished, plus an error
+    # record if the case raised.
+    results = []
+    try:
+        time_stages(kind, num_edges, stages, queries, seed, results)
+    except Exception as error:
+        results.append(error_record(kind, num_edges, f"{type(error).__name__}: {error}"))
+    finally:
+        queue.put([result for result in results if result["stage"] in stages or "error" in result])
+
+
+def error_record(kind, num_edges, error):
+    return {"graph": kind, "target_edges": num_edges, "stage": "run_case", "error": error}
+
+
+def collect_case(process, queue, kind, num_edges, poll=1.0):
+    # Waits for run_case's results; a child that dies without reporting (e.g.
+    # killed for running out of memory) gives an error record instead of a hang
+    while True:
+        try:
+            return queue.get(timeout=poll)
+        except Empty:
+            if process.is_alive():
+                continue
+        try:
+            return queue.get(timeout=poll)
+        except Empty:
+            return [error_record(kind, num_edges, f"process exited with code {process.exitcode} without results")]
+
+
+def time_stages(kind, num_edges, stages, queries, seed, results):
+    # RSS is the high-water mark of the case so far, recorded after each stage
+    rng = np.random.default_rng(seed)
+    sources, targets = generate_graph(kind, num_edges, rng)
+    edges = len(sources)
+
+    def record(stage, elapsed, operations):
+        results.append({
+            "graph": kind, "target_edges": num_edges, "edges": edges, "nodes": nodes,
+            "stage": stage, "wall_time": elapsed, "peak_rss_mb": peak_rss_mb(),
+            "throughput": operations / elapsed if elapsed > 0 else None,
+        })
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"{kind}_{num_edges}.txt")
+        write_edge_list(path, sources, targets, kind)
+        nodes = count_nodes(np.stack([sources, targets], axis=1))
+
+        lcd = LouvainCommunityDetection(graph_size=nodes, seed=seed)
+        start = time.perf_counter()
+        lcd.load_graph(path, backend="csr")
+        record("load_graph", time.perf_counter() - start, edges)
+
+    sample = rng.choice(lcd.graph.get_nodes(), min(queries, len(lcd.graph.get_nodes())), replace=False)
+    # Queries take node ids as they appear in the edge list
+    sample = lcd.node_ids.to_ids(sample)
+
+    if "detect_communities" in stages or "get_node_info" in stages:
+        start = time.perf_counter()
+        lcd.detect_communities()
+        record("detect_communities", time.perf_counter() - start, edges)
+
+    if "calculate_modularity" in stages:
+        start = time.perf_counter()
+        lcd.calculate_modularity()
+        record("calculate_modularity", time.perf_counter() - start, edges)
+
+    if "propagate_message" in stages:
+        start = time.perf_counter()
+        for node in sample.tolist():
+            lcd.propagate_message(lcd.messages.add("benchmark", node))
+        record("propagate_message", time.perf_counter() - start, len(sample))
+
+    if "get_node_info" in stages:
+        start = time.perf_counter()
+        for node in sample.tolist():
+            lcd.get_node_info(node)
+        record("get_node_info", time.perf_counter() - start, len(sample))
+
+    if "calculate_potential_impact" in stages:
+        try:
+            import networkx as nx
+            from messapi import MisinformationAnalyzer
+            analyzer = MisinformationAnalyzer()
+        except Exception as error:
+            results.append({"graph": kind, "target_edges": num_edges, "edges": edges, "nodes": nodes,
+                            "stage": "calculate_potential_impact", "skipped": str(error)})
+        else:
+            analyzer.graph = nx.DiGraph()
+            analyzer.graph.add_edges_from(zip(sources.tolist(), targets.tolist()))
+            start = time.perf_counter()
+            for node in sample.tolist():
+                analyzer.calculate_potential_impact(node)
+            record("calculate_potential_impact", time.perf_counter() - start, len(sample))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def scaling_report(results):
+    # One curve per (graph, stage); "cliff" marks a step where time grew more
+    # than twice as fast as the edge count
+    lines = []
+    curves = {}
+    for result in results:
+        if "wall_time" in result:
+            curves.setdefault((result["graph"], result["stage"]), []).append(result)
+    for (kind, stage), points in sorted(curves.items()):
+        points.sort(key=lambda point: point["edges"])
+        lines.append(f"\n{kind} / {stage}")
+        lines.append(f"{'edges':>12} {'time (s)':>12} {'throughput':>14} {'peak RSS (MB)':>14}")
+        previous = None
+        for point in points:
+            note = ""
+            if previous and previous["wall_time"] > 0 and previous["edges"] > 0:
+                growth = (point["wall_time"] / previous["wall_time"]) / (point["edges"] / previous["edges"])
+                if growth > 2:
+                    note = f"  <- cliff ({growth:.1f}x worse than linear)"
+            throughput = f"{point['throughput']:.1f}" if point["throughput"] else "-"
+            lines.append(f"{point['edges']:>12} {point['wall_time']:>12.4f} {throughput:>14} "
+                         f"{point['peak_rss_mb']:>14.1f}{note}")
+            previous = point
+    return "\n".join(lines)
+
+
+def compare_report(baseline, current):
+    lines = [f"\n{'graph':<6} {'stage':<28} {'edges':>10} {'baseline (s)':>13} {'current (s)':>12} {'ratio':>7}"]
+    old = {(r["graph"], r["stage"], r["target_edges"]): r for r in baseline["results"] if "wall_time" in r}
+    for result in current["results"]:
+        key = (result["graph"], result["stage"], result["target_edges"])
+        if "wall_time" not in result or key not in old:
+            continue
+        ratio = result["wall_time"] / old[key]["wall_time"] if old[key]["wall_time"] > 0 else float("inf")
+        flag = "  REGRESSION" if ratio > 1.2 else ""
+        lines.append(f"{key[0]:<6} {key[1]:<28} {key[2]:>10} {old[key]['wall_time']:>13.4f} "
+                     f"{result['wall_time']:>12.4f} {ratio:>7.2f}{flag}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading, Louvain, propagation and impact on synthetic graphs")
+    parser.add_argument("--graphs", nargs="+", choices=["lfr", "ba", "snap", "ego"], default=["lfr", "ba", "snap"], help="Synthetic graph families")
+    parser.add_argument("--min-edges", type=int, default=10 ** 3, help="Smallest graph size in edges")
+    parser.add_argument("--max-edges", type=int, default=10 ** 5, help="Largest graph size in edges (up to 10^7)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to time")
+    parser.add_argument("--queries", type=int, default=100, help="Nodes sampled for per-node stages")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for graph generation and node sampling")
+    parser.add_argument("--output", type=str, default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--report", type=str, default=None, help="Print the scaling report of an existing JSON and exit")
+    args = parser.parse_args()
+
+    if args.report:
+        with open(args.report) as file:
+            print(scaling_report(json.load(file)["results"]))
+        return
+
+    sizes = []
+    size = args.min_edges
+    while size <= args.max_edges:
+        sizes.append(size)
+        size *= 10
+
+    results = []
+    context = get_context("fork") if sys.platform != "win32" else get_context()
+    for kind in args.graphs:
+        for num_edges in sizes:
+            print(f"Running {kind} with ~{num_edges} edges...")
+            queue = context.Queue()
+            process = context.Process(target=run_case, args=(kind, num_edges, args.stages, args.queries, args.seed, queue))
+            process.start()
+            case_results = collect_case(process, queue, kind, num_edges)
+            process.join()
+            for result in case_results:
+                if "error" in result:
+                    print(f"  {kind} with ~{num_edges} edges failed: {result['error']}")
+            results.extend(case_results)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    print(scaling_report(results))
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            print(compare_report(json.load(file), report))
+
+
+if __name__ == "__main__":
+    main()
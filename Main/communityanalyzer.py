@@ -0,0 +1,508 @@
+import hashlib
+import os
+import re
+from collections import defaultdict, deque, OrderedDict
+import numpy as np
+from csrgraph import CSRGraph, connected_components, k_hop_neighborhood
+from louvain import Louvain, ParallelLouvain, ModularityTracker
+from cascade import simulate_cascades
+from containment import ContainmentModel, bridge_edges
+from influence import find_superspreaders
+from probabilities import propagation_factors, read_node_attributes, edge_probabilities
+from edgeloader import load_indexed_edges, source_signature
+from nodeids import NodeIdMap
+from rngstreams import RandomStreams, DEFAULT_STREAM, MESSAGE_STREAM, JOB_STREAM, CONTAINMENT_STREAM
+from snapshot import save_snapshot, load_snapshot
+from messagestore import MessageStore
+
+MISINFO_PATTERN = re.compile(r'\b(fake|hoax|conspiracy)\b')
+
+DEFAULT_MESSAGE = "Sample message from target node"
+
+
+def next_graph_version(version, *changes):
+    # Content key of a graph for caches that outlive the process (layouts):
+    # the source file's signature, with every later batch of changes chained on
+    digest = hashlib.blake2b(str(version).encode(), digest_size=16)
+    for change in changes:
+        digest.update(change.encode() if isinstance(change, str) else np.ascontiguousarray(change, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+class Graph:
+    def __init__(self):
+        self.adjacency_list = defaultdict(list)
+        self.node_degrees = defaultdict(float)
+        self.total_edges = 0
+
+    def add_edge(self, from_node, to_node):
+        self.adjacency_list[from_node].append(to_node)
+        self.adjacency_list[to_node].append(from_node)
+        self.node_degrees[from_node] += 1
+        self.node_degrees[to_node] += 1
+        self.total_edges += 1
+
+    def remove_edge(self, from_node, to_node):
+        # Removes one copy of the edge; raises ValueError if there is none
+        if to_node not in self.adjacency_list.get(from_node, ()):
+            raise ValueError(f"no edge between {from_node} and {to_node}")
+        self.adjacency_list[from_node].remove(to_node)
+        self.adjacency_list[to_node].remove(from_node)
+        self.node_degrees[from_node] -= 1
+        self.node_degrees[to_node] -= 1
+        self.total_edges -= 1
+
+    def get_neighbors(self, node):
+        return self.adjacency_list[node]
+
+    def get_degree(self, node):
+        return self.node_degrees[node]
+
+    def get_total_edges(self):
+        return self.total_edges
+
+    def get_nodes(self):
+        return list(self.adjacency_list.keys())
+
+
+class CommunityAnalyzer:
+    # What mess2.LouvainCommunityDetection and messdynmic.LouvainCommunityDetection
+    # share: graph loading, Louvain detection, cached node queries, snapshots,
+    # share probabilities, propagation, containment and message impact. The
+    # scripts subclass it and differ only in how they derive the parameters
+    # below (messdynmic scales them with the graph size) and in their extras.
+    # Parameters saved in snapshots and restored by load_snapshot
+    SNAPSHOT_PARAMETERS = ('share_probability', 'shared_threshold', 'viral_threshold', 'misinformation_spread_threshold',
+                           'node_attributes')
+
+    def __init__(self, seed=None, share_probability=0.3, shared_threshold=10, viral_threshold=100,
+                 misinformation_spread_threshold=0.1):
+        self.graph = Graph()
+        # External node ids <-> the dense indices every array here is keyed by
+        self.node_ids = NodeIdMap.identity(0)
+        self.communities = []
+        self.community_hierarchy = []
+        self.source_file = None
+        self.modularity = 0
+        self.modularity_tracker = None
+        # Every message and batch job draws from its own stream of self.streams,
+        # so results depend only on the seed, not on call order or worker
+        self.streams = RandomStreams(seed)
+        self.np_rng = self.streams.stream(DEFAULT_STREAM)
+        self.csr_graph = None
+        # See next_graph_version; None when the graph changed some other way
+        self.graph_version = None
+        self.component_labels = None
+        self.component_sizes = None
+        self.component_communities = None
+        self.k_hop_cache = OrderedDict()
+        self.k_hop_cache_size = 4096
+        # Per-node propagation factors (None: every edge uses share_probability)
+        self.influence = None
+        self.susceptibility = None
+        # Signature of the side file they were read from
+        self.node_attributes = None
+        self.edge_probability_cache = None
+        self.containment_cache = None
+        self.share_probability = share_probability
+        self.shared_threshold = shared_threshold
+        self.viral_threshold = viral_threshold
+        self.misinformation_spread_threshold = misinformation_spread_threshold
+        # Columnar message log with a per-source index
+        self.messages = MessageStore(self.shared_threshold, self.viral_threshold)
+
+    def calculate_modularity(self):
+        # Exact modularity of the current partition from per-community sums.
+        # The sums are built in one pass over the edges and then kept current,
+        # so repeated calls cost O(1) instead of a full adjacency scan.
+        tracker = self.modularity_tracker
+        if tracker is None or tracker.total_weight != 2 * self.graph.get_total_edges():
+            graph = self.get_csr_graph()
+            tracker = ModularityTracker.from_arrays(graph.indptr, graph.indices, None, self.communities)
+            self.modularity_tracker = tracker
+        return tracker.modularity
+
+    def load_graph(self, filename, backend="dict"):
+        # Node ids in the file can be sparse 64-bit ids or names; the graph and
+        # everything derived from it use dense indices from self.node_ids
+        self.source_file = filename
+        # The dict backend adds the edges to whatever graph is already loaded
+        extends = backend != "csr" and self.graph.get_total_edges() > 0
+        edges, self.node_ids = load_indexed_edges(filename)
+        if backend == "csr":
+            self.graph = CSRGraph.from_edges(edges[:, 0], edges[:, 1], len(self.node_ids))
+        else:
+            for from_node, to_node in edges.tolist():
+                self.graph.add_edge(from_node, to_node)
+
+        self.communities = list(range(len(self.node_ids)))
+        self.modularity_tracker = None
+        if not extends or self.graph_version is not None:
+            self.graph_version = next_graph_version(self.graph_version if extends else None, os.path.abspath(filename),
+                                                    repr(sorted(source_signature(filename).items())))
+        self.clear_query_caches()
+
+    def node_index(self, node):
+        # Dense index of an external node id; KeyError if the graph lacks it
+        return self.node_ids.to_index(node)
+
+    def node_id(self, index):
+        return self.node_ids.to_id(index)
+
+    def parse_node(self, text):
+        return self.node_ids.parse(text)
+
+    def get_csr_graph(self):
+        if isinstance(self.graph, CSRGraph):
+            return self.graph
+        # The dict backend can still grow, so rebuild when the edge count changes
+        if self.csr_graph is None or self.csr_graph.get_total_edges() != self.graph.get_total_edges():
+            if self.csr_graph is not None:
+                # Edited in place, past apply_edge_updates
+                self.graph_version = None
+            self.csr_graph = CSRGraph.from_graph(self.graph, len(self.node_ids))
+            self.clear_query_caches()
+        return self.csr_graph
+
+    def clear_query_caches(self):
+        self.component_labels = None
+        self.component_sizes = None
+        self.component_communities = None
+        self.k_hop_cache.clear()
+
+    def get_component_size(self, node):
+        # node is a dense index, as in get_k_hop_neighbors
+        graph = self.get_csr_graph()
+        if self.component_labels is None:
+            self.component_labels, self.component_sizes = connected_components(graph)
+        return int(self.component_sizes[self.component_labels[node]])
+
+    def get_component_communities(self, node):
+        # Communities with members in node's connected component. The distinct
+        # (component, community) pairs are found once per graph and partition,
+        # sorted by component, so a query is a slice of them.
+        self.get_component_size(node)
+        if self.component_communities is None:
+            labels = self.component_labels
+            communities = np.asarray(self.communities, dtype=np.int64)[:len(labels)]
+            width = int(communities.max()) + 1 if len(communities) else 1
+            self.component_communities = (np.unique(labels * width + communities), width)
+        pairs, width = self.component_communities
+        label = int(self.component_labels[node])
+        start, end = np.searchsorted(pairs, [label * width, (label + 1) * width])
+        return set((pairs[start:end] % width).tolist())
+
+    def get_k_hop_neighbors(self, node, radius=1):
+        graph = self.get_csr_graph()
+        key = (node, radius)
+        if key in self.k_hop_cache:
+            self.k_hop_cache.move_to_end(key)
+            return self.k_hop_cache[key]
+        neighbors = k_hop_neighborhood(graph, node, radius)
+        self.k_hop_cache[key] = neighbors
+        if len(self.k_hop_cache) > self.k_hop_cache_size:
+            self.k_hop_cache.popitem(last=False)
+        return neighbors
+
+    def detect_communities(self, use_parallel=False, workers=None):
+        # Full multi-level Louvain: local moving plus community aggregation,
+        # repeated until modularity stops improving
+        if use_parallel:
+            louvain = ParallelLouvain.from_graph(self.get_csr_graph(), workers=workers)
+        else:
+            louvain = Louvain.from_graph(self.get_csr_graph())
+        self.community_hierarchy = louvain.run()
+        self.communities = louvain.communities.tolist()
+        self.modularity = louvain.modularity
+        self.modularity_tracker = None
+        self.component_communities = None
+
+        unique_communities = set(self.communities[node] for node in self.graph.get_nodes())
+        return len(unique_communities)
+
+    def save_snapshot(self, path):
+        # CSR graph, partition and hierarchy as arrays; derived parameters and
+        # the message log in the manifest. Tied to the edge list it came from.
+        graph = self.get_csr_graph()
+        num_nodes = graph.num_nodes
+        arrays = {
+            'indptr': graph.indptr,
+            'indices': graph.indices,
+            'degree': graph.degree,
+            'communities': np.asarray(self.communities, dtype=np.int64),
+            **self.node_ids.arrays(),
+            'community_hierarchy': np.asarray(self.community_hierarchy, dtype=np.int64).reshape(-1, num_nodes),
+        }
+        arrays.update(self.messages.arrays())
+        if self.influence is not None:
+            arrays['influence'] = self.influence
+            arrays['susceptibility'] = self.susceptibility
+        meta = {
+            'source_file': self.source_file,
+            'total_edges': graph.get_total_edges(),
+            'modularity': self.modularity,
+            'graph_version': self.graph_version,
+            **{name: getattr(self, name) for name in self.SNAPSHOT_PARAMETERS},
+            **self.messages.meta(),
+        }
+        save_snapshot(path, arrays, meta, self.source_file)
+
+    def load_snapshot(self, path, source_file=None):
+        # Memory-maps the arrays; refuses snapshots whose edge list has changed
+        arrays, meta = load_snapshot(path, source_file)
+        self.restore_snapshot(arrays, meta, source_file)
+
+    def restore_snapshot(self, arrays, meta, source_file=None):
+        self.graph = CSRGraph(arrays['indptr'], arrays['indices'], arrays['degree'], meta['total_edges'])
+        self.node_ids = NodeIdMap.from_arrays(arrays)
+        self.communities = arrays['communities']
+        self.influence = arrays.get('influence')
+        self.susceptibility = arrays.get('susceptibility')
+        self.edge_probability_cache = None
+        self.community_hierarchy = list(arrays['community_hierarchy'])
+        self.modularity = meta['modularity']
+        self.modularity_tracker = None
+        self.graph_version = meta.get('graph_version')
+        for name in self.SNAPSHOT_PARAMETERS:
+            setattr(self, name, meta[name])
+        self.messages = MessageStore.from_snapshot(arrays, meta, self.shared_threshold, self.viral_threshold)
+        self.source_file = source_file or meta['source_file']
+        self.clear_query_caches()
+
+    def get_modularity(self):
+        return self.modularity
+
+    class NodeInfo:
+        def __init__(self):
+            self.community = 0
+            self.connected_communities = set()
+            self.directly_connected_nodes = []
+            self.k_hop_nodes = []
+            self.component_size = 0
+
+    def get_node_info(self, target_node, radius=1):
+        # Communities and size of the whole connected component come from the
+        # precomputed labels; only k_hop_nodes walks the graph, up to `radius`
+        # hops. target_node and the returned nodes are external ids.
+        index = self.node_index(target_node)
+        info = self.NodeInfo()
+        info.community = self.communities[index]
+        neighbors = np.fromiter(self.graph.get_neighbors(index), dtype=np.int64)
+        info.directly_connected_nodes = self.node_ids.to_ids(neighbors).tolist()
+        k_hop = self.get_k_hop_neighbors(index, radius)
+        info.k_hop_nodes = self.node_ids.to_ids(k_hop)
+        info.connected_communities = self.get_component_communities(index)
+        info.component_size = self.get_component_size(index)
+        return info
+
+    def initiate_message(self, source_node, content):
+        # Stored with the id as a plain Python value, so the log stays JSON-friendly
+        source_node = self.node_id(self.node_index(source_node))
+        message = self.messages.add(content, source_node)
+        affected_nodes = self.propagate_message(message)
+        if self.is_misinformation(content, len(affected_nodes) / len(self.graph.get_nodes())):
+            message.flag_as_misinformation()
+
+    def load_node_attributes(self, filename):
+        # "node followers following" side file -> influence and susceptibility
+        followers, following = read_node_attributes(filename, self.get_csr_graph().num_nodes, self.node_ids)
+        self.influence, self.susceptibility = propagation_factors(followers, following)
+        self.node_attributes = source_signature(filename)
+        self.edge_probability_cache = None
+
+    def get_share_probabilities(self):
+        # share_probability, or per-edge base * influence(u) * susceptibility(v)
+        # aligned with the CSR indices, computed once per graph
+        if self.influence is None:
+            return self.share_probability
+        graph = self.get_csr_graph()
+        cache = self.edge_probability_cache
+        if cache is None or cache[0] is not graph or cache[1] != self.share_probability:
+            probabilities = edge_probabilities(graph.indptr, graph.indices, self.share_probability,
+                                               self.influence, self.susceptibility)
+            self.edge_probability_cache = cache = (graph, self.share_probability, probabilities)
+        return cache[2]
+
+    def propagate_message(self, message, start_node=-1, rng=None):
+        # start_node and the returned set are external node ids
+        if start_node == -1:
+            start_node = message.get_source_node()
+        start_node = self.node_index(start_node)
+        if rng is None:
+            rng = self.streams.stream(MESSAGE_STREAM, message.get_id())
+
+        graph = self.get_csr_graph()
+        indptr = graph.indptr
+        indices = graph.indices
+        probabilities = self.get_share_probabilities()
+        per_edge = np.ndim(probabilities) > 0
+
+        nodes_to_process = deque([start_node])
+        affected_nodes = set([start_node])
+        shares = 0
+
+        while nodes_to_process:
+            current_node = nodes_to_process.popleft()
+            start, end = indptr[current_node], indptr[current_node + 1]
+            # One draw and one comparison per edge, against that edge's probability
+            threshold = probabilities[start:end] if per_edge else probabilities
+            shared = indices[start:end][rng.random(end - start) < threshold]
+            for neighbor in shared.tolist():
+                if neighbor not in affected_nodes:
+                    shares += 1
+                    nodes_to_process.append(neighbor)
+                    affected_nodes.add(neighbor)
+
+        # One FSM update for the whole cascade
+        self.messages.add_shares([message.get_id()], shares)
+        return set(self.node_ids.to_ids(np.fromiter(affected_nodes, dtype=np.int64)).tolist())
+
+    def estimate_message_reach(self, source_node, num_trials=1000, rng=None):
+        # Batched Monte Carlo over the CSR adjacency instead of a single BFS trial
+        return simulate_cascades(self.get_csr_graph(), self.node_index(source_node), self.get_share_probabilities(), num_trials,
+                                 rng if rng is not None else self.np_rng)
+
+    def find_superspreaders(self, k, num_samples=10000):
+        # Top-k seed set for expected reach under the share probabilities, via
+        # reverse-reachable set sampling; returns (seed ids, estimated reach)
+        seeds, reach = find_superspreaders(self.get_csr_graph(), k, self.get_share_probabilities(), num_samples, rng=self.np_rng)
+        return self.node_ids.to_ids(seeds), reach
+
+    def get_containment_model(self, sources=None, num_trials=1000):
+        # Coupled what-if cascades from the given source node(s), or from one
+        # random node per trial. Kept while the graph, probabilities and
+        # sources stay the same, so the baseline is simulated once.
+        graph = self.get_csr_graph()
+        probabilities = self.get_share_probabilities()
+        sources = None if sources is None else np.atleast_1d(self.node_ids.to_index(np.atleast_1d(sources)))
+        key = (None if sources is None else tuple(sources.tolist()), num_trials)
+        cache = self.containment_cache
+        if cache is None or cache[0] is not graph or cache[1] is not probabilities or cache[2] != key:
+            # One stream for every model, so what-ifs replay the same draws
+            seed = int(self.streams.stream(CONTAINMENT_STREAM).integers(2 ** 63))
+            model = ContainmentModel(graph, probabilities, sources, num_trials, seed)
+            self.containment_cache = cache = (graph, probabilities, key, model)
+        return cache[3]
+
+    def simulate_containment(self, blocked_nodes=(), blocked_edges=(), sources=None, num_trials=1000):
+        # Expected reach with the given nodes suspended and (u, v) edges cut,
+        # against the same trials without them
+        model = self.get_containment_model(sources, num_trials)
+        nodes = self.node_ids.to_index(np.asarray(list(blocked_nodes))) if len(blocked_nodes) else ()
+        edges = self.node_ids.to_index(np.asarray(list(blocked_edges)).reshape(-1, 2)) if len(blocked_edges) else None
+        baseline, contained = model.evaluate(nodes, edges)
+        quantiles = contained.quantiles((0.05, 0.5, 0.95))
+        return {
+            'baseline_reach': baseline.mean(),
+            'contained_reach': contained.mean(),
+            'reach_reduction': baseline.mean() - contained.mean(),
+            'relative_reduction': 1 - contained.mean() / baseline.mean() if baseline.mean() else 0.0,
+            'contained_reach_quantiles': {str(q): value for q, value in quantiles.items()},
+        }
+
+    def rank_containment_blockers(self, k=10, candidates="bridges", sources=None, num_trials=1000):
+        # Greedy top-k blockers by marginal reach reduction. Candidates are
+        # "bridges" (edges between Louvain communities) or "nodes" (every node
+        # but the sources).
+        model = self.get_containment_model(sources, num_trials)
+        graph = model.graph
+        if candidates == "bridges":
+            edges = np.column_stack(bridge_edges(graph, self.communities))
+            picks = model.rank_blockers(k, edges=edges)
+            blockers = [{'edge': tuple(self.node_ids.to_ids(edges[index]).tolist())} for index, _, _ in picks]
+        elif candidates == "nodes":
+            nodes = graph.get_nodes()
+            if sources is not None:
+                nodes = nodes[~np.isin(nodes, model.sources[0])]
+            picks = model.rank_blockers(k, nodes=nodes)
+            blockers = [{'node': self.node_id(nodes[index])} for index, _, _ in picks]
+        else:
+            raise ValueError(f"unknown candidates {candidates!r}; expected 'bridges' or 'nodes'")
+        for blocker, (_, reduction, reach_after) in zip(blockers, picks):
+            blocker.update(reach_reduction=reduction, reach_after=reach_after)
+        return blockers
+
+    def should_share_message(self):
+        return self.np_rng.random() < self.share_probability
+
+    def is_misinformation(self, content, spread_percentage):
+        return bool(MISINFO_PATTERN.search(content)) or spread_percentage > self.misinformation_spread_threshold
+
+    def simulate_message_impact(self, target_node, message_content="", num_trials=1000, rng=None):
+        # The propagation half of analyze_message_impact. It only reads the
+        # graph, so batch and service workers run it; the message itself is
+        # logged by record_message_impact, in the parent process.
+        content = message_content if message_content else DEFAULT_MESSAGE
+        if rng is None:
+            # The stream of the id the message gets when it is logged next
+            rng = self.streams.stream(MESSAGE_STREAM, len(self.messages))
+
+        reach = self.estimate_message_reach(target_node, num_trials, rng)
+        expected_reach = reach.mean()
+        spread_percentage = expected_reach / len(self.graph.get_nodes())
+        quantiles = reach.quantiles((0.05, 0.5, 0.95))
+        return {
+            'affected_nodes': expected_reach,
+            'affected_nodes_std': reach.std(),
+            'affected_nodes_quantiles': {str(q): value for q, value in quantiles.items()},
+            'spread_percentage': spread_percentage,
+            'flagged': self.is_misinformation(content, spread_percentage),
+        }
+
+    def record_message_impact(self, target_node, message_content, impact):
+        # Logs an analysed message with its expected share count and flag;
+        # returns whether the target node now has flagged messages
+        content = message_content if message_content else DEFAULT_MESSAGE
+        target_node = self.node_id(self.node_index(target_node))
+        message = self.messages.add(content, target_node)
+        # Everyone reached besides the source shared it, on average
+        message.set_share_count(max(int(round(impact['affected_nodes'])) - 1, 0))
+        if impact['flagged']:
+            message.flag_as_misinformation()
+        return self.messages.has_flagged(target_node)
+
+    def analyze_message_impact(self, target_node, message_content="", num_trials=1000, verbose=True, rng=None):
+        target_node = self.node_id(self.node_index(target_node))
+        impact = self.simulate_message_impact(target_node, message_content, num_trials, rng)
+        impact['has_flagged_messages'] = self.record_message_impact(target_node, message_content, impact)
+
+        if verbose:
+            quantiles = impact['affected_nodes_quantiles']
+            spread_percentage = impact['spread_percentage']
+            print(f"Message from target node {target_node}:")
+            print(f"Content: {message_content if message_content else DEFAULT_MESSAGE}")
+            print(f"Affected nodes (mean of {num_trials} trials): {impact['affected_nodes']:.2f} (std {impact['affected_nodes_std']:.2f})")
+            print(f"Affected nodes 5%/50%/95% quantiles: {quantiles['0.05']:.0f} / {quantiles['0.5']:.0f} / {quantiles['0.95']:.0f}")
+            print(f"Spread percentage: {spread_percentage * 100:.2f}%")
+
+            if impact['flagged']:
+                print("This message has been flagged as potential misinformation.")
+            else:
+                print("This message has not been flagged as misinformation.")
+
+            print(f"Target node {'has' if impact['has_flagged_messages'] else 'does not have'} flagged misinformation messages.")
+
+        return impact
+
+
+def batch_job(lcd, job, index):
+    # Runs in a worker and leaves lcd unchanged; record_batch_job logs the
+    # message in the parent
+    target_node = lcd.parse_node(job["node"])
+    # Keyed by input line, so results do not depend on which worker ran the job
+    rng = lcd.streams.stream(JOB_STREAM, index)
+    impact = lcd.simulate_message_impact(target_node, job["message"], rng=rng)
+    node_info = lcd.get_node_info(target_node)
+    impact.update({
+        'community': node_info.community,
+        'connected_communities': len(node_info.connected_communities),
+        'directly_connected_nodes': len(node_info.directly_connected_nodes),
+        'component_size': node_info.component_size
+    })
+    return impact
+
+
+def record_batch_job(lcd, job, index, result):
+    # In the parent, in input order, exactly as a serial run would log it
+    result['has_flagged_messages'] = lcd.record_message_impact(lcd.parse_node(job["node"]), job["message"], result)
+    return result
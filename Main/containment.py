@@ -0,0 +1,299 @@
+import numpy as np
+from cascade import MAX_BATCH_CELLS, CascadeResult, expand_frontier
+from reach import splitmix64
+
+UINT64_MASK = (1 << 64) - 1
+
+
+def sorted_unique(values):
+    values = np.sort(values)
+    if len(values) < 2:
+        return values
+    return values[np.r_[True, values[1:] != values[:-1]]]
+
+
+def coupled_uniforms(key, trials, edge_pos, num_edges):
+    # The draw for (trial, edge) is a hash of both rather than the next value
+    # of a generator, so every intervention replays the same live edges and
+    # only the blocked ones change: reach can only go down, trial by trial
+    x = (trials.astype(np.uint64) * np.uint64(num_edges) + edge_pos.astype(np.uint64)) ^ np.uint64(key)
+    return (splitmix64(x) >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def edge_positions(graph, sources, targets):
+    # CSR positions of every copy of sources[i] -> targets[i]; returns
+    # (pair index, position) arrays
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    positions, counts = expand_frontier(graph.indptr, graph.indices, sources)
+    pairs = np.repeat(np.arange(len(sources)), counts)
+    match = graph.indices[positions] == targets[pairs]
+    return pairs[match], positions[match]
+
+
+def undirected_edge_positions(graph, sources, targets):
+    # Positions of both directions of each undirected edge: edge i has
+    # positions[ptr[i]:ptr[i + 1]]
+    forward_pairs, forward = edge_positions(graph, sources, targets)
+    reverse_pairs, reverse = edge_positions(graph, targets, sources)
+    pairs = np.concatenate([forward_pairs, reverse_pairs])
+    order = np.argsort(pairs, kind='stable')
+    ptr = np.zeros(len(np.atleast_1d(sources)) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs, minlength=len(ptr) - 1), out=ptr[1:])
+    return ptr, np.concatenate([forward, reverse])[order]
+
+
+def bridge_edges(graph, communities):
+    # Undirected edges between different communities, once each as (u, v)
+    # with u < v
+    indptr = graph.indptr
+    n = len(indptr) - 1
+    communities = np.asarray(communities, dtype=np.int64)
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    cols = graph.indices
+    bridge = (rows < cols) & (communities[rows] != communities[cols])
+    keys = sorted_unique(rows[bridge] * n + cols[bridge])
+    return keys // n, keys % n
+
+
+class InfectionTree:
+    # Who infected whom: entry i is the infection of nodes[i] in trials[i]
+    # through CSR edge edges[i] (-1 for seeds), and sizes[i] counts the
+    # infections in its subtree, itself included. Anyone cut off by blocking a
+    # node or an edge sits in that node's or edge's subtree, so subtree sizes
+    # bound a blocker's reach reduction on the same coupled trials.
+    def __init__(self, trials, nodes, edges, sizes):
+        self.trials = trials
+        self.nodes = nodes
+        self.edges = edges
+        self.sizes = sizes
+
+    @classmethod
+    def from_rounds(cls, rounds, trial_ids, num_nodes):
+        # rounds[i] = (infected flat ids, parent flat ids, edges) of BFS round
+        # i; subtree sizes are summed bottom-up, one round at a time
+        flats = np.concatenate([infected for infected, _, _ in rounds])
+        offsets = np.cumsum([0] + [len(infected) for infected, _, _ in rounds])
+        order = np.argsort(flats, kind='stable')
+        sorted_flats = flats[order]
+        sizes = np.ones(len(flats), dtype=np.int64)
+        for i in range(len(rounds) - 1, 0, -1):
+            parents = order[np.searchsorted(sorted_flats, rounds[i][1])]
+            np.add.at(sizes, parents, sizes[offsets[i]:offsets[i + 1]])
+        edges = np.concatenate([edges for _, _, edges in rounds])
+        return cls(trial_ids[flats // num_nodes], flats % num_nodes, edges, sizes)
+
+    @classmethod
+    def concatenate(cls, trees):
+        return cls(*(np.concatenate([getattr(tree, name) for tree in trees])
+                     for name in ('trials', 'nodes', 'edges', 'sizes')))
+
+    def without_trials(self, trials, num_trials):
+        dropped = np.zeros(num_trials, dtype=bool)
+        dropped[trials] = True
+        keep = ~dropped[self.trials]
+        return InfectionTree(self.trials[keep], self.nodes[keep], self.edges[keep], self.sizes[keep])
+
+    def edge_keys(self, indptr, num_nodes):
+        # Undirected key min(u, v) * n + max(u, v) of the edge behind each
+        # entry (-1 for seeds); the infected node is the edge's target
+        rows = np.searchsorted(indptr, self.edges, side='right') - 1
+        keys = np.minimum(rows, self.nodes) * num_nodes + np.maximum(rows, self.nodes)
+        return np.where(self.edges >= 0, keys, -1)
+
+    def candidate_bounds(self, values, sorted_keys, candidates):
+        # Candidate candidates[i] has key sorted_keys[i] (keys are distinct).
+        # Each entry is matched by its value (node or edge key) against the
+        # keys, so the cost follows the tree rather than the number of
+        # candidates. Returns every candidate's total subtree size, and the
+        # candidate and trial of every matching entry, sorted by candidate.
+        if not len(sorted_keys):
+            return np.zeros(0), candidates, self.trials[:0]
+        positions = np.minimum(np.searchsorted(sorted_keys, values), len(sorted_keys) - 1)
+        matched = np.flatnonzero(sorted_keys[positions] == values)
+        groups = candidates[positions[matched]]
+        order = np.argsort(groups, kind='stable')
+        entries, groups = matched[order], groups[order]
+        bounds = np.bincount(groups, weights=self.sizes[entries], minlength=len(sorted_keys))
+        return bounds, groups, self.trials[entries]
+
+
+class ContainmentModel:
+    # What-if containment on an unchanged CSR graph. Blocked nodes and edges
+    # are boolean masks over the node indices and the CSR positions; cascades
+    # skip masked edges, so nothing is copied. Every run replays the same
+    # coupled draws (coupled_uniforms), so the difference between two runs is
+    # the effect of the intervention alone, not sampling noise.
+    def __init__(self, graph, probability, sources=None, num_trials=1000, key=0, batch_size=None):
+        self.graph = graph
+        self.indptr = graph.indptr
+        self.indices = graph.indices
+        self.num_nodes = len(self.indptr) - 1
+        self.probability = probability
+        self.num_trials = num_trials
+        self.key = key & UINT64_MASK
+        if sources is None:
+            # One source per trial, drawn from the nodes that have an edge
+            nodes = graph.get_nodes()
+            picks = splitmix64(np.arange(num_trials, dtype=np.uint64) ^ np.uint64(self.key)) % np.uint64(len(nodes))
+            self.sources = nodes[picks.astype(np.int64)][:, None]
+        else:
+            sources = np.atleast_1d(np.asarray(sources, dtype=np.int64))
+            self.sources = np.broadcast_to(sources, (num_trials, len(sources)))
+        if batch_size is None:
+            batch_size = max(1, min(num_trials, MAX_BATCH_CELLS // max(self.num_nodes, 1)))
+        self.batch_size = batch_size
+        self.baseline = None
+
+    def node_mask(self, nodes):
+        mask = np.zeros(self.num_nodes, dtype=bool)
+        mask[np.asarray(nodes, dtype=np.int64)] = True
+        return mask
+
+    def edge_mask(self, sources, targets):
+        # Blocks both directions (and every copy) of each undirected edge
+        mask = np.zeros(len(self.indices), dtype=bool)
+        _, positions = undirected_edge_positions(self.graph, sources, targets)
+        mask[positions] = True
+        return mask
+
+    def run_batch(self, trial_ids, blocked_nodes, blocked_edges, trace):
+        # Independent cascades for the given trials, as in run_cascade_batch,
+        # with coupled draws and the masks applied to every shared edge
+        n = self.num_nodes
+        size = len(trial_ids)
+        sources = self.sources[trial_ids]
+        seed_trials = np.repeat(np.arange(size), sources.shape[1])
+        seed_nodes = sources.reshape(-1)
+        if blocked_nodes is not None:
+            # A suspended account cannot post either
+            posting = ~blocked_nodes[seed_nodes]
+            seed_trials, seed_nodes = seed_trials[posting], seed_nodes[posting]
+        infected = np.zeros(size * n, dtype=bool)
+        frontier = sorted_unique(seed_trials * n + seed_nodes)
+        infected[frontier] = True
+        rounds = [(frontier, frontier[:0], np.full(len(frontier), -1, dtype=np.int64))]
+
+        while frontier.size:
+            edge_pos, counts = expand_frontier(self.indptr, self.indices, frontier % n)
+            edge_trials = np.repeat(frontier // n, counts)
+            candidates = edge_trials * n + self.indices[edge_pos]
+            # Only edges into open, not yet infected nodes need a draw
+            fresh = ~infected[candidates]
+            if blocked_edges is not None:
+                fresh &= ~blocked_edges[edge_pos]
+            if blocked_nodes is not None:
+                fresh &= ~blocked_nodes[candidates % n]
+            fresh = np.flatnonzero(fresh)
+            threshold = self.probability[edge_pos[fresh]] if np.ndim(self.probability) else self.probability
+            fresh = fresh[coupled_uniforms(self.key, trial_ids[edge_trials[fresh]], edge_pos[fresh], len(self.indices)) < threshold]
+            candidates = candidates[fresh]
+            if trace:
+                # The first edge to reach a node in this round is its parent
+                parents = np.repeat(frontier, counts)[fresh]
+                order = np.argsort(candidates, kind='stable')
+                if len(order):
+                    order = order[np.r_[True, candidates[order][1:] != candidates[order][:-1]]]
+                frontier = candidates[order]
+                rounds.append((frontier, parents[order], edge_pos[fresh[order]]))
+            else:
+                frontier = sorted_unique(candidates)
+            infected[frontier] = True
+
+        tree = InfectionTree.from_rounds(rounds, trial_ids, n) if trace else None
+        return infected.reshape(size, n), tree
+
+    def run(self, blocked_nodes=None, blocked_edges=None, trials=None, trace=False):
+        # Per-trial reach (and infection counts, and with trace the infection
+        # tree) for the given trials, all of them by default
+        trials = np.arange(self.num_trials) if trials is None else np.asarray(trials, dtype=np.int64)
+        reach = np.empty(len(trials), dtype=np.int64)
+        infection_counts = np.zeros(self.num_nodes, dtype=np.int64)
+        trees = []
+        for start in range(0, len(trials), self.batch_size):
+            batch = trials[start:start + self.batch_size]
+            infected, tree = self.run_batch(batch, blocked_nodes, blocked_edges, trace)
+            reach[start:start + len(batch)] = infected.sum(axis=1)
+            infection_counts += infected.sum(axis=0)
+            trees.append(tree)
+        tree = InfectionTree.concatenate(trees) if trace and trees else None
+        return reach, infection_counts, tree
+
+    def simulate(self, blocked_nodes=None, blocked_edges=None):
+        reach, infection_counts, _ = self.run(blocked_nodes, blocked_edges)
+        return CascadeResult(reach, infection_counts, self.num_trials)
+
+    def get_baseline(self):
+        if self.baseline is None:
+            self.baseline = self.simulate()
+        return self.baseline
+
+    def evaluate(self, nodes=(), edges=None):
+        # Reach without and with the given nodes and (u, v) edges blocked;
+        # returns (baseline, contained) cascade results over the same trials
+        blocked_nodes = self.node_mask(nodes) if len(nodes) else None
+        blocked_edges = self.edge_mask(*np.asarray(edges, dtype=np.int64).reshape(-1, 2).T) if edges is not None and len(edges) else None
+        return self.get_baseline(), self.simulate(blocked_nodes, blocked_edges)
+
+    def rank_blockers(self, k, nodes=None, edges=None, max_evaluations=8):
+        # Greedy containment: k times, pick the candidate (a node, or a (u, v)
+        # edge) whose blocking cuts the most expected reach given the earlier
+        # picks. The infection tree bounds every candidate's reduction, so only
+        # the candidates with the highest bounds are re-simulated, and only on
+        # the trials whose tree they appear in; the search stops once no
+        # remaining bound beats the best measured reduction (at most
+        # max_evaluations re-simulations per pick). Candidates must be
+        # distinct. Returns a list of (candidate index, reach reduction, reach
+        # after) in pick order.
+        if (nodes is None) == (edges is None):
+            raise ValueError("pass either candidate nodes or candidate edges")
+        n = self.num_nodes
+        blocked_nodes = None
+        blocked_edges = None
+        if nodes is not None:
+            keys = np.asarray(nodes, dtype=np.int64)
+            blocked_nodes = masks = np.zeros(n, dtype=bool)
+        else:
+            edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+            keys = edges.min(axis=1) * n + edges.max(axis=1)
+            blocked_edges = masks = np.zeros(len(self.indices), dtype=bool)
+        candidates = np.argsort(keys, kind='stable')
+        sorted_keys = keys[candidates]
+
+        def blocked_by(candidate):
+            # Node index or CSR positions that blocking a candidate masks
+            if nodes is not None:
+                return keys[candidate]
+            return undirected_edge_positions(self.graph, edges[candidate:candidate + 1, 0], edges[candidate:candidate + 1, 1])[1]
+
+        reach, _, tree = self.run(trace=True)
+        available = np.ones(len(keys), dtype=bool)
+        picks = []
+        for _ in range(k):
+            values = tree.nodes if nodes is not None else tree.edge_keys(self.indptr, n)
+            bounds, groups, entry_trials = tree.candidate_bounds(values, sorted_keys, candidates)
+            bounds[~available] = 0
+            best, best_gain, best_trials = -1, 0, None
+            for candidate in np.argsort(-bounds, kind='stable')[:max_evaluations].tolist():
+                if bounds[candidate] <= best_gain:
+                    break
+                lo, hi = np.searchsorted(groups, [candidate, candidate + 1])
+                trials = sorted_unique(entry_trials[lo:hi])
+                blocked = blocked_by(candidate)
+                previous = masks[blocked].copy()
+                masks[blocked] = True
+                contained, _, _ = self.run(blocked_nodes, blocked_edges, trials)
+                masks[blocked] = previous
+                gain = int((reach[trials] - contained).sum())
+                if gain > best_gain:
+                    best, best_gain, best_trials = candidate, gain, trials
+            if best < 0:
+                break
+
+            masks[blocked_by(best)] = True
+            available[best] = False
+            contained, _, best_tree = self.run(blocked_nodes, blocked_edges, best_trials, trace=True)
+            reach[best_trials] = contained
+            tree = InfectionTree.concatenate([tree.without_trials(best_trials, self.num_trials), best_tree])
+            picks.append((best, best_gain / self.num_trials, float(reach.mean())))
+        return picks
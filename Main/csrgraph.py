@@ -0,0 +1,147 @@
+import numpy as np
+
+
+class CSRGraph:
+    # Read-only adjacency stored as contiguous arrays: the neighbours of node v
+    # are indices[indptr[v]:indptr[v + 1]]. Exposes the same query API as the
+    # dict based Graph in mess2.py / messdynmic.py.
+    def __init__(self, indptr, indices, degree, total_edges):
+        self.indptr = indptr
+        self.indices = indices
+        self.degree = degree
+        self.total_edges = total_edges
+        self.num_nodes = len(indptr) - 1
+        # Built once; only ids that appear in at least one edge count as nodes
+        self.nodes = np.flatnonzero(np.diff(indptr) > 0)
+
+    @classmethod
+    def from_edges(cls, sources, targets, num_nodes=None):
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if num_nodes is None:
+            num_nodes = int(max(sources.max(initial=-1), targets.max(initial=-1))) + 1
+
+        # Every undirected edge is stored in both rows, self-loops twice in their
+        # own row, exactly like Graph.add_edge does.
+        rows = np.concatenate([sources, targets])
+        cols = np.concatenate([targets, sources])
+        order = np.argsort(rows, kind='stable')
+
+        index_dtype = np.int32 if num_nodes < 2 ** 31 else np.int64
+        indices = cols[order].astype(index_dtype)
+        counts = np.bincount(rows, minlength=num_nodes)
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+
+        return cls(indptr, indices, counts.astype(np.float64), len(sources))
+
+    @classmethod
+    def from_graph(cls, graph, num_nodes=None):
+        sources = []
+        targets = []
+        for node, neighbors in graph.adjacency_list.items():
+            loops = 0
+            for neighbor in neighbors:
+                # Each edge appears once in each endpoint's list; keep one copy
+                if node < neighbor:
+                    sources.append(node)
+                    targets.append(neighbor)
+                elif node == neighbor:
+                    loops += 1
+            # A self-loop was appended twice to its own list
+            sources.extend([node] * (loops // 2))
+            targets.extend([node] * (loops // 2))
+        return cls.from_edges(sources, targets, num_nodes)
+
+    def patched(self, insertions=(), deletions=(), num_nodes=None):
+        # New graph with the (u, v) pairs added and removed, one copy per
+        # deletion as in Graph.remove_edge. Only the rows of touched endpoints
+        # are rebuilt; the rest are copied over in bulk slices.
+        num_nodes = max(self.num_nodes, num_nodes or 0)
+        rows = {}
+        for from_node, to_node in deletions:
+            for node, neighbor in ((from_node, to_node), (to_node, from_node)):
+                if node not in rows:
+                    rows[node] = self.get_neighbors(node).tolist()
+                rows[node].remove(neighbor)
+        for from_node, to_node in insertions:
+            for node, neighbor in ((from_node, to_node), (to_node, from_node)):
+                if node not in rows:
+                    rows[node] = self.get_neighbors(node).tolist() if node < self.num_nodes else []
+                rows[node].append(neighbor)
+            num_nodes = max(num_nodes, from_node + 1, to_node + 1)
+
+        counts = np.zeros(num_nodes, dtype=np.int64)
+        counts[:self.num_nodes] = np.diff(self.indptr)
+        touched = sorted(rows)
+        counts[touched] = [len(rows[node]) for node in touched]
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+
+        pieces = []
+        start = 0
+        for node in touched:
+            pieces.append(self.indices[self.indptr[min(start, self.num_nodes)]:self.indptr[min(node, self.num_nodes)]])
+            pieces.append(rows[node])
+            start = node + 1
+        pieces.append(self.indices[self.indptr[min(start, self.num_nodes)]:])
+        index_dtype = np.int32 if num_nodes < 2 ** 31 else np.int64
+        indices = np.concatenate([np.asarray(piece, dtype=index_dtype) for piece in pieces])
+        total_edges = self.total_edges + len(insertions) - len(deletions)
+        return CSRGraph(indptr, indices, counts.astype(np.float64), total_edges)
+
+    def get_neighbors(self, node):
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def get_degree(self, node):
+        return self.degree[node]
+
+    def get_total_edges(self):
+        return self.total_edges
+
+    def get_nodes(self):
+        return self.nodes
+
+    def memory_usage(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.degree.nbytes + self.nodes.nbytes
+
+
+def connected_components(graph):
+    # Min-label propagation with pointer jumping; every pass is a handful of
+    # vectorized O(|E|) operations. Returns (labels, component sizes by label).
+    indptr = graph.indptr
+    n = len(indptr) - 1
+    labels = np.arange(n)
+    starts = indptr[:-1][np.diff(indptr) > 0]
+    rows = np.flatnonzero(np.diff(indptr) > 0)
+    while True:
+        new_labels = labels.copy()
+        if len(starts):
+            neighbor_min = np.minimum.reduceat(labels[graph.indices], starts)
+            new_labels[rows] = np.minimum(labels[rows], neighbor_min)
+            # Hook each label onto the smallest label any of its members saw
+            np.minimum.at(new_labels, labels[rows], new_labels[rows])
+        while True:
+            jumped = new_labels[new_labels]
+            if np.array_equal(jumped, new_labels):
+                break
+            new_labels = jumped
+        if np.array_equal(new_labels, labels):
+            return labels, np.bincount(labels, minlength=n)
+        labels = new_labels
+
+
+def k_hop_neighborhood(graph, node, radius):
+    # Nodes within `radius` hops of node (excluding node itself). Frontiers and
+    # the visited set are sorted arrays, so a query never touches O(|V|) state.
+    visited = np.array([node], dtype=np.int64)
+    frontier = visited
+    for _ in range(radius):
+        starts = graph.indptr[frontier]
+        counts = graph.indptr[frontier + 1] - starts
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        frontier = np.setdiff1d(graph.indices[positions], visited)
+        if not len(frontier):
+            break
+        visited = np.union1d(visited, frontier)
+    return visited[visited != node]
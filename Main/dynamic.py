@@ -0,0 +1,102 @@
+from collections import deque
+from louvain import ModularityTracker
+
+
+class DynamicLouvain:
+    # Keeps a partition current under batches of edge insertions and deletions
+    # without re-running detection. Only the endpoints of edges that can change
+    # the partition are screened (deleted intra-community edges, inserted
+    # cross-community edges); a node that moves puts its neighbours back on the
+    # frontier. A ModularityTracker is updated per edge and per move, so
+    # modularity is always current.
+    def __init__(self, graph, communities):
+        self.graph = graph
+        self.communities = list(communities)
+        self.next_label = max(self.communities, default=-1) + 1
+        for node in graph.get_nodes():
+            self.ensure_node(node)
+        self.tracker = ModularityTracker.from_graph(graph, self.communities)
+
+    def ensure_node(self, node):
+        # New users start in their own community
+        while len(self.communities) <= node:
+            self.communities.append(self.next_label)
+            self.next_label += 1
+
+    def insert_edge(self, from_node, to_node):
+        self.ensure_node(from_node)
+        self.ensure_node(to_node)
+        self.tracker.ensure_community(self.next_label - 1)
+        self.graph.add_edge(from_node, to_node)
+        from_comm = self.communities[from_node]
+        to_comm = self.communities[to_node]
+        self.tracker.add_edge(from_comm, to_comm)
+        return from_comm != to_comm
+
+    def delete_edge(self, from_node, to_node):
+        self.graph.remove_edge(from_node, to_node)
+        from_comm = self.communities[from_node]
+        to_comm = self.communities[to_node]
+        self.tracker.remove_edge(from_comm, to_comm)
+        return from_comm == to_comm
+
+    def apply(self, insertions=(), deletions=()):
+        # Deletions first, so a batch can move an edge by deleting and re-adding
+        frontier = []
+        for from_node, to_node in deletions:
+            if self.delete_edge(from_node, to_node):
+                frontier.extend((from_node, to_node))
+        for from_node, to_node in insertions:
+            if self.insert_edge(from_node, to_node):
+                frontier.extend((from_node, to_node))
+        return self.local_moving(frontier)
+
+    def local_moving(self, frontier):
+        # Moves only on a strict gain, so modularity rises with every move and
+        # the queue always drains. Returns the number of moves made.
+        queue = deque(dict.fromkeys(frontier))
+        queued = set(queue)
+        communities = self.communities
+        tracker = self.tracker
+        sigma_tot = tracker.sigma_tot
+        moves = 0
+        while queue and tracker.total_weight > 0:
+            node = queue.popleft()
+            queued.discard(node)
+            node_comm = communities[node]
+            ki = self.graph.get_degree(node)
+            links = {}
+            self_loop = 0.0
+            for neighbor in self.graph.get_neighbors(node):
+                if neighbor == node:
+                    self_loop += 1
+                else:
+                    c = communities[neighbor]
+                    links[c] = links.get(c, 0.0) + 1
+            if not links:
+                continue
+
+            own_links = links.get(node_comm, 0.0)
+            best_comm = node_comm
+            best_gain = own_links - (sigma_tot[node_comm] - ki) * ki / tracker.total_weight
+            for c, weight in links.items():
+                if c != node_comm:
+                    gain = weight - sigma_tot[c] * ki / tracker.total_weight
+                    if gain > best_gain:
+                        best_gain = gain
+                        best_comm = c
+            if best_comm == node_comm:
+                continue
+
+            tracker.move(ki, node_comm, best_comm, own_links, links[best_comm], self_loop)
+            communities[node] = best_comm
+            moves += 1
+            for neighbor in self.graph.get_neighbors(node):
+                if communities[neighbor] != best_comm and neighbor not in queued:
+                    queue.append(neighbor)
+                    queued.add(neighbor)
+        return moves
+
+    @property
+    def modularity(self):
+        return self.tracker.modularity
@@ -0,0 +1,140 @@
+import json
+import os
+import numpy as np
+from nodeids import NodeIdMap
+
+CHUNK_SIZE = 64 * 1024 * 1024
+CACHE_VERSION = 1
+# Bytes that can appear in a chunk of integer ids
+NUMERIC_BYTES = b'0123456789-+ \t\r\n'
+
+
+def cache_paths(filename):
+    return filename + ".edges.npy", filename + ".edges.json"
+
+
+def index_cache_paths(filename):
+    return filename + ".index.npy", filename + ".ids.npy", filename + ".index.json"
+
+
+def source_signature(filename):
+    stat = os.stat(filename)
+    return {"version": CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def parse_edge_chunk(data):
+    # SNAP files put '#' comments in the header; drop any comment line
+    if b'#' in data:
+        data = b'\n'.join(line for line in data.split(b'\n') if not line.lstrip().startswith(b'#'))
+    if data.translate(None, NUMERIC_BYTES):
+        # Usernames or other non-numeric ids: keep the tokens as strings, but
+        # write integer tokens the way an all-numeric chunk parses them, so a
+        # node's id does not depend on which chunk it fell in
+        values = canonical_tokens(np.array(data.decode('utf-8').split()))
+    else:
+        values = np.fromstring(data, dtype=np.int64, sep=' ')
+    if len(values) % 2:
+        raise ValueError("edge list chunk does not contain whole (from, to) pairs")
+    return values.reshape(-1, 2)
+
+
+def canonical_tokens(tokens):
+    # Integer tokens ("007", "+5") become their decimal form; others are kept
+    numeric = np.char.isdigit(np.char.lstrip(tokens, '+-')) if len(tokens) else np.zeros(0, dtype=bool)
+    if not np.any(numeric):
+        return tokens
+    values = tokens.astype(f"U{max(tokens.dtype.itemsize // 4, 20)}")
+    values[numeric] = tokens[numeric].astype(np.int64).astype(str)
+    return values
+
+
+def read_edge_list(filename, chunk_size=CHUNK_SIZE):
+    chunks = []
+    remainder = b''
+    with open(filename, 'rb') as file:
+        while True:
+            block = file.read(chunk_size)
+            if not block:
+                break
+            block = remainder + block
+            cut = block.rfind(b'\n') + 1
+            if cut == 0:
+                remainder = block
+                continue
+            remainder = block[cut:]
+            chunks.append(parse_edge_chunk(block[:cut]))
+    if remainder.strip():
+        chunks.append(parse_edge_chunk(remainder))
+
+    if any(chunk.dtype.kind == 'U' for chunk in chunks):
+        chunks = [chunk.astype(str) for chunk in chunks]
+    edges = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+    if len(edges) and edges.dtype.kind == 'i' and edges.min() >= 0 and edges.max() < 2 ** 31:
+        edges = edges.astype(np.int32)
+    return edges
+
+
+def load_cached_edges(filename):
+    edges_path, meta_path = cache_paths(filename)
+    try:
+        with open(meta_path, 'r') as file:
+            meta = json.load(file)
+        if meta != source_signature(filename):
+            return None
+        return np.load(edges_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_edges(filename, edges):
+    edges_path, meta_path = cache_paths(filename)
+    try:
+        np.save(edges_path, edges)
+        # Written last so a half-written array is never picked up
+        with open(meta_path, 'w') as file:
+            json.dump(source_signature(filename), file)
+    except OSError:
+        pass
+
+
+def load_edge_list(filename, use_cache=True, chunk_size=CHUNK_SIZE):
+    # Returns an (E, 2) array of (from, to) pairs. Parsed files get a binary
+    # sidecar keyed by size and mtime that later runs memory-map instead.
+    if use_cache:
+        edges = load_cached_edges(filename)
+        if edges is not None:
+            return edges
+
+    edges = read_edge_list(filename, chunk_size)
+    if use_cache:
+        save_cached_edges(filename, edges)
+    return edges
+
+
+def load_indexed_edges(filename, use_cache=True, chunk_size=CHUNK_SIZE):
+    # Edges as dense index pairs plus the NodeIdMap back to the file's ids, so
+    # sparse 64-bit ids or usernames never size an array by the largest id.
+    # Both are cached next to the edge list the same way the raw edges are.
+    index_path, ids_path, meta_path = index_cache_paths(filename)
+    if use_cache:
+        try:
+            with open(meta_path, 'r') as file:
+                if json.load(file) == source_signature(filename):
+                    return np.load(index_path, mmap_mode='r'), NodeIdMap(np.load(ids_path, mmap_mode='r'))
+        except (OSError, ValueError):
+            pass
+
+    node_ids, edges = NodeIdMap.from_edges(load_edge_list(filename, use_cache, chunk_size))
+    if use_cache:
+        try:
+            np.save(index_path, edges)
+            np.save(ids_path, node_ids.ids)
+            with open(meta_path, 'w') as file:
+                json.dump(source_signature(filename), file)
+        except OSError:
+            pass
+    return edges, node_ids
+
+
+def count_nodes(edges):
+    return len(np.unique(edges))
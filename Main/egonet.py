@@ -0,0 +1,65 @@
+import numpy as np
+from reach import ReachIndex
+
+
+def sample_in_segments(starts, counts, num_samples, rng):
+    # One uniform position inside [starts[i], starts[i] + counts[i]) per sample
+    return starts + (rng.random(num_samples) * counts).astype(np.int64)
+
+
+class EgoNetworks:
+    # Many ego networks merged into one directed graph (u -> v: v sees u's
+    # posts). Egos are nodes 0..num_egos-1; followers and followings come from
+    # a shared user pool after them, so neighbourhoods overlap the way they do
+    # in a real follower graph.
+    def __init__(self, sources, targets, num_nodes, num_egos):
+        self.sources = sources
+        self.targets = targets
+        self.num_nodes = num_nodes
+        self.num_egos = num_egos
+        self.followers_count = np.bincount(targets, minlength=num_nodes)
+        self.following_count = np.bincount(sources, minlength=num_nodes)
+
+    def reach_index(self):
+        return ReachIndex.from_edges(self.sources, self.targets, self.num_nodes)
+
+    def write_edge_list(self, path):
+        with open(path, 'w') as file:
+            file.write(f"# Synthetic ego networks: {self.num_egos} egos\n")
+            file.write(f"# Nodes: {self.num_nodes} Edges: {len(self.sources)}\n")
+            file.write("# FromNodeId\tToNodeId\n")
+            np.savetxt(file, np.stack([self.sources, self.targets], axis=1), fmt="%d", delimiter="\t")
+
+
+def generate_ego_networks(num_egos, rng, pool_size=None, follower_range=(10, 1000), following_range=(10, 500)):
+    # Same recipe as generate_simulated_network, for all egos at once: follower
+    # and following counts per ego, then min(followers, following) // 2 edges
+    # from a random follower to a random following of the same ego. Every
+    # draw is one vectorized call; duplicate edges and self-loops are dropped.
+    if pool_size is None:
+        pool_size = 100 * num_egos
+    followers = rng.integers(follower_range[0], follower_range[1] + 1, num_egos)
+    following = rng.integers(following_range[0], following_range[1] + 1, num_egos)
+    egos = np.arange(num_egos)
+
+    follower_ids = num_egos + rng.integers(0, pool_size, int(followers.sum()))
+    following_ids = num_egos + rng.integers(0, pool_size, int(following.sum()))
+    follower_starts = np.cumsum(followers) - followers
+    following_starts = np.cumsum(following) - following
+
+    cross = np.minimum(followers, following) // 2
+    cross_egos = np.repeat(egos, cross)
+    cross_sources = follower_ids[sample_in_segments(follower_starts[cross_egos], followers[cross_egos], len(cross_egos), rng)]
+    cross_targets = following_ids[sample_in_segments(following_starts[cross_egos], following[cross_egos], len(cross_egos), rng)]
+
+    num_nodes = num_egos + pool_size
+    sources = np.concatenate([follower_ids, np.repeat(egos, following), cross_sources])
+    targets = np.concatenate([np.repeat(egos, followers), following_ids, cross_targets])
+    keep = sources != targets
+    keys = np.sort(sources[keep] * num_nodes + targets[keep])
+    if not len(keys):
+        # No egos (or no edges left): an empty graph
+        empty = np.zeros(0, dtype=np.int64)
+        return EgoNetworks(empty, empty, num_nodes, num_egos)
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    return EgoNetworks(keys // num_nodes, keys % num_nodes, num_nodes, num_egos)
@@ -0,0 +1,167 @@
+import heapq
+import numpy as np
+
+# Message states, numbered as in Message.State
+CREATED, SHARED, VIRAL, FLAGGED = 0, 1, 2, 3
+
+# Uniform draws fetched from the generator at a time
+RANDOM_BLOCK = 1 << 16
+
+
+def edge_delays(num_edges, mean_delay=1.0, rng=None):
+    # Exponential per-edge delays, aligned with the CSR indices array
+    if rng is None:
+        rng = np.random.default_rng()
+    return rng.exponential(mean_delay, num_edges)
+
+
+class PropagationTrace:
+    # Column arrays for every message of one simulation run, plus the FSM
+    # transitions and share events in the order they happened
+    __slots__ = ('source', 'start_time', 'share_count', 'state', 'transition_message',
+                 'transition_time', 'transition_state', 'share_message', 'share_time')
+
+    def __init__(self, source, start_time, share_count, state, transition_message, transition_time,
+                 transition_state, share_message, share_time):
+        self.source = source
+        self.start_time = start_time
+        self.share_count = share_count
+        self.state = state
+        self.transition_message = transition_message
+        self.transition_time = transition_time
+        self.transition_state = transition_state
+        self.share_message = share_message
+        self.share_time = share_time
+
+    @property
+    def num_messages(self):
+        return len(self.source)
+
+    def time_to_state(self, state):
+        # Time from creation until each message first entered `state` (nan if never)
+        reached = np.full(self.num_messages, np.nan)
+        hits = self.transition_state == state
+        reached[self.transition_message[hits]] = self.transition_time[hits]
+        return reached - self.start_time
+
+    def time_to_viral(self):
+        return self.time_to_state(VIRAL)
+
+    def shares_per_window(self, window, message=None):
+        # Share counts in consecutive windows of length `window`, from time 0
+        times = self.share_time if message is None else self.share_time[self.share_message == message]
+        if not len(times):
+            return np.zeros(0, dtype=np.int64)
+        return np.bincount((times // window).astype(np.int64))
+
+    def peak_shares_per_window(self, window):
+        # Most shares each message received within any sliding window
+        peak = np.zeros(self.num_messages, dtype=np.int64)
+        if not len(self.share_time):
+            return peak
+        # One sorted key per event: messages are spaced further apart than any time gap
+        span = float(self.share_time.max()) + window + 1
+        keys = np.sort(self.share_message * span + self.share_time)
+        counts = np.arange(len(keys)) - np.searchsorted(keys, keys - window, side='left') + 1
+        messages = (keys // span).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, messages[1:] != messages[:-1]])
+        peak[messages[starts]] = np.maximum.reduceat(counts, starts)
+        return peak
+
+
+class EventSimulator:
+    # Discrete-event independent cascade. Every (message, node) activation is an
+    # event on one priority queue keyed by time; an activated node shares with
+    # each neighbour with that edge's probability (a scalar or an array aligned
+    # with indices), after that edge's delay. Many messages run concurrently
+    # over the same graph. Message state lives in flat lists indexed by message
+    # id, and events are (time, message * n + node) pairs, so no Python object
+    # is created per message.
+    def __init__(self, indptr, indices, probability, delays=None, shared_threshold=10, viral_threshold=100):
+        self.indptr = indptr
+        self.indices = indices
+        self.num_nodes = len(indptr) - 1
+        self.probability = probability
+        self.delays = np.ones(len(indices)) if delays is None else np.asarray(delays, dtype=np.float64)
+        self.shared_threshold = shared_threshold
+        self.viral_threshold = viral_threshold
+
+    @classmethod
+    def from_graph(cls, graph, probability, mean_delay=1.0, rng=None, **kwargs):
+        delays = edge_delays(len(graph.indices), mean_delay, rng)
+        return cls(graph.indptr, graph.indices, probability, delays, **kwargs)
+
+    def run(self, sources, start_times=None, horizon=np.inf, rng=None):
+        # sources[m] posts message m at start_times[m] (all at 0 by default);
+        # events after `horizon` are not processed
+        if rng is None:
+            rng = np.random.default_rng()
+        n = self.num_nodes
+        sources = np.atleast_1d(np.asarray(sources, dtype=np.int64))
+        num_messages = len(sources)
+        if start_times is None:
+            start_times = np.zeros(num_messages)
+        start_times = np.broadcast_to(np.asarray(start_times, dtype=np.float64), (num_messages,))
+
+        source_list = sources.tolist()
+        ptr = self.indptr.tolist()
+        ind = self.indices.tolist()
+        delay = self.delays.tolist()
+        probability = np.broadcast_to(np.asarray(self.probability, dtype=np.float64), self.indices.shape).tolist()
+        shared_threshold = self.shared_threshold
+        viral_threshold = self.viral_threshold
+
+        share_count = [0] * num_messages
+        state = [CREATED] * num_messages
+        transition_message = list(range(num_messages))
+        transition_time = start_times.tolist()
+        transition_state = [CREATED] * num_messages
+        share_message = []
+        share_time = []
+
+        queue = list(zip(start_times.tolist(), (np.arange(num_messages) * n + sources).tolist()))
+        heapq.heapify(queue)
+        seen = set()
+        draws = []
+        position = 0
+
+        while queue:
+            time, key = heapq.heappop(queue)
+            if time > horizon:
+                break
+            if key in seen:
+                continue
+            seen.add(key)
+            message, node = divmod(key, n)
+
+            if node != source_list[message]:
+                count = share_count[message] + 1
+                share_count[message] = count
+                share_message.append(message)
+                share_time.append(time)
+                current = state[message]
+                new_state = VIRAL if count > viral_threshold else SHARED if count > shared_threshold else current
+                if new_state > current:
+                    state[message] = new_state
+                    transition_message.append(message)
+                    transition_time.append(time)
+                    transition_state.append(new_state)
+
+            base = message * n
+            for j in range(ptr[node], ptr[node + 1]):
+                if position == len(draws):
+                    draws = rng.random(RANDOM_BLOCK).tolist()
+                    position = 0
+                shared = draws[position] < probability[j]
+                position += 1
+                if shared:
+                    target = base + ind[j]
+                    if target not in seen:
+                        heapq.heappush(queue, (time + delay[j], target))
+
+        return PropagationTrace(
+            sources, np.array(start_times), np.asarray(share_count, dtype=np.int64),
+            np.asarray(state, dtype=np.int8), np.asarray(transition_message, dtype=np.int64),
+            np.asarray(transition_time), np.asarray(transition_state, dtype=np.int8),
+            np.asarray(share_message, dtype=np.int64), np.asarray(share_time),
+        )
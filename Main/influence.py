@@ -0,0 +1,95 @@
+import numpy as np
+from cascade import MAX_BATCH_CELLS, expand_frontier, run_cascade_batch
+from probabilities import transpose_probabilities
+
+
+class RRSets:
+    # Reverse-reachable sets stored flat: set i holds nodes[ptr[i]:ptr[i + 1]]
+    def __init__(self, ptr, nodes, num_nodes):
+        self.ptr = ptr
+        self.nodes = nodes
+        self.num_nodes = num_nodes
+
+    def __len__(self):
+        return len(self.ptr) - 1
+
+
+def sample_rr_sets(graph, probability, num_samples, max_entries=50_000_000, rng=None):
+    # A reverse-reachable set is everyone who would have reached a random root.
+    # The graph is undirected, so that is a forward cascade from the root with
+    # every edge's probability taken from its reverse direction (a no-op for a
+    # scalar); batches of them run on the cascade engine. Sampling stops early
+    # once max_entries (node, set) pairs are stored.
+    if rng is None:
+        rng = np.random.default_rng()
+    indptr = graph.indptr
+    indices = graph.indices
+    n = len(indptr) - 1
+    candidates = graph.get_nodes()
+    if np.ndim(probability):
+        probability = transpose_probabilities(indptr, indices, probability)
+    batch_size = max(1, min(num_samples, MAX_BATCH_CELLS // max(n, 1)))
+
+    sizes = []
+    chunks = []
+    stored = 0
+    sampled = 0
+    while sampled < num_samples and stored < max_entries:
+        size = min(batch_size, num_samples - sampled)
+        roots = rng.choice(candidates, size)
+        infected = run_cascade_batch(indptr, indices, np.arange(size), roots, size, probability, rng)
+        sizes.append(infected.sum(axis=1))
+        chunks.append(np.nonzero(infected)[1])
+        stored += len(chunks[-1])
+        sampled += size
+
+    ptr = np.zeros(sampled + 1, dtype=np.int64)
+    np.cumsum(np.concatenate(sizes), out=ptr[1:])
+    return RRSets(ptr, np.concatenate(chunks), n)
+
+
+def select_seeds(rr_sets, k):
+    # Greedy maximum coverage over the RR sets. Coverage counts are decremented
+    # once per newly covered set, so the total update work is O(entries).
+    n = rr_sets.num_nodes
+    counts = np.bincount(rr_sets.nodes, minlength=n)
+    set_ids = np.repeat(np.arange(len(rr_sets)), np.diff(rr_sets.ptr))
+    order = np.argsort(rr_sets.nodes, kind='stable')
+    node_ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=node_ptr[1:])
+    sets_by_node = set_ids[order]
+
+    covered = np.zeros(len(rr_sets), dtype=bool)
+    seeds = []
+    for _ in range(k):
+        best = int(np.argmax(counts))
+        if counts[best] == 0:
+            break
+        seeds.append(best)
+        newly = sets_by_node[node_ptr[best]:node_ptr[best + 1]]
+        newly = newly[~covered[newly]]
+        covered[newly] = True
+        positions, _ = expand_frontier(rr_sets.ptr, rr_sets.nodes, newly)
+        counts -= np.bincount(rr_sets.nodes[positions], minlength=n)
+
+    return seeds, covered.mean() if len(covered) else 0.0
+
+
+def coverage(rr_sets, seeds):
+    set_ids = np.repeat(np.arange(len(rr_sets)), np.diff(rr_sets.ptr))
+    hit = np.zeros(len(rr_sets), dtype=bool)
+    hit[set_ids[np.isin(rr_sets.nodes, seeds)]] = True
+    return hit.mean() if len(hit) else 0.0
+
+
+def find_superspreaders(graph, k, probability, num_samples=10000, max_entries=50_000_000, rng=None):
+    # Reverse-reachable set sampling (TIM/IMM style): returns the k seeds that
+    # cover the most RR sets and their expected reach. The greedy coverage is
+    # biased upwards on the sets it was chosen from, so reach is measured on a
+    # second, independent sample.
+    if rng is None:
+        rng = np.random.default_rng()
+    rr_sets = sample_rr_sets(graph, probability, num_samples, max_entries, rng)
+    seeds, _ = select_seeds(rr_sets, k)
+    rr_sets = sample_rr_sets(graph, probability, num_samples, max_entries, rng)
+    return seeds, float(coverage(rr_sets, seeds) * len(graph.get_nodes()))
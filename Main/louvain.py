@@ -0,0 +1,449 @@
+from multiprocessing import Pool, resource_tracker, shared_memory
+import os
+import numpy as np
+
+
+def self_loop_weights(indptr, indices, weights):
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    loops = rows == indices
+    return np.bincount(rows[loops], weights=weights[loops], minlength=len(indptr) - 1)
+
+
+def modularity(sigma_in, sigma_tot, total_weight):
+    # total_weight is 2m; sigma_in counts internal adjacency entries (2x edges)
+    return float(np.sum(sigma_in) / total_weight - np.sum((sigma_tot / total_weight) ** 2))
+
+
+class ModularityTracker:
+    # Per-community sigma_in (internal adjacency weight, i.e. 2x internal edges)
+    # and sigma_tot (total degree), plus their sum and sum of squares. Each
+    # update is O(1), so moving a node costs O(deg(v)) to count its links and
+    # the current modularity can be read at any time without a scan.
+    def __init__(self, sigma_in, sigma_tot, total_weight):
+        self.sigma_in = list(sigma_in)
+        self.sigma_tot = list(sigma_tot)
+        self.total_weight = float(total_weight)
+        self.sum_in = float(sum(self.sigma_in))
+        self.sum_tot_squared = float(sum(total * total for total in self.sigma_tot))
+
+    @classmethod
+    def from_arrays(cls, indptr, indices, weights, community):
+        community = np.asarray(community, dtype=np.int64)
+        n = len(indptr) - 1
+        if weights is None:
+            weights = np.ones(len(indices))
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        internal = community[rows] == community[indices]
+        size = int(community[:n].max()) + 1 if n else 0
+        degree = np.bincount(rows, weights=weights, minlength=n)
+        sigma_tot = np.bincount(community[:n], weights=degree, minlength=size)
+        sigma_in = np.bincount(community[rows[internal]], weights=weights[internal], minlength=size)
+        return cls(sigma_in.tolist(), sigma_tot.tolist(), degree.sum())
+
+    @classmethod
+    def from_graph(cls, graph, communities):
+        # Any graph with get_nodes/get_neighbors/get_degree (the dict backend)
+        size = max(communities, default=-1) + 1
+        sigma_in = [0.0] * size
+        sigma_tot = [0.0] * size
+        for node in graph.get_nodes():
+            community = communities[node]
+            sigma_tot[community] += graph.get_degree(node)
+            for neighbor in graph.get_neighbors(node):
+                if communities[neighbor] == community:
+                    sigma_in[community] += 1
+        return cls(sigma_in, sigma_tot, 2 * graph.get_total_edges())
+
+    def ensure_community(self, community):
+        if community >= len(self.sigma_tot):
+            grow = community + 1 - len(self.sigma_tot)
+            self.sigma_tot.extend([0.0] * grow)
+            self.sigma_in.extend([0.0] * grow)
+
+    def adjust(self, community, delta_tot, delta_in):
+        total = self.sigma_tot[community]
+        self.sum_tot_squared += (total + delta_tot) ** 2 - total * total
+        self.sigma_tot[community] = total + delta_tot
+        self.sigma_in[community] += delta_in
+        self.sum_in += delta_in
+
+    def move(self, degree, from_comm, to_comm, from_links, to_links, self_loop=0.0):
+        # from_links/to_links: weight from the node to the rest of each community
+        self.adjust(from_comm, -degree, -(2 * from_links + self_loop))
+        self.adjust(to_comm, degree, 2 * to_links + self_loop)
+
+    def add_edge(self, from_comm, to_comm, weight=1.0):
+        self.adjust(from_comm, weight, 2 * weight if from_comm == to_comm else 0.0)
+        self.adjust(to_comm, weight, 0.0)
+        self.total_weight += 2 * weight
+
+    def remove_edge(self, from_comm, to_comm, weight=1.0):
+        self.add_edge(from_comm, to_comm, -weight)
+
+    @property
+    def modularity(self):
+        if self.total_weight == 0:
+            return 0.0
+        return self.sum_in / self.total_weight - self.sum_tot_squared / self.total_weight ** 2
+
+
+def one_level(indptr, indices, weights, tolerance=1e-7, order=None, trace=None, community=None):
+    # Local-moving phase, from singletons or from the given partition. A
+    # ModularityTracker keeps the per-community sums, so a sweep costs O(|E|)
+    # and modularity after every sweep comes for free (appended to `trace`
+    # when given).
+    n = len(indptr) - 1
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    degree = np.bincount(rows, weights=weights, minlength=n)
+    total_weight = float(degree.sum())
+
+    ptr = indptr.tolist()
+    ind = indices.tolist()
+    w = weights.tolist()
+    k = degree.tolist()
+    if community is None:
+        community = list(range(n))
+        tracker = ModularityTracker(self_loop_weights(indptr, indices, weights).tolist(), k, total_weight)
+    else:
+        community = np.asarray(community, dtype=np.int64).tolist()
+        tracker = ModularityTracker.from_arrays(indptr, indices, weights, community)
+    sigma_tot = tracker.sigma_tot
+    if order is None:
+        order = range(n)
+
+    current_q = tracker.modularity
+    improved = False
+    while True:
+        moves = 0
+        for node in order:
+            node_comm = community[node]
+            ki = k[node]
+            links = {}
+            self_loop = 0.0
+            for j in range(ptr[node], ptr[node + 1]):
+                neighbor = ind[j]
+                if neighbor == node:
+                    self_loop += w[j]
+                else:
+                    c = community[neighbor]
+                    links[c] = links.get(c, 0.0) + w[j]
+
+            # Gain of (re)inserting the node into c, with the node taken out of
+            # its own community: k_i,in - sigma_tot * k_i / 2m
+            own_links = links.get(node_comm, 0.0)
+            best_comm = node_comm
+            best_gain = own_links - (sigma_tot[node_comm] - ki) * ki / total_weight
+            for c, weight in links.items():
+                if c != node_comm:
+                    gain = weight - sigma_tot[c] * ki / total_weight
+                    if gain > best_gain:
+                        best_gain = gain
+                        best_comm = c
+
+            if best_comm != node_comm:
+                tracker.move(ki, node_comm, best_comm, own_links, links[best_comm], self_loop)
+                community[node] = best_comm
+                moves += 1
+
+        if moves == 0:
+            break
+        new_q = tracker.modularity
+        if trace is not None:
+            trace.append(new_q)
+        improved = True
+        if new_q - current_q < tolerance:
+            current_q = new_q
+            break
+        current_q = new_q
+
+    return np.asarray(community, dtype=np.int64), current_q, improved
+
+
+def aggregate(indptr, indices, weights, community):
+    # Builds the community super-graph: one node per community, edge weights
+    # summed, internal weight kept as a self-loop so degrees are preserved.
+    labels, community = np.unique(community, return_inverse=True)
+    num_communities = len(labels)
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    keys = community[rows] * num_communities + community[indices]
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    new_weights = np.bincount(inverse, weights=weights)
+    new_rows = unique_keys // num_communities
+    new_indices = unique_keys % num_communities
+
+    new_indptr = np.zeros(num_communities + 1, dtype=np.int64)
+    np.cumsum(np.bincount(new_rows, minlength=num_communities), out=new_indptr[1:])
+    return new_indptr, new_indices, new_weights, community
+
+
+class Louvain:
+    def __init__(self, indptr, indices, weights=None, tolerance=1e-7, max_levels=None):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        if weights is None:
+            weights = np.ones(len(self.indices))
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.tolerance = tolerance
+        self.max_levels = max_levels
+        self.partitions = []
+        self.modularities = []
+        # Modularity after every local-moving sweep, one list per level
+        self.sweep_modularities = []
+
+    @classmethod
+    def from_graph(cls, graph, **kwargs):
+        return cls(graph.indptr, graph.indices, **kwargs)
+
+    def run(self):
+        # Returns the hierarchy: partitions[l][v] is the community of original
+        # node v after level l; the last level is the final partition.
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        node_to_comm = np.arange(len(indptr) - 1)
+        self.partitions = []
+        self.modularities = []
+        self.sweep_modularities = []
+
+        if weights.sum() == 0:
+            self.partitions.append(node_to_comm)
+            self.modularities.append(0.0)
+            return self.partitions
+
+        while self.max_levels is None or len(self.partitions) < self.max_levels:
+            self.sweep_modularities.append([])
+            community, q, improved = self.local_moving(indptr, indices, weights)
+            if not improved and self.partitions:
+                break
+            indptr, indices, weights, dense = aggregate(indptr, indices, weights, community)
+            node_to_comm = dense[node_to_comm]
+            self.partitions.append(node_to_comm)
+            self.modularities.append(q)
+            if not improved:
+                break
+
+        return self.partitions
+
+    def local_moving(self, indptr, indices, weights):
+        return one_level(indptr, indices, weights, self.tolerance, trace=self.sweep_modularities[-1])
+
+    @property
+    def communities(self):
+        return self.partitions[-1]
+
+    @property
+    def modularity(self):
+        return self.modularities[-1]
+
+
+def partition_modularity(indptr, indices, weights, community, degree):
+    total_weight = float(degree.sum())
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    internal = community[rows] == community[indices]
+    sigma_tot = np.bincount(community, weights=degree, minlength=len(degree))
+    return float(weights[internal].sum() / total_weight - np.sum((sigma_tot / total_weight) ** 2))
+
+
+class SharedArrays:
+    # Named NumPy arrays backed by POSIX shared memory so worker processes can
+    # map the CSR graph and the community state without copying them.
+    def __init__(self, arrays):
+        self.blocks = {}
+        self.arrays = {}
+        self.spec = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            view[...] = array
+            self.blocks[name] = block
+            self.arrays[name] = view
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+
+worker_blocks = {}
+
+
+def attach_shared(spec):
+    # Worker side: map each block once and reuse it for later tasks; blocks of
+    # finished levels are released
+    names = set(block_name for block_name, _, _ in spec.values())
+    for block_name in list(worker_blocks):
+        if block_name not in names:
+            worker_blocks.pop(block_name).close()
+    arrays = {}
+    for name, (block_name, shape, dtype) in spec.items():
+        if block_name not in worker_blocks:
+            block = shared_memory.SharedMemory(name=block_name)
+            # Only the creating process may unlink; stop the tracker doing it on exit
+            resource_tracker.unregister(block._name, 'shared_memory')
+            worker_blocks[block_name] = block
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=worker_blocks[block_name].buf)
+    return arrays
+
+
+def evaluate_moves(task):
+    # Best community for every node in [start, end) against the current
+    # snapshot of community/sigma_tot; returns only the nodes that want to move.
+    spec, start, end, total_weight = task
+    arrays = attach_shared(spec)
+    indptr = arrays['indptr']
+    community = arrays['community']
+    sigma_tot = arrays['sigma_tot']
+    size = arrays['size']
+
+    first, last = indptr[start], indptr[end]
+    ptr = (indptr[start:end + 1] - first).tolist()
+    neighbors = arrays['indices'][first:last]
+    neighbor_comms = community[neighbors].tolist()
+    neighbors = neighbors.tolist()
+    w = arrays['weights'][first:last].tolist()
+    k = arrays['degree'][start:end].tolist()
+    own_comms = community[start:end].tolist()
+
+    moved_nodes = []
+    moved_to = []
+    for offset in range(end - start):
+        node = start + offset
+        links = {}
+        for j in range(ptr[offset], ptr[offset + 1]):
+            if neighbors[j] != node:
+                c = neighbor_comms[j]
+                links[c] = links.get(c, 0.0) + w[j]
+        if not links:
+            continue
+
+        ki = k[offset]
+        node_comm = own_comms[offset]
+        own_gain = links.get(node_comm, 0.0) - (sigma_tot[node_comm] - ki) * ki / total_weight
+        best_comm = node_comm
+        best_gain = own_gain
+        for c, weight in links.items():
+            if c != node_comm:
+                gain = weight - sigma_tot[c] * ki / total_weight
+                if gain > best_gain:
+                    best_gain = gain
+                    best_comm = c
+        # Two singletons evaluated on the same snapshot would swap into each
+        # other's community; only let a singleton join a lower-labelled one
+        if best_comm != node_comm and size[node_comm] == 1 and size[best_comm] == 1 and best_comm > node_comm:
+            continue
+        if best_comm != node_comm:
+            moved_nodes.append(node)
+            moved_to.append(best_comm)
+
+    return np.asarray(moved_nodes, dtype=np.int64), np.asarray(moved_to, dtype=np.int64)
+
+
+def move_nodes(nodes, from_comms, to_comms, degree, community, sigma_tot, size):
+    np.subtract.at(sigma_tot, from_comms, degree[nodes])
+    np.add.at(sigma_tot, to_comms, degree[nodes])
+    np.subtract.at(size, from_comms, 1)
+    np.add.at(size, to_comms, 1)
+    community[nodes] = to_comms
+
+
+class ParallelLouvain(Louvain):
+    # Local moving runs in worker processes over vertex blocks. Each round the
+    # workers propose moves against a shared snapshot of the communities; the
+    # master applies the batch and updates sigma_tot incrementally before the
+    # next round. Singleton-to-singleton moves are restricted to lower labels so
+    # concurrent proposals cannot swap endlessly (minimum label heuristic).
+    def __init__(self, indptr, indices, weights=None, workers=None, rounds_per_sweep=4,
+                 min_parallel_nodes=10000, **kwargs):
+        super().__init__(indptr, indices, weights, **kwargs)
+        self.workers = workers or os.cpu_count() or 1
+        self.rounds_per_sweep = rounds_per_sweep
+        self.min_parallel_nodes = min_parallel_nodes
+        self.pool = None
+
+    def run(self):
+        try:
+            return super().run()
+        finally:
+            if self.pool is not None:
+                self.pool.terminate()
+                self.pool = None
+
+    def get_pool(self):
+        # Started by the first level with min_parallel_nodes nodes, so small
+        # graphs never pay for worker processes
+        if self.pool is None:
+            self.pool = Pool(self.workers)
+        return self.pool
+
+    def local_moving(self, indptr, indices, weights):
+        n = len(indptr) - 1
+        # Coarse levels are small; the process round-trips would dominate
+        if n < self.min_parallel_nodes:
+            return one_level(indptr, indices, weights, self.tolerance, trace=self.sweep_modularities[-1])
+
+        # Fork the workers before the first shared block exists, so they do
+        # not share the parent's resource tracker
+        pool = self.get_pool()
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        degree = np.bincount(rows, weights=weights, minlength=n)
+        total_weight = float(degree.sum())
+        shared = SharedArrays({
+            'indptr': indptr, 'indices': indices, 'weights': weights, 'degree': degree,
+            'community': np.arange(n, dtype=np.int64), 'sigma_tot': degree.copy(),
+            'size': np.ones(n, dtype=np.int64),
+        })
+        community = shared.arrays['community']
+        sigma_tot = shared.arrays['sigma_tot']
+        size = shared.arrays['size']
+
+        try:
+            current_q = partition_modularity(indptr, indices, weights, community, degree)
+            improved = False
+            stalled = False
+            round_size = -(-n // self.rounds_per_sweep)
+            while not stalled:
+                sweep_q = current_q
+                moves = 0
+                for round_start in range(0, n, round_size):
+                    round_end = min(round_start + round_size, n)
+                    block = -(-(round_end - round_start) // self.workers)
+                    tasks = [(shared.spec, lo, min(lo + block, round_end), total_weight)
+                             for lo in range(round_start, round_end, block)]
+                    results = pool.map(evaluate_moves, tasks)
+                    nodes = np.concatenate([r[0] for r in results])
+                    if not len(nodes):
+                        continue
+                    targets = np.concatenate([r[1] for r in results])
+                    sources = community[nodes]
+                    move_nodes(nodes, sources, targets, degree, community, sigma_tot, size)
+
+                    # Moves chosen against the same snapshot can undo each
+                    # other's gains; a round that lowers modularity is reverted
+                    # and the level finishes serially from the partition before it
+                    round_q = partition_modularity(indptr, indices, weights, community, degree)
+                    if round_q < current_q:
+                        move_nodes(nodes, targets, sources, degree, community, sigma_tot, size)
+                        stalled = True
+                        break
+                    current_q = round_q
+                    moves += len(nodes)
+
+                if moves == 0:
+                    break
+                self.sweep_modularities[-1].append(current_q)
+                improved = True
+                if current_q - sweep_q < self.tolerance:
+                    break
+
+            if stalled:
+                return self.finish_serially(indptr, indices, weights, community.copy(), improved)
+            return community.copy(), current_q, improved
+        finally:
+            shared.close()
+
+    def finish_serially(self, indptr, indices, weights, community, improved):
+        # Serial local moving from the partition the parallel rounds reached
+        community, q, serial_improved = one_level(indptr, indices, weights, self.tolerance,
+                                                  trace=self.sweep_modularities[-1], community=community)
+        return community, q, improved or serial_improved
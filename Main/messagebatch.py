@@ -0,0 +1,92 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from itertools import islice
+from multiprocessing import Pool
+from nltk.tokenize import word_tokenize
+from textblob import TextBlob
+
+MISINFO_PATTERN = re.compile(r'\b(fake|hoax|conspiracy)\b')
+
+worker_stop_words = set()
+worker_keywords = set()
+
+
+def keyword_score(message, stop_words, keywords):
+    tokens = word_tokenize(message.lower())
+    filtered_tokens = [word for word in tokens if word not in stop_words]
+    misinformation_score = sum(1 for word in filtered_tokens if word in keywords)
+    return misinformation_score / len(filtered_tokens) if filtered_tokens else 0
+
+
+def sentiment_score(message):
+    return TextBlob(message).sentiment.polarity
+
+
+def init_worker(stop_words, keywords):
+    global worker_stop_words, worker_keywords
+    worker_stop_words = stop_words
+    worker_keywords = keywords
+
+
+def score_message(message):
+    return {
+        'misinformation_score': keyword_score(message, worker_stop_words, worker_keywords),
+        'sentiment': sentiment_score(message),
+        'is_misinformation': bool(MISINFO_PATTERN.search(message)),
+    }
+
+
+def content_key(message):
+    return hashlib.blake2b(message.encode('utf-8'), digest_size=16).digest()
+
+
+class MessageScorer:
+    # Scores message feeds in input-order chunks on a process pool. Results are
+    # memoized by content hash, so reposts of the same text are scored once.
+    def __init__(self, stop_words, keywords, workers=None, chunk_size=10000, cache_size=1_000_000):
+        self.stop_words = stop_words
+        self.keywords = keywords
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def remember(self, key, result):
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def task_size(self, count):
+        # Several tasks per worker, so one slow task does not hold up the rest
+        return max(1, count // (4 * self.workers))
+
+    def score(self, messages):
+        messages = iter(messages)
+        with Pool(self.workers, initializer=init_worker, initargs=(self.stop_words, self.keywords)) as pool:
+            while True:
+                chunk = list(islice(messages, self.chunk_size))
+                if not chunk:
+                    break
+                keys = [content_key(message) for message in chunk]
+
+                results = {}
+                pending = {}
+                for key, message in zip(keys, chunk):
+                    if key in results or key in pending:
+                        continue
+                    if key in self.cache:
+                        self.cache.move_to_end(key)
+                        results[key] = self.cache[key]
+                    else:
+                        pending[key] = message
+                # Results stream back in submission order, a few texts per
+                # task, and are yielded as soon as the next input's is in
+                scored = pool.imap(score_message, list(pending.values()), self.task_size(len(pending)))
+                for key in keys:
+                    if key not in results:
+                        # First occurrence of a pending text: its result is next
+                        results[key] = result = next(scored)
+                        self.remember(key, result)
+                    yield dict(results[key])
@@ -0,0 +1,218 @@
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+
+
+class Message:
+    # View of one row of a MessageStore; the state lives in the store's
+    # columns, so a view costs two slots and can be dropped at any time
+    __slots__ = ('store', 'id')
+
+    class State:
+        CREATED = 0
+        SHARED = 1
+        VIRAL = 2
+        FLAGGED = 3
+
+    def __init__(self, store, id):
+        self.store = store
+        self.id = id
+
+    def get_id(self):
+        return self.id
+
+    def get_content(self):
+        return self.store.contents[self.store.content[self.id]]
+
+    def get_source_node(self):
+        return self.store.sources[self.store.source[self.id]]
+
+    def get_state(self):
+        return int(self.store.state[self.id])
+
+    def get_share_count(self):
+        return int(self.store.share_count[self.id])
+
+    def set_share_count(self, share_count):
+        self.store.share_count[self.id] = share_count
+        self.store.update_states([self.id])
+
+    def increment_share_count(self, count=1):
+        self.store.add_shares([self.id], count)
+
+    def flag_as_misinformation(self):
+        self.store.flag([self.id])
+
+    def update_state(self):
+        self.store.update_states([self.id])
+
+
+class MessageStore:
+    # Columnar message log: one row per message with its source, interned
+    # content, FSM state and share count in NumPy arrays (grown by doubling).
+    # Sources are interned too, and per-source message and flagged counts are
+    # kept current, so "does this node have flagged messages" is one lookup
+    # instead of a scan over the log. State changes are vectorized over ids.
+    def __init__(self, shared_threshold=10, viral_threshold=100, capacity=INITIAL_CAPACITY):
+        self.shared_threshold = shared_threshold
+        self.viral_threshold = viral_threshold
+        self.size = 0
+        self.source = np.zeros(capacity, dtype=np.int32)
+        self.content = np.zeros(capacity, dtype=np.int32)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.share_count = np.zeros(capacity, dtype=np.int64)
+        # Interned values and their codes
+        self.contents = []
+        self.content_codes = {}
+        self.sources = []
+        self.source_codes = {}
+        self.messages_per_source = np.zeros(capacity, dtype=np.int64)
+        self.flagged_per_source = np.zeros(capacity, dtype=np.int64)
+        self.source_index = None
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, id):
+        if id < 0:
+            id += self.size
+        if not 0 <= id < self.size:
+            raise IndexError(f"no message {id}")
+        return Message(self, id)
+
+    def __iter__(self):
+        return (Message(self, id) for id in range(self.size))
+
+    @staticmethod
+    def intern(value, values, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def intern_source(self, source_node):
+        code = self.source_codes.get(source_node)
+        if code is None:
+            code = self.intern(source_node, self.sources, self.source_codes)
+            self.messages_per_source = self.grown(self.messages_per_source, code + 1)
+            self.flagged_per_source = self.grown(self.flagged_per_source, code + 1)
+        return code
+
+    @staticmethod
+    def grown(array, size):
+        if size <= len(array):
+            return array
+        larger = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+        larger[:len(array)] = array
+        return larger
+
+    def reserve(self, size):
+        self.source = self.grown(self.source, size)
+        self.content = self.grown(self.content, size)
+        self.state = self.grown(self.state, size)
+        self.share_count = self.grown(self.share_count, size)
+
+    def add(self, content, source_node):
+        # Appends a CREATED message and returns its view. Rows past size are
+        # zero (CREATED, no shares), so only source and content are written.
+        id = self.size
+        if id == len(self.source):
+            self.reserve(id + 1)
+        source = self.intern_source(source_node)
+        self.source[id] = source
+        self.content[id] = self.intern(content, self.contents, self.content_codes)
+        self.messages_per_source[source] += 1
+        self.size = id + 1
+        self.source_index = None
+        return Message(self, id)
+
+    def add_many(self, contents, source_nodes):
+        # Bulk append; returns the new ids
+        first = self.size
+        count = len(contents)
+        self.reserve(first + count)
+        sources = np.fromiter((self.intern_source(node) for node in source_nodes), dtype=np.int32, count=count)
+        self.source[first:first + count] = sources
+        self.content[first:first + count] = np.fromiter(
+            (self.intern(content, self.contents, self.content_codes) for content in contents), dtype=np.int32, count=count)
+        np.add.at(self.messages_per_source, sources, 1)
+        self.size = first + count
+        self.source_index = None
+        return np.arange(first, first + count)
+
+    def add_shares(self, ids, counts=1):
+        # Adds counts[i] shares to message ids[i] (repeats accumulate), then
+        # advances the FSM of those messages
+        ids = np.asarray(ids, dtype=np.int64)
+        np.add.at(self.share_count, ids, counts)
+        self.update_states(ids)
+
+    def update_states(self, ids=None):
+        # CREATED -> SHARED -> VIRAL by share count; states only move forward,
+        # so FLAGGED (the highest) is never undone by further shares
+        ids = np.arange(self.size) if ids is None else np.asarray(ids, dtype=np.int64)
+        counts = self.share_count[ids]
+        reached = np.where(counts > self.viral_threshold, Message.State.VIRAL,
+                           np.where(counts > self.shared_threshold, Message.State.SHARED, Message.State.CREATED))
+        self.state[ids] = np.maximum(self.state[ids], reached)
+
+    def flag(self, ids):
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        newly = ids[self.state[ids] != Message.State.FLAGGED]
+        self.state[newly] = Message.State.FLAGGED
+        np.add.at(self.flagged_per_source, self.source[newly], 1)
+        return len(newly)
+
+    def has_flagged(self, source_node):
+        code = self.source_codes.get(source_node)
+        return code is not None and bool(self.flagged_per_source[code] > 0)
+
+    def count_from(self, source_node):
+        code = self.source_codes.get(source_node)
+        return 0 if code is None else int(self.messages_per_source[code])
+
+    def from_source(self, source_node):
+        # Ids of every message posted by source_node, oldest first. The index
+        # (message ids grouped by source) is rebuilt only after new messages.
+        code = self.source_codes.get(source_node)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        if self.source_index is None:
+            order = np.argsort(self.source[:self.size], kind='stable')
+            starts = np.zeros(len(self.sources) + 1, dtype=np.int64)
+            np.cumsum(self.messages_per_source[:len(self.sources)], out=starts[1:])
+            self.source_index = (starts, order)
+        starts, order = self.source_index
+        return order[starts[code]:starts[code + 1]]
+
+    def arrays(self):
+        # Columns for snapshots; the interned values go in the manifest
+        return {
+            'message_source': self.source[:self.size],
+            'message_content': self.content[:self.size],
+            'message_state': self.state[:self.size],
+            'message_share_count': self.share_count[:self.size],
+        }
+
+    def meta(self):
+        return {'message_contents': self.contents, 'message_sources': self.sources}
+
+    @classmethod
+    def from_snapshot(cls, arrays, meta, shared_threshold=10, viral_threshold=100):
+        store = cls(shared_threshold, viral_threshold, max(INITIAL_CAPACITY, len(arrays['message_source'])))
+        size = len(arrays['message_source'])
+        store.size = size
+        store.source[:size] = arrays['message_source']
+        store.content[:size] = arrays['message_content']
+        store.state[:size] = arrays['message_state']
+        store.share_count[:size] = arrays['message_share_count']
+        store.contents = list(meta['message_contents'])
+        store.content_codes = {content: code for code, content in enumerate(store.contents)}
+        store.sources = list(meta['message_sources'])
+        store.source_codes = {source: code for code, source in enumerate(store.sources)}
+        num_sources = max(INITIAL_CAPACITY, len(store.sources))
+        store.messages_per_source = np.bincount(store.source[:size], minlength=num_sources).astype(np.int64)
+        flagged = store.state[:size] == Message.State.FLAGGED
+        store.flagged_per_source = np.bincount(store.source[:size][flagged], minlength=num_sources).astype(np.int64)
+        return store
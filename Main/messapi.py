@@ -1,95 +1,212 @@
 import networkx as nx
-import matplotlib.pyplot as plt
-import random
-import re
 import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from textblob import TextBlob
 import hashlib
+import argparse
+import sys
+import numpy as np
+from collections import Counter, defaultdict, deque
 from community import community_louvain
+from reach import ReachIndex
+from nodeids import NodeIdMap
+from visualize import array_hash, render_communities, render_neighborhood
+from egonet import generate_ego_networks
+from probabilities import propagation_factors, edge_probabilities
+from batchjobs import run_batch
+from service import serve, AnalyzerQueries
+from rngstreams import RandomStreams, DEFAULT_STREAM, MESSAGE_STREAM, JOB_STREAM
+from snapshot import save_snapshot, load_snapshot
+from messagestore import MessageStore
+from messagebatch import MISINFO_PATTERN, MessageScorer, keyword_score, sentiment_score
 
 # Download necessary NLTK data
 nltk.download('punkt', quiet=True)
 nltk.download('stopwords', quiet=True)
 
-class Message:
-    class State:
-        CREATED = 0
-        SHARED = 1
-        VIRAL = 2
-        FLAGGED = 3
-
-    def __init__(self, id, content, source_node):
-        self.id = id
-        self.content = content
-        self.source_node = source_node
-        self.state = self.State.CREATED
-        self.share_count = 0
-
-    def get_id(self):
-        return self.id
-
-    def get_content(self):
-        return self.content
-
-    def get_source_node(self):
-        return self.source_node
-
-    def get_state(self):
-        return self.state
-
-    def get_share_count(self):
-        return self.share_count
-
-    def increment_share_count(self):
-        self.share_count += 1
-        self.update_state()
-
-    def flag_as_misinformation(self):
-        self.state = self.State.FLAGGED
-
-    def update_state(self):
-        if self.share_count > 100:
-            self.state = self.State.VIRAL
-        elif self.share_count > 10:
-            self.state = self.State.SHARED
+class CommunityIndex:
+    # Built once after community detection: members and size per community and,
+    # for every node, how many of its distinct neighbours sit in each community.
+    # add_edge keeps it in step with the graph so per-user stats are lookups.
+    def __init__(self, graph, communities):
+        self.communities = communities
+        self.members = defaultdict(list)
+        self.sizes = Counter()
+        self.neighbor_communities = defaultdict(Counter)
+
+        for node, community in communities.items():
+            self.members[community].append(node)
+            self.sizes[community] += 1
+        # Label for the next new user's community
+        self.next_community = max(self.sizes, default=-1) + 1
+
+        for node in graph.nodes():
+            neighbors = set(graph.predecessors(node))
+            neighbors.update(graph.successors(node))
+            counts = self.neighbor_communities[node]
+            for neighbor in neighbors:
+                counts[communities[neighbor]] += 1
+
+    def add_node(self, node):
+        if node not in self.communities:
+            # New users start in their own community until the next detection
+            community = self.next_community
+            self.next_community += 1
+            self.communities[node] = community
+            self.members[community].append(node)
+            self.sizes[community] += 1
+
+    def add_edge(self, graph, from_node, to_node):
+        # Must run before the edge is added to the graph
+        self.add_node(from_node)
+        self.add_node(to_node)
+        if graph.has_edge(from_node, to_node) or graph.has_edge(to_node, from_node):
+            return
+        self.neighbor_communities[from_node][self.communities[to_node]] += 1
+        if from_node != to_node:
+            self.neighbor_communities[to_node][self.communities[from_node]] += 1
+
+    def get_stats(self, node):
+        neighbor_counts = self.neighbor_communities[node]
+        return {
+            'total_communities': len(self.sizes),
+            'user_community_size': self.sizes[self.communities[node]],
+            'connected_communities': sum(1 for count in neighbor_counts.values() if count),
+            'directly_connected_nodes': sum(neighbor_counts.values())
+        }
 
 class MisinformationAnalyzer:
-    def __init__(self):
+    def __init__(self, seed=None):
         self.graph = nx.DiGraph()
-        self.messages = []
+        # Columnar message log with a per-source (username) index
+        self.messages = MessageStore()
         self.stop_words = set(stopwords.words('english'))
         self.misinformation_keywords = set(['fake', 'hoax', 'conspiracy', 'scam', 'misleading'])
         self.communities = None
+        self.community_index = None
+        self.reach_index = None
+        # (reach index, hash of its arrays) for the layout cache
+        self.layout_key = None
+        self.message_scorer = None
+        self.current_user = None
+        self.share_probability = 0.3
+        self.edge_probabilities = None
+        # In-degree per node index, set only for generated ego networks, which
+        # have no networkx graph
+        self.in_degree = None
+        # Per-message and per-job random streams; see rngstreams.RandomStreams
+        self.streams = RandomStreams(seed)
 
     def generate_simulated_network(self, username):
+        # The network depends only on the username; a private stream leaves
+        # the global random module alone
         seed = int(hashlib.md5(username.encode()).hexdigest(), 16) % (10 ** 8)
-        random.seed(seed)
+        rng = RandomStreams(seed).stream(DEFAULT_STREAM)
 
-        followers_count = random.randint(10, 1000)
-        following_count = random.randint(10, 500)
+        followers_count = int(rng.integers(10, 1001))
+        following_count = int(rng.integers(10, 501))
 
         self.graph.clear()
+        self.current_user = username
+        self.communities = None
+        self.community_index = None
+        self.reach_index = None
+        self.edge_probabilities = None
+        self.in_degree = None
         self.graph.add_node(username, followers_count=followers_count, following_count=following_count)
 
-        for i in range(followers_count):
-            follower = f"follower_{i}"
-            self.graph.add_edge(follower, username)
-
-        for i in range(following_count):
-            following = f"following_{i}"
-            self.graph.add_edge(username, following)
+        self.graph.add_edges_from((f"follower_{i}", username) for i in range(followers_count))
+        self.graph.add_edges_from((username, f"following_{i}") for i in range(following_count))
 
-        for _ in range(min(followers_count, following_count) // 2):
-            follower = random.choice(list(self.graph.predecessors(username)))
-            following = random.choice(list(self.graph.successors(username)))
-            if not self.graph.has_edge(follower, following):
-                self.graph.add_edge(follower, following)
+        # Cross edges from a random follower to a random following, drawn in
+        # one call each; add_edges_from skips pairs that already exist
+        num_cross = min(followers_count, following_count) // 2
+        follower_picks = rng.integers(0, followers_count, num_cross).tolist()
+        following_picks = rng.integers(0, following_count, num_cross).tolist()
+        self.graph.add_edges_from((f"follower_{i}", f"following_{j}") for i, j in zip(follower_picks, following_picks))
 
        # print(f" {username} with {self.graph.number_of_nodes()} nodes and {self.graph.number_of_edges()} edges.")
 
+    def save_snapshot(self, path):
+        # Edges as index arrays over the node list; partition as an array in the
+        # same order. The network is simulated, so there is no source to check.
+        self.require_graph("save_snapshot")
+        node_ids = NodeIdMap.from_ids(list(self.graph.nodes()))
+        edges = node_ids.to_index(np.array(list(self.graph.edges())).reshape(-1, 2))
+        arrays = {
+            'sources': edges[:, 0],
+            'targets': edges[:, 1],
+            **node_ids.arrays(),
+        }
+        arrays.update(self.messages.arrays())
+        if self.communities is not None:
+            arrays['communities'] = np.array([self.communities[node] for node in node_ids.ids.tolist()], dtype=np.int64)
+        meta = {
+            'current_user': self.current_user,
+            'node_attributes': {i: data for i, (_, data) in enumerate(self.graph.nodes(data=True)) if data},
+            **self.messages.meta(),
+        }
+        save_snapshot(path, arrays, meta)
+
+    def load_snapshot(self, path):
+        arrays, meta = load_snapshot(path)
+        node_ids = NodeIdMap.from_arrays(arrays)
+        self.graph.clear()
+        self.graph.add_nodes_from(node_ids.ids.tolist())
+        for i, data in meta['node_attributes'].items():
+            self.graph.nodes[node_ids.to_id(int(i))].update(data)
+        self.graph.add_edges_from(zip(node_ids.to_ids(arrays['sources']).tolist(),
+                                      node_ids.to_ids(arrays['targets']).tolist()))
+        self.current_user = meta['current_user']
+        self.reach_index = None
+        self.edge_probabilities = None
+        self.in_degree = None
+        self.communities = None
+        self.community_index = None
+        if 'communities' in arrays:
+            self.communities = dict(zip(node_ids.ids.tolist(), arrays['communities'].tolist()))
+            self.community_index = CommunityIndex(self.graph, self.communities)
+        self.messages = MessageStore.from_snapshot(arrays, meta)
+
+    def generate_ego_networks(self, num_egos, pool_size=None, seed=None):
+        # Bulk synthetic network for load testing: num_egos ego networks over a
+        # shared user pool, merged into one array-backed graph (no networkx).
+        # Reach, propagation, share probabilities and network stats then run
+        # on it directly; users are the integer node ids, egos first. Methods
+        # that need the networkx graph (add_edge, communities, snapshots)
+        # raise ValueError.
+        rng = RandomStreams(seed).stream(DEFAULT_STREAM)
+        networks = generate_ego_networks(num_egos, rng, pool_size)
+
+        self.graph.clear()
+        self.current_user = None
+        self.communities = None
+        self.community_index = None
+        self.reach_index = networks.reach_index()
+        self.in_degree = np.bincount(self.reach_index.indices, minlength=self.reach_index.num_nodes)
+        influence, susceptibility = propagation_factors(networks.followers_count, networks.following_count)
+        self.edge_probabilities = edge_probabilities(self.reach_index.indptr, self.reach_index.indices,
+                                                     self.share_probability, influence, susceptibility)
+        return networks
+
+    def require_graph(self, operation):
+        if self.in_degree is not None:
+            raise ValueError(f"{operation} needs the networkx graph, which generated ego networks do not have")
+
     def get_network_stats(self, username):
+        if self.in_degree is not None:
+            # Ego-network mode: following is the CSR out-degree
+            reach_index = self.reach_index
+            # Users are integer node ids here; a name is simply not one of them
+            if not isinstance(username, (int, np.integer)) or not 0 <= username < reach_index.num_nodes:
+                raise KeyError(f"unknown user {username!r}")
+            followers = int(self.in_degree[username])
+            following = int(reach_index.indptr[username + 1] - reach_index.indptr[username])
+            return {
+                'direct_connections': followers + following,
+                'followers': followers,
+                'following': following,
+                'total_network_size': reach_index.num_nodes
+            }
         followers = list(self.graph.predecessors(username))
         following = list(self.graph.successors(username))
         return {
@@ -100,129 +217,219 @@ class MisinformationAnalyzer:
         }
 
     def visualize_ego_network(self, username, depth=1):
-        ego_graph = nx.ego_graph(self.graph, username, radius=depth)
-        plt.figure(figsize=(12, 8))
-        pos = nx.spring_layout(ego_graph)
-        nx.draw(ego_graph, pos, with_labels=True, node_color='lightblue', 
-                node_size=500, font_size=10, font_weight='bold')
-        nx.draw_networkx_nodes(ego_graph, pos, nodelist=[username], 
-                               node_color='red', node_size=700)
-        plt.title(f"Ego Network for User {username} (Depth {depth})")
-        plt.savefig(f"ego_network_{username}.png")
-        plt.close()
+        # Sampled view (at most a few hundred users) with a cached layout, so
+        # the image costs the same for any network size
+        reach_index = self.get_reach_index()
+        render_neighborhood(f"ego_network_{username}.png", reach_index.indptr, reach_index.indices,
+                            reach_index.to_index(username), depth, labels=None if reach_index.node_ids is None else reach_index.node_ids.ids,
+                            title=f"Ego Network for User {username} (Depth {depth})", graph_key=self.get_layout_key())
 
     def detect_communities(self):
+        self.require_graph("detect_communities")
         undirected_graph = self.graph.to_undirected()
         self.communities = community_louvain.best_partition(undirected_graph)
+        self.community_index = CommunityIndex(self.graph, self.communities)
         return self.communities
 
+    def add_edge(self, from_node, to_node):
+        self.require_graph("add_edge")
+        if self.community_index is not None:
+            self.community_index.add_edge(self.graph, from_node, to_node)
+        self.graph.add_edge(from_node, to_node)
+        self.reach_index = None
+        self.edge_probabilities = None
+
     def get_community_stats(self, username):
         if self.communities is None:
             self.detect_communities()
 
-        user_community = self.communities[username]
-        connected_communities = set()
-        nodes_in_user_community = 0
-        directly_connected_nodes = 0
-
-        for node, community in self.communities.items():
-            if community == user_community:
-                nodes_in_user_community += 1
-            if self.graph.has_edge(username, node) or self.graph.has_edge(node, username):
-                connected_communities.add(community)
-                directly_connected_nodes += 1
-
-        return {
-            'total_communities': len(set(self.communities.values())),
-            'user_community_size': nodes_in_user_community,
-            'connected_communities': len(connected_communities),
-            'directly_connected_nodes': directly_connected_nodes
-        }
+        return self.community_index.get_stats(username)
 
     def visualize_communities(self, username):
+        # One marker per community, sized by membership, instead of a layout of
+        # every user; the user's community is circled
         if self.communities is None:
             self.detect_communities()
 
-        plt.figure(figsize=(12, 8))
-        pos = nx.spring_layout(self.graph)
-        
-        nx.draw_networkx_nodes(self.graph, pos, node_color=list(self.communities.values()), 
-                               cmap=plt.cm.get_cmap("Set3"), node_size=100)
-        nx.draw_networkx_edges(self.graph, pos, alpha=0.5)
-        nx.draw_networkx_nodes(self.graph, pos, nodelist=[username], 
-                               node_color='red', node_size=200)
-
-        plt.title(f"Network Communities (User: {username})")
-        plt.axis('off')
-        plt.savefig(f"community_network_{username}.png")
-        plt.close()
+        reach_index = self.get_reach_index()
+        communities = np.array([self.communities[node] for node in reach_index.node_ids.ids.tolist()], dtype=np.int64)
+        render_communities(f"community_network_{username}.png", reach_index.indptr, reach_index.indices,
+                           communities, highlight=self.communities[username],
+                           title=f"Network Communities (User: {username})", graph_key=self.get_layout_key())
 
     def analyze_message(self, message):
-        tokens = word_tokenize(message.lower())
-        filtered_tokens = [word for word in tokens if word not in self.stop_words]
-        misinformation_score = sum(1 for word in filtered_tokens if word in self.misinformation_keywords)
-        return misinformation_score / len(filtered_tokens) if filtered_tokens else 0
+        return keyword_score(message, self.stop_words, self.misinformation_keywords)
 
     def get_sentiment(self, message):
-        analysis = TextBlob(message)
-        return analysis.sentiment.polarity
-
-    def propagate_message(self, message, start_node):
-        nodes_to_process = [start_node]
-        affected_nodes = set([start_node])
+        return sentiment_score(message)
+
+    def analyze_messages(self, messages, workers=None, chunk_size=10000):
+        # Streams keyword score, sentiment and regex verdict for every message,
+        # in input order; the content-hash memo survives across calls
+        if self.message_scorer is None:
+            self.message_scorer = MessageScorer(self.stop_words, self.misinformation_keywords, workers, chunk_size)
+        return self.message_scorer.score(messages)
+
+    def get_share_probabilities(self):
+        # p = share_probability * influence(u) * susceptibility(v) per edge,
+        # aligned with the reach index CSR. Users without followers_count /
+        # following_count attributes fall back to their in/out degree.
+        if self.edge_probabilities is None:
+            reach_index = self.get_reach_index()
+            nodes = self.graph.nodes
+            node_ids = reach_index.node_ids.ids.tolist()
+            followers = [nodes[node].get('followers_count', self.graph.in_degree(node)) for node in node_ids]
+            following = [nodes[node].get('following_count', self.graph.out_degree(node)) for node in node_ids]
+            influence, susceptibility = propagation_factors(followers, following)
+            self.edge_probabilities = edge_probabilities(reach_index.indptr, reach_index.indices,
+                                                         self.share_probability, influence, susceptibility)
+        return self.edge_probabilities
+
+    def propagate_message(self, message, start_node, rng=None):
+        if rng is None:
+            rng = self.streams.stream(MESSAGE_STREAM, message.get_id())
+        affected, shares = self.simulate_spread(start_node, rng)
+        message.increment_share_count(shares)
+        return affected
+
+    def simulate_spread(self, start_node, rng):
+        # One cascade from start_node; returns the affected ids and the number
+        # of shares
+        reach_index = self.get_reach_index()
+        indptr = reach_index.indptr
+        indices = reach_index.indices
+        probabilities = self.get_share_probabilities()
+
+        start = reach_index.to_index(start_node)
+        nodes_to_process = deque([start])
+        affected = set([start])
+        shares = 0
 
         while nodes_to_process:
-            current_node = nodes_to_process.pop(0)
-            for neighbor in self.graph.neighbors(current_node):
-                if neighbor not in affected_nodes and random.random() < 0.3:  # 30% chance of sharing
-                    message.increment_share_count()
+            current = nodes_to_process.popleft()
+            start, end = indptr[current], indptr[current + 1]
+            # One draw and one comparison per edge, against that edge's probability
+            shared = indices[start:end][rng.random(end - start) < probabilities[start:end]]
+            for neighbor in shared.tolist():
+                if neighbor not in affected:
+                    shares += 1
                     nodes_to_process.append(neighbor)
-                    affected_nodes.add(neighbor)
-
-        return affected_nodes
-
-    def is_misinformation(self, message, spread_percentage):
-        misinfo_pattern = re.compile(r'\b(fake|hoax|conspiracy)\b')
-        return bool(misinfo_pattern.search(message.get_content())) or spread_percentage > 0.1
-
-    def calculate_potential_impact(self, username):
-        ego_graph = nx.ego_graph(self.graph, username, radius=2)
-        return len(ego_graph.nodes()) / self.graph.number_of_nodes()
-
-    def analyze_message_impact(self, username, message_content):
-        message = Message(len(self.messages), message_content, username)
-        self.messages.append(message)
-
-        affected_nodes = self.propagate_message(message, username)
-        spread_percentage = len(affected_nodes) / self.graph.number_of_nodes()
-
-        misinformation_score = self.analyze_message(message_content)
-        sentiment = self.get_sentiment(message_content)
-        potential_impact = self.calculate_potential_impact(username)
-
-        print(f"\nMessage Analysis:")
-        print(f"Content: {message_content}")
-        print(f"Misinformation Score: {misinformation_score:.2f}")
-        print(f"Sentiment: {sentiment:.2f}")
-        print(f"Affected nodes: {len(affected_nodes)}")
-        print(f"Spread percentage: {spread_percentage * 100:.2f}%")
-        print(f"Potential impact (reach): {potential_impact * 100:.2f}%")
-
-        if self.is_misinformation(message, spread_percentage):
-            print("Warning: This message has been flagged as potential misinformation.")
+                    affected.add(neighbor)
+
+        return set(reach_index.to_ids(np.fromiter(affected, dtype=np.int64)).tolist()), shares
+
+    def is_misinformation(self, content, spread_percentage):
+        return bool(MISINFO_PATTERN.search(content)) or spread_percentage > 0.1
+
+    def get_reach_index(self):
+        if self.reach_index is None:
+            self.reach_index = ReachIndex.from_networkx(self.graph)
+        return self.reach_index
+
+    def get_layout_key(self):
+        # Hashed once per reach index rather than on every render
+        reach_index = self.get_reach_index()
+        if self.layout_key is None or self.layout_key[0] is not reach_index:
+            self.layout_key = (reach_index, array_hash(reach_index.indptr, reach_index.indices))
+        return self.layout_key[1]
+
+    def calculate_potential_impact(self, username, approximate=False):
+        # Same 2-hop out-neighbourhood as nx.ego_graph(radius=2), counted without
+        # building the subgraph; approximate=True reads precomputed HLL sketches
+        reach_index = self.get_reach_index()
+        if approximate:
+            reach = reach_index.approximate_reach(username, radius=2)
         else:
-            print("This message has not been flagged as misinformation.")
-
+            reach = reach_index.exact_reach(username, radius=2)
+        return reach / reach_index.num_nodes
+
+    def simulate_message_impact(self, username, message_content, rng=None):
+        # The analysis half of analyze_message_impact; it leaves the message
+        # log alone, so batch and service workers run it and the parent logs
+        # the message with record_message_impact
+        if rng is None:
+            # The stream of the id the message gets when it is logged next
+            rng = self.streams.stream(MESSAGE_STREAM, len(self.messages))
+        affected_nodes, _ = self.simulate_spread(username, rng)
+        spread_percentage = len(affected_nodes) / self.get_reach_index().num_nodes
         return {
-            'misinformation_score': misinformation_score,
-            'sentiment': sentiment,
+            'misinformation_score': self.analyze_message(message_content),
+            'sentiment': self.get_sentiment(message_content),
             'affected_nodes': len(affected_nodes),
             'spread_percentage': spread_percentage,
-            'potential_impact': potential_impact
+            'potential_impact': self.calculate_potential_impact(username),
+            'flagged': self.is_misinformation(message_content, spread_percentage)
         }
 
+    def record_message_impact(self, username, message_content, impact):
+        # Everyone reached besides the user shared the message once
+        message = self.messages.add(message_content, username)
+        message.increment_share_count(impact['affected_nodes'] - 1)
+        if impact['flagged']:
+            message.flag_as_misinformation()
+        return message
+
+    def analyze_message_impact(self, username, message_content, verbose=True, rng=None):
+        impact = self.simulate_message_impact(username, message_content, rng)
+        self.record_message_impact(username, message_content, impact)
+
+        if verbose:
+            print(f"\nMessage Analysis:")
+            print(f"Content: {message_content}")
+            print(f"Misinformation Score: {impact['misinformation_score']:.2f}")
+            print(f"Sentiment: {impact['sentiment']:.2f}")
+            print(f"Affected nodes: {impact['affected_nodes']}")
+            print(f"Spread percentage: {impact['spread_percentage'] * 100:.2f}%")
+            print(f"Potential impact (reach): {impact['potential_impact'] * 100:.2f}%")
+
+            if impact['flagged']:
+                print("Warning: This message has been flagged as potential misinformation.")
+            else:
+                print("This message has not been flagged as misinformation.")
+
+        return impact
+
+def batch_job(analyzer, job, index):
+    username = job["username"]
+    # Consecutive jobs for the same user reuse the network and partition
+    if analyzer.current_user != username:
+        analyzer.generate_simulated_network(username)
+    result = {
+        'network_stats': analyzer.get_network_stats(username),
+        'community_stats': analyzer.get_community_stats(username),
+        'potential_impact': analyzer.calculate_potential_impact(username)
+    }
+    if job["message"]:
+        # Keyed by input line, so results do not depend on which worker ran the job
+        rng = analyzer.streams.stream(JOB_STREAM, index)
+        result['impact'] = analyzer.simulate_message_impact(username, job["message"], rng=rng)
+    return result
+
+def record_batch_job(analyzer, job, index, result):
+    # Logs the job's message in the parent, in input order
+    if job["message"]:
+        analyzer.record_message_impact(job["username"], job["message"], result['impact'])
+    return result
+
 def main():
-    analyzer = MisinformationAnalyzer()
+    parser = argparse.ArgumentParser(description="Misinformation analysis on simulated ego networks")
+    parser.add_argument("--batch", type=str, default=None, help="Read (username, message) jobs from this file ('-' for stdin) instead of prompting")
+    parser.add_argument("--output", type=str, default="-", help="Where batch mode writes JSONL results ('-' for stdout)")
+    parser.add_argument("--seed", type=int, default=None, help="Root seed for all random streams (default: fresh entropy)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: all cores)")
+    parser.add_argument("--serve", type=int, default=None, metavar="PORT", help="Keep the analyzer loaded and answer HTTP/JSON queries on this port")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address for --serve (default: localhost only)")
+    args = parser.parse_args()
+
+    analyzer = MisinformationAnalyzer(seed=args.seed)
+
+    if args.batch:
+        run_batch(analyzer, batch_job, record_batch_job, args.batch, args.output, "username", args.workers)
+        return
+
+    if args.serve is not None:
+        serve(AnalyzerQueries(analyzer), args.host, args.serve, args.workers, sys.stdout)
+        return
 
     while True:
         username = input("\nEnter a username: ")
@@ -1,94 +1,45 @@
-import networkx as nx
-from collections import defaultdict
-import random
 import time
-import re
+import numpy as np
+from csrgraph import CSRGraph
+from communityanalyzer import CommunityAnalyzer, Graph, MISINFO_PATTERN, batch_job, record_batch_job, next_graph_version
+from eventsim import EventSimulator
+from visualize import render_communities, render_neighborhood
+from dynamic import DynamicLouvain
+from edgeloader import load_edge_list, count_nodes, source_signature
+from snapshot import load_snapshot
+from batchjobs import run_batch
+from service import serve, LouvainQueries
+from messagestore import Message
+from spreaddetector import SpreadDetector
 import argparse
+import sys
+import os
 import math
 
-class Graph:
-    def __init__(self):
-        self.adjacency_list = defaultdict(list)
-        self.node_degrees = defaultdict(float)
-        self.total_edges = 0
-
-    def add_edge(self, from_node, to_node):
-        self.adjacency_list[from_node].append(to_node)
-        self.adjacency_list[to_node].append(from_node)
-        self.node_degrees[from_node] += 1
-        self.node_degrees[to_node] += 1
-        self.total_edges += 1
-
-    def get_neighbors(self, node):
-        return self.adjacency_list[node]
-
-    def get_degree(self, node):
-        return self.node_degrees[node]
-
-    def get_total_edges(self):
-        return self.total_edges
-
-    def get_nodes(self):
-        return list(self.adjacency_list.keys())
-
-class Message:
-    class State:
-        CREATED = 0
-        SHARED = 1
-        VIRAL = 2
-        FLAGGED = 3
-
-    def __init__(self, id, content, source_node, shared_threshold, viral_threshold):
-        self.id = id
-        self.content = content
-        self.source_node = source_node
-        self.state = self.State.CREATED
-        self.share_count = 0
-        self.shared_threshold = shared_threshold
-        self.viral_threshold = viral_threshold
-
-    def get_id(self):
-        return self.id
-
-    def get_content(self):
-        return self.content
-
-    def get_source_node(self):
-        return self.source_node
-
-    def get_state(self):
-        return self.state
-
-    def get_share_count(self):
-        return self.share_count
-
-    def increment_share_count(self):
-        self.share_count += 1
-        self.update_state()
-
-    def flag_as_misinformation(self):
-        self.state = self.State.FLAGGED
-
-    def update_state(self):
-        if self.share_count > self.viral_threshold:
-            self.state = self.State.VIRAL
-        elif self.share_count > self.shared_threshold:
-            self.state = self.State.SHARED
-
-class LouvainCommunityDetection:
-    def __init__(self, graph_size, base_share_probability=0.3, base_viral_threshold=100, base_shared_threshold=10, base_misinformation_spread_threshold=0.1):
-        self.graph = Graph()
-        self.communities = []
-        self.modularity = 0
-        self.messages = []
-        self.rng = random.Random()
+BASE_PARAMETERS = ('base_share_probability', 'base_viral_threshold', 'base_shared_threshold', 'base_misinformation_spread_threshold')
+
+class LouvainCommunityDetection(CommunityAnalyzer):
+    SNAPSHOT_PARAMETERS = ('graph_size',) + BASE_PARAMETERS + CommunityAnalyzer.SNAPSHOT_PARAMETERS
+
+    def __init__(self, graph_size, base_share_probability=0.3, base_viral_threshold=100, base_shared_threshold=10, base_misinformation_spread_threshold=0.1, seed=None):
         self.graph_size = graph_size
+        self.base_share_probability = base_share_probability
+        self.base_viral_threshold = base_viral_threshold
+        self.base_shared_threshold = base_shared_threshold
+        self.base_misinformation_spread_threshold = base_misinformation_spread_threshold
         
         # Dynamic parameters based on graph size
-        self.share_probability = self.calculate_share_probability(base_share_probability)
-        self.viral_threshold = self.calculate_viral_threshold(base_viral_threshold)
-        self.shared_threshold = self.calculate_shared_threshold(base_shared_threshold)
-        self.misinformation_spread_threshold = self.calculate_misinformation_spread_threshold(base_misinformation_spread_threshold)
+        super().__init__(seed,
+                         share_probability=self.calculate_share_probability(base_share_probability),
+                         shared_threshold=self.calculate_shared_threshold(base_shared_threshold),
+                         viral_threshold=self.calculate_viral_threshold(base_viral_threshold),
+                         misinformation_spread_threshold=self.calculate_misinformation_spread_threshold(base_misinformation_spread_threshold))
+        self.dynamic = None
+        # Rapid-spread detection over timestamped share events; the window is
+        # in simulation time units
+        self.spread_detector = None
+        self.spread_window = 1.0
+        self.content_scores = np.zeros(0)
 
     def calculate_share_probability(self, base_prob):
         # Decrease share probability for larger graphs to prevent excessive spreading
@@ -106,158 +57,117 @@ class LouvainCommunityDetection:
         # Decrease misinformation spread threshold for larger graphs
         return base_threshold / math.log10(self.graph_size + 1)
 
-    def calculate_modularity(self):
-        community_internal_edges = [0] * len(self.communities)
-        community_total_edges = [0] * len(self.communities)
-        m = self.graph.get_total_edges()
-        Q = 0
-
-        for node in self.graph.get_nodes():
-            comm = self.communities[node]
-            node_degree = self.graph.get_degree(node)
-            community_total_edges[comm] += node_degree
-
-            for neighbor in self.graph.get_neighbors(node):
-                if self.communities[neighbor] == comm:
-                    community_internal_edges[comm] += 1
-
-        for i in range(len(self.communities)):
-            if community_total_edges[i] > 0:
-                Q += (community_internal_edges[i] / (2 * m)) - (community_total_edges[i] / (2 * m)) ** 2
-
-        return Q
-
-    def move_node(self, node):
-        current_community = self.communities[node]
-        community_gains = defaultdict(float)
-
-        for neighbor in self.graph.get_neighbors(node):
-            neighbor_community = self.communities[neighbor]
-            community_gains[neighbor_community] += 1
-
-        best_community = current_community
-        best_gain = 0
-
-        for community, gain in community_gains.items():
-            gain -= (self.graph.get_degree(node) * community_gains[community] / (2 * self.graph.get_total_edges()))
-            if gain > best_gain:
-                best_gain = gain
-                best_community = community
-
-        if best_community != current_community:
-            self.communities[node] = best_community
-
-    def load_graph(self, filename):
-        with open(filename, 'r') as file:
-            for line in file:
-                if line[0] == '#':
-                    continue
-                from_node, to_node = map(int, line.split())
-                self.graph.add_edge(from_node, to_node)
-
-        self.communities = list(range(len(self.graph.get_nodes())))
-
-    def detect_communities(self):
-        improvement = True
-        while improvement:
-            improvement = False
-            for node in self.graph.get_nodes():
-                old_community = self.communities[node]
-                self.move_node(node)
-                if self.communities[node] != old_community:
-                    improvement = True
-
-        self.modularity = self.calculate_modularity()
-
-        unique_communities = set(self.communities)
-        return len(unique_communities)
-
-    def get_modularity(self):
-        return self.modularity
-
-    class NodeInfo:
-        def __init__(self):
-            self.community = 0
-            self.connected_communities = set()
-            self.directly_connected_nodes = []
-            self.all_connected_nodes = set()
-
-    def get_node_info(self, target_node):
-        info = self.NodeInfo()
-        info.community = self.communities[target_node]
-
-        visited = set()
-        queue = [target_node]
-        visited.add(target_node)
-
-        while queue:
-            current_node = queue.pop(0)
-            for neighbor in self.graph.get_neighbors(current_node):
-                if current_node == target_node:
-                    info.directly_connected_nodes.append(neighbor)
-
-                info.connected_communities.add(self.communities[neighbor])
-                info.all_connected_nodes.add(neighbor)
-
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
-
-        return info
-
-    def initiate_message(self, source_node, content):
-        message = Message(len(self.messages), content, source_node, self.shared_threshold, self.viral_threshold)
-        self.messages.append(message)
-        self.propagate_message(message)
-
-    def propagate_message(self, message, start_node=-1):
-        if start_node == -1:
-            start_node = message.get_source_node()
-
-        nodes_to_process = [start_node]
-        affected_nodes = set([start_node])
-
-        while nodes_to_process:
-            current_node = nodes_to_process.pop(0)
-            for neighbor in self.graph.get_neighbors(current_node):
-                if neighbor not in affected_nodes and self.should_share_message():
-                    self.messages[message.get_id()].increment_share_count()
-                    nodes_to_process.append(neighbor)
-                    affected_nodes.add(neighbor)
-
-        return affected_nodes
-
-    def should_share_message(self):
-        return self.rng.random() < self.share_probability
-
-    def is_misinformation(self, message, spread_percentage):
-        misinfo_pattern = re.compile(r'\b(fake|hoax|conspiracy)\b')
-        return bool(misinfo_pattern.search(message.get_content())) or spread_percentage > self.misinformation_spread_threshold
-
-    def analyze_message_impact(self, target_node, message_content=""):
-        content = message_content if message_content else "Sample message from target node"
-        target_message = Message(len(self.messages), content, target_node, self.shared_threshold, self.viral_threshold)
-        self.messages.append(target_message)
-
-        affected_nodes = self.propagate_message(target_message, target_node)
-        spread_percentage = len(affected_nodes) / len(self.graph.get_nodes())
-
-        print(f"Message from target node {target_node}:")
-        print(f"Content: {content}")
-        print(f"Affected nodes: {len(affected_nodes)}")
-        print(f"Spread percentage: {spread_percentage * 100:.2f}%")
-
-        if self.is_misinformation(target_message, spread_percentage):
-            print("This message has been flagged as potential misinformation.")
-        else:
-            print("This message has not been flagged as misinformation.")
-
-        has_misinfo_message = any(
-            message.get_source_node() == target_node and message.get_state() == Message.State.FLAGGED
-            for message in self.messages
-        )
-
-        print(f"Target node {'has' if has_misinfo_message else 'does not have'} flagged misinformation messages.")
+    def load_graph(self, filename, backend="dict"):
+        super().load_graph(filename, backend)
+        self.dynamic = None
+
+    def detect_communities(self, use_parallel=False, workers=None):
+        num_communities = super().detect_communities(use_parallel, workers)
+        self.dynamic = None
+        return num_communities
+
+    def apply_edge_updates(self, insertions=(), deletions=()):
+        # Applies one batch of (from_node, to_node) changes and repairs the
+        # partition around them; returns the number of community moves made.
+        # Ids not seen before get the next free indices.
+        if isinstance(self.graph, CSRGraph):
+            raise TypeError("edge updates need the dict backend; load the graph with backend='dict'")
+        if self.dynamic is None:
+            self.dynamic = DynamicLouvain(self.graph, self.communities)
+        deletions = self.node_ids.to_index(np.asarray(deletions).reshape(-1, 2)) if len(deletions) else ()
+        insertions = self.node_ids.extend(np.asarray(insertions).reshape(-1, 2)) if len(insertions) else ()
+        insertions = np.asarray(insertions).tolist()
+        deletions = np.asarray(deletions).tolist()
+        moves = self.dynamic.apply(insertions, deletions)
+        if self.graph_version is not None:
+            self.graph_version = next_graph_version(self.graph_version, "+", insertions, "-", deletions)
+        self.communities = self.dynamic.communities
+        self.community_hierarchy = [np.asarray(self.communities, dtype=np.int64)]
+        self.modularity_tracker = self.dynamic.tracker
+        self.modularity = self.dynamic.modularity
+        if self.influence is not None and len(self.influence) < len(self.node_ids):
+            # New users have no attributes yet: neutral factors
+            grow = np.ones(len(self.node_ids) - len(self.influence))
+            self.influence = np.concatenate([self.influence, grow])
+            self.susceptibility = np.concatenate([self.susceptibility, grow])
+        # Patch the CSR copy in place of the O(|E|) rebuild from the dict graph
+        if self.csr_graph is not None:
+            self.csr_graph = self.csr_graph.patched(insertions, deletions, len(self.node_ids))
+        self.clear_query_caches()
+        return moves
+
+    @classmethod
+    def from_snapshot(cls, path, source_file=None, seed=None, expected=None):
+        # Built with the graph size and base parameters stored in the snapshot.
+        # Raises ValueError when any entry of `expected` (e.g. the base
+        # parameters or node_attributes asked for now) differs from the snapshot.
+        arrays, meta = load_snapshot(path, source_file)
+        changed = sorted(name for name, value in (expected or {}).items() if meta.get(name) != value)
+        if changed:
+            raise ValueError(f"snapshot {path} was taken with different {', '.join(changed)}")
+        lcd = cls(meta['graph_size'], seed=seed, **{name: meta[name] for name in BASE_PARAMETERS})
+        lcd.restore_snapshot(arrays, meta, source_file)
+        return lcd
+
+    def restore_snapshot(self, arrays, meta, source_file=None):
+        super().restore_snapshot(arrays, meta, source_file)
+        self.spread_detector = None
+        self.content_scores = np.zeros(0)
+        self.dynamic = None
+
+    def visualize_communities(self, filename, target_node=None):
+        # Community super-graph with a layout cached per graph and partition
+        graph = self.get_csr_graph()
+        highlight = int(self.communities[self.node_index(target_node)]) if target_node is not None else None
+        render_communities(filename, graph.indptr, graph.indices, np.asarray(self.communities, dtype=np.int64),
+                           highlight=highlight, title="Communities" if target_node is None else f"Communities (node {target_node})",
+                           graph_key=self.graph_version)
+
+    def visualize_neighborhood(self, filename, node, radius=2):
+        graph = self.get_csr_graph()
+        render_neighborhood(filename, graph.indptr, graph.indices, self.node_index(node), radius, labels=self.node_ids.ids,
+                            title=f"Neighbourhood of node {node} (radius {radius})", graph_key=self.graph_version)
+
+    def simulate_message_events(self, sources, start_times=None, mean_delay=1.0, horizon=np.inf, contents=None):
+        # Time-stepped spread of many concurrent messages (one per source entry)
+        # with exponential per-edge delays; the returned trace has the FSM
+        # transitions with timestamps, time-to-viral and shares per window.
+        # With contents, the messages are also logged and their share events
+        # run through the rapid-spread detector, which flags them as they go.
+        simulator = EventSimulator.from_graph(self.get_csr_graph(), self.get_share_probabilities(), mean_delay, self.np_rng,
+                                              shared_threshold=self.shared_threshold,
+                                              viral_threshold=self.viral_threshold)
+        sources = np.atleast_1d(sources)
+        trace = simulator.run(self.node_ids.to_index(sources), start_times, horizon, self.np_rng)
+        if contents is not None:
+            ids = self.messages.add_many(contents, [self.node_id(self.node_index(node)) for node in sources.tolist()])
+            self.messages.add_shares(ids, trace.share_count)
+            self.ingest_share_events(ids[trace.share_message], trace.share_time)
+        return trace
+
+    def get_spread_detector(self):
+        # Flags a message whose shares within spread_window reach
+        # misinformation_spread_threshold of the network (half that for
+        # content matching the misinformation pattern)
+        if self.spread_detector is None:
+            self.spread_detector = SpreadDetector(self.misinformation_spread_threshold * self.graph_size, self.spread_window)
+        return self.spread_detector
+
+    def get_content_scores(self, message_ids):
+        # Content score of each message, computed once per distinct content
+        contents = self.messages.contents
+        if len(self.content_scores) < len(contents):
+            new_scores = [1.0 if MISINFO_PATTERN.search(content) else 0.0 for content in contents[len(self.content_scores):]]
+            self.content_scores = np.concatenate([self.content_scores, new_scores])
+        return self.content_scores[self.messages.content[np.asarray(message_ids, dtype=np.int64)]]
+
+    def ingest_share_events(self, message_ids, times):
+        # Streams (message id, time) share events, in time order, through the
+        # detector and marks what it flags as FLAGGED; returns (ids, flag times)
+        flagged, flag_times = self.get_spread_detector().ingest(message_ids, times, self.get_content_scores(message_ids),
+                                                                lambda ids: self.messages.state[ids] == Message.State.FLAGGED)
+        self.messages.flag(flagged)
+        return flagged, flag_times
 
 def main():
     parser = argparse.ArgumentParser(description="Louvain Community Detection with dynamic parameters")
@@ -266,40 +176,93 @@ def main():
     parser.add_argument("--base-viral-threshold", type=int, default=100, help="Base share count for viral status")
     parser.add_argument("--base-shared-threshold", type=int, default=10, help="Base share count for shared status")
     parser.add_argument("--base-misinfo-threshold", type=float, default=0.1, help="Base spread percentage for misinformation")
+    parser.add_argument("--backend", choices=["dict", "csr"], default="dict", help="Graph storage backend")
+    parser.add_argument("--parallel", action="store_true", help="Run community detection in worker processes")
+    parser.add_argument("--seed", type=int, default=None, help="Root seed for all random streams (default: fresh entropy)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: all cores)")
+    parser.add_argument("--batch", type=str, default=None, help="Read (node, message) jobs from this file ('-' for stdin) instead of prompting")
+    parser.add_argument("--output", type=str, default="-", help="Where batch mode writes JSONL results ('-' for stdout)")
+    parser.add_argument("--node-attributes", type=str, default=None, help="Side file of 'node followers following' lines for per-edge share probabilities")
+    parser.add_argument("--snapshot", type=str, default=None, help="Snapshot directory: reuse it if the edge list is unchanged, otherwise write it after detection")
+    parser.add_argument("--serve", type=int, default=None, metavar="PORT", help="Keep the analyzer loaded and answer HTTP/JSON queries on this port")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address for --serve (default: localhost only)")
     args = parser.parse_args()
-
-    # Load graph and get its size
-    G = nx.read_edgelist(args.graph_file, nodetype=int)
-    graph_size = G.number_of_nodes()
-
-    lcd = LouvainCommunityDetection(
-        graph_size=graph_size,
-        base_share_probability=args.base_share_prob,
-        base_viral_threshold=args.base_viral_threshold,
-        base_shared_threshold=args.base_shared_threshold,
-        base_misinformation_spread_threshold=args.base_misinfo_threshold
-    )
-    lcd.load_graph(args.graph_file)
-
-    start_time = time.time()
-    num_communities = lcd.detect_communities()
-    end_time = time.time()
-    execution_time = end_time - start_time
-
-    print(f"\nGraph size: {graph_size} nodes")
-    print(f"Number of communities detected: {num_communities}")
-    print(f"Execution time: {execution_time:.2f} seconds")
-    print(f"\nDynamic Parameters:")
-    print(f"Share probability: {lcd.share_probability:.4f}")
-    print(f"Viral threshold: {lcd.viral_threshold}")
-    print(f"Shared threshold: {lcd.shared_threshold}")
-    print(f"Misinformation spread threshold: {lcd.misinformation_spread_threshold:.4f}")
-
-    lcd.initiate_message(1, "This is a normal message.")
-    lcd.initiate_message(10, "FAKE: Earth is flat! Share this conspiracy theory!")
-    lcd.initiate_message(100, "COVID-19 vaccine contains microchips. This is a hoax!")
-
-    target_node = int(input("\nEnter a target node: "))
+    # Keep stdout clean for JSONL results in batch mode
+    log = sys.stderr if args.batch else sys.stdout
+
+    # A snapshot is reused only if it was taken with the same base parameters
+    # and node attribute file
+    expected = {
+        'base_share_probability': args.base_share_prob,
+        'base_viral_threshold': args.base_viral_threshold,
+        'base_shared_threshold': args.base_shared_threshold,
+        'base_misinformation_spread_threshold': args.base_misinfo_threshold,
+        'node_attributes': source_signature(args.node_attributes) if args.node_attributes else None,
+    }
+    lcd = None
+    if args.snapshot and os.path.exists(os.path.join(args.snapshot, "manifest.json")):
+        start_time = time.time()
+        try:
+            lcd = LouvainCommunityDetection.from_snapshot(args.snapshot, args.graph_file, args.seed, expected)
+        except ValueError as error:
+            print(f"Ignoring snapshot: {error}", file=log)
+        else:
+            graph_size = lcd.graph_size
+            num_communities = len(set(np.asarray(lcd.communities)[lcd.graph.get_nodes()].tolist()))
+            execution_time = time.time() - start_time
+
+    if lcd is None:
+        # Parse the edge list once (or memory-map its cache) to size the parameters
+        graph_size = count_nodes(load_edge_list(args.graph_file))
+
+        lcd = LouvainCommunityDetection(
+            graph_size=graph_size,
+            base_share_probability=args.base_share_prob,
+            base_viral_threshold=args.base_viral_threshold,
+            base_shared_threshold=args.base_shared_threshold,
+            base_misinformation_spread_threshold=args.base_misinfo_threshold,
+            seed=args.seed
+        )
+        lcd.load_graph(args.graph_file, backend=args.backend)
+        if args.node_attributes:
+            lcd.load_node_attributes(args.node_attributes)
+
+        start_time = time.time()
+        num_communities = lcd.detect_communities(args.parallel, args.workers)
+        end_time = time.time()
+        execution_time = end_time - start_time
+
+        if args.snapshot:
+            lcd.save_snapshot(args.snapshot)
+
+    print(f"\nGraph size: {graph_size} nodes", file=log)
+    print(f"Number of communities detected: {num_communities}", file=log)
+    print(f"Execution time: {execution_time:.2f} seconds", file=log)
+    print(f"\nDynamic Parameters:", file=log)
+    print(f"Share probability: {lcd.share_probability:.4f}", file=log)
+    print(f"Viral threshold: {lcd.viral_threshold}", file=log)
+    print(f"Shared threshold: {lcd.shared_threshold}", file=log)
+    print(f"Misinformation spread threshold: {lcd.misinformation_spread_threshold:.4f}", file=log)
+
+    if args.batch:
+        run_batch(lcd, batch_job, record_batch_job, args.batch, args.output, "node", args.workers)
+        return
+
+    if args.serve is not None:
+        serve(LouvainQueries(lcd), args.host, args.serve, args.workers, log)
+        return
+
+    demo_messages = [
+        (1, "This is a normal message."),
+        (10, "FAKE: Earth is flat! Share this conspiracy theory!"),
+        (100, "COVID-19 vaccine contains microchips. This is a hoax!"),
+    ]
+    for node, content in demo_messages:
+        # Sparse or named ids need not include these
+        if node in lcd.node_ids:
+            lcd.initiate_message(node, content)
+
+    target_node = lcd.parse_node(input("\nEnter a target node: "))
     message_content = input("Enter a message for the target node (press Enter for default): ")
 
     lcd.analyze_message_impact(target_node, message_content)
@@ -310,7 +273,7 @@ def main():
     print(f"Community: {node_info.community}")
     print(f"Number of connected communities: {len(node_info.connected_communities)}")
     print(f"Number of directly connected nodes: {len(node_info.directly_connected_nodes)}")
-    print(f"Total number of connected nodes from all communities: {len(node_info.all_connected_nodes)}")
+    print(f"Total number of connected nodes from all communities: {node_info.component_size}")
 
     print("Directly connected nodes:", end=" ")
     print(*node_info.directly_connected_nodes)
@@ -0,0 +1,137 @@
+import numpy as np
+
+
+class NodeIdMap:
+    # External node ids (64-bit platform ids, usernames) <-> dense indices
+    # 0..n-1. Graph arrays, partitions and per-node factors are all indexed by
+    # these, so memory follows |V| rather than the largest id. Lookups binary
+    # search a sorted copy of the ids: no per-node Python objects.
+    def __init__(self, ids, order=None):
+        self.ids = np.asarray(ids)
+        # ids[order] is sorted; None when the ids are sorted already
+        self.order = order
+        self.sorted_ids = self.ids if order is None else self.ids[order]
+
+    @classmethod
+    def from_ids(cls, ids):
+        # Keeps the given order (e.g. networkx node order); ids must be unique
+        ids = np.asarray(ids)
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        if len(ids) > 1 and np.any(sorted_ids[1:] == sorted_ids[:-1]):
+            raise ValueError("node ids are not unique")
+        return cls(ids, order.astype(index_dtype(len(ids))))
+
+    @classmethod
+    def from_edges(cls, edges):
+        # One sort over every endpoint gives both the (sorted) ids and every
+        # endpoint's index. Returns the map and the edges as index pairs.
+        edges = np.asarray(edges)
+        flat = edges.reshape(-1)
+        order = np.argsort(flat, kind='stable')
+        values = flat[order]
+        first = np.r_[True, values[1:] != values[:-1]] if len(values) else np.zeros(0, dtype=bool)
+        ids = values[first]
+        indices = np.empty(len(flat), dtype=index_dtype(len(ids)))
+        indices[order] = np.cumsum(first) - 1
+        return cls(ids), indices.reshape(edges.shape)
+
+    @classmethod
+    def identity(cls, num_nodes):
+        return cls(np.arange(num_nodes, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, node):
+        return self.lookup(node) >= 0
+
+    @property
+    def is_identity(self):
+        # Sorted unique integer ids running from 0 to n - 1 are their own indices
+        if self.order is not None or self.ids.dtype.kind not in 'iu':
+            return False
+        return not len(self.ids) or (self.ids[0] == 0 and self.ids[-1] == len(self.ids) - 1)
+
+    def lookup(self, nodes):
+        # Index of every node, -1 for ids that are not in the map
+        nodes = np.asarray(nodes)
+        missing = np.full(nodes.shape, -1, dtype=np.int64)[()]
+        if not len(self.ids):
+            return missing
+        try:
+            positions = np.minimum(np.searchsorted(self.sorted_ids, nodes), len(self.ids) - 1)
+            found = self.sorted_ids[positions] == nodes
+        except (TypeError, np.exceptions.DTypePromotionError):
+            # e.g. a username looked up in a map of integer ids
+            return missing
+        indices = positions if self.order is None else self.order[positions]
+        return np.where(found, indices, -1)[()]
+
+    def to_index(self, nodes):
+        # Like lookup, but raises KeyError for an unknown id; a scalar in gives
+        # a Python int out
+        indices = self.lookup(nodes)
+        if np.any(indices < 0):
+            missing = np.asarray(nodes).reshape(-1)[np.asarray(indices).reshape(-1) < 0][0]
+            raise KeyError(f"unknown node id {missing}")
+        return int(indices) if np.ndim(indices) == 0 else indices
+
+    def to_id(self, index):
+        return self.ids[index].item()
+
+    def to_ids(self, indices):
+        return self.ids[np.asarray(indices, dtype=np.int64)]
+
+    def parse(self, text):
+        # A node id typed on the command line or read from a job file
+        if self.ids.dtype.kind in 'iu':
+            return int(text)
+        return str(text)
+
+    def extend(self, nodes):
+        # Index of every node, appending ids seen for the first time in order
+        # of first appearance; existing indices never change. The new ids are
+        # merged into the sorted lookup, so the existing ids are not re-sorted.
+        nodes = np.asarray(nodes)
+        indices = np.array(self.lookup(nodes), dtype=np.int64, ndmin=1).reshape(nodes.shape)
+        missing = indices < 0
+        if not np.any(missing):
+            return indices
+        new = nodes[missing]
+        order = np.argsort(new, kind='stable')
+        values = new[order]
+        first = np.r_[True, values[1:] != values[:-1]]
+        added = new[np.sort(order[first])]
+        start = len(self.ids)
+        ids = np.concatenate([self.ids, added])
+
+        added_order = np.argsort(added, kind='stable')
+        added_sorted = added[added_order]
+        positions = np.searchsorted(self.sorted_ids, added_sorted)
+        if self.order is None and np.all(positions == start) and np.all(added_order[1:] > added_order[:-1]):
+            # Appended past the largest id, in sorted order: still sorted
+            self.__init__(ids)
+        else:
+            dtype = index_dtype(len(ids))
+            current = np.arange(start, dtype=dtype) if self.order is None else self.order.astype(dtype, copy=False)
+            self.ids = ids
+            self.order = np.insert(current, positions, (start + added_order).astype(dtype))
+            self.sorted_ids = np.insert(self.sorted_ids.astype(ids.dtype, copy=False), positions, added_sorted)
+        indices[missing] = self.lookup(new)
+        return indices
+
+    def arrays(self):
+        # For snapshots: the ids and, when they are not sorted, the lookup order
+        arrays = {'node_ids': self.ids}
+        if self.order is not None:
+            arrays['node_id_order'] = self.order
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['node_ids'], arrays.get('node_id_order'))
+
+
+def index_dtype(num_nodes):
+    return np.int32 if num_nodes < 2 ** 31 else np.int64
@@ -0,0 +1,53 @@
+import numpy as np
+
+
+def propagation_factors(followers, following):
+    # influence(u) grows with the audience u posts to and susceptibility(v)
+    # with how many accounts v follows. Both are log-scaled, so a user with no
+    # followers still shares, just less.
+    influence = 1 + np.log1p(np.asarray(followers, dtype=np.float64))
+    susceptibility = 1 + np.log1p(np.asarray(following, dtype=np.float64))
+    return influence, susceptibility
+
+
+def read_node_attributes(filename, num_nodes=None, node_ids=None):
+    # Side file with one "node followers following" line per node ('#' lines
+    # are comments). Returns dense follower/following arrays indexed by node
+    # (by node_ids index when a NodeIdMap is given); nodes without a line get
+    # the mean counts, and lines for unknown nodes are ignored.
+    data = np.loadtxt(filename, comments='#', dtype=np.int64, ndmin=2)
+    nodes, followers, following = data[:, 0], data[:, 1], data[:, 2]
+    if node_ids is not None:
+        nodes = node_ids.lookup(nodes)
+    if num_nodes is None:
+        num_nodes = len(node_ids) if node_ids is not None else int(nodes.max()) + 1 if len(nodes) else 0
+    keep = (nodes >= 0) & (nodes < num_nodes)
+    dense_followers = np.full(num_nodes, followers.mean() if len(followers) else 0.0)
+    dense_following = np.full(num_nodes, following.mean() if len(following) else 0.0)
+    dense_followers[nodes[keep]] = followers[keep]
+    dense_following[nodes[keep]] = following[keep]
+    return dense_followers, dense_following
+
+
+def edge_probabilities(indptr, indices, base_probability, influence, susceptibility):
+    # p = base_probability * influence(u) * susceptibility(v) for every CSR
+    # entry u -> indices[j], in the same order as indices. The factors are
+    # scaled to mean 1 over the edges, so base_probability stays the average.
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    factors = influence[rows] * susceptibility[indices]
+    mean = factors.mean() if len(factors) else 0.0
+    if mean > 0:
+        factors = factors / mean
+    return np.clip(base_probability * factors, 0.0, 1.0)
+
+
+def transpose_probabilities(indptr, indices, probabilities):
+    # For a symmetric adjacency (every u -> v has a v -> u entry): entry v -> u
+    # gets the probability of u -> v, which is what a reverse (RR set) traversal
+    # needs
+    n = len(indptr) - 1
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+    keys = rows * n + indices
+    order = np.argsort(keys, kind='stable')
+    reverse = order[np.searchsorted(keys[order], indices.astype(np.int64) * n + rows)]
+    return probabilities[reverse]
@@ -0,0 +1,111 @@
+import numpy as np
+from csrgraph import k_hop_neighborhood
+from nodeids import NodeIdMap
+
+# Upper bound on gathered register cells held at once while merging sketches
+SKETCH_BLOCK_CELLS = 1 << 26
+SPLITMIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def splitmix64(values):
+    z = values.astype(np.uint64) + SPLITMIX_GAMMA
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def hll_alpha(num_registers):
+    if num_registers == 16:
+        return 0.673
+    if num_registers == 32:
+        return 0.697
+    if num_registers == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / num_registers)
+
+
+class ReachIndex:
+    # Directed reach over CSR arrays (edges point from a user to who sees their
+    # posts). Exact k-hop counts use array frontier unions; sketch mode keeps a
+    # HyperLogLog per node, built ANF style with one pass over the edges per hop,
+    # so approximate reach is an O(1) lookup afterwards. node_ids (a NodeIdMap)
+    # names the nodes; without it nodes are their indices.
+    def __init__(self, indptr, indices, node_ids=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.num_nodes = len(indptr) - 1
+        self.node_ids = node_ids
+        self.estimates = {}
+
+    @classmethod
+    def from_edges(cls, sources, targets, num_nodes, node_ids=None):
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_nodes), out=indptr[1:])
+        return cls(indptr, targets[order], node_ids)
+
+    @classmethod
+    def from_networkx(cls, graph):
+        # Indices follow graph.nodes() order; edges are translated in one lookup
+        node_ids = NodeIdMap.from_ids(list(graph.nodes()))
+        edges = node_ids.to_index(np.array(list(graph.edges())).reshape(-1, 2))
+        return cls.from_edges(edges[:, 0], edges[:, 1], len(node_ids), node_ids)
+
+    def to_index(self, node):
+        return self.node_ids.to_index(node) if self.node_ids is not None else node
+
+    def to_ids(self, indices):
+        return self.node_ids.to_ids(indices) if self.node_ids is not None else np.asarray(indices)
+
+    def exact_reach(self, node, radius=2):
+        # Size of the radius-hop out-neighbourhood, the node itself included
+        return len(k_hop_neighborhood(self, self.to_index(node), radius)) + 1
+
+    def build_sketches(self, radius=2, precision=7):
+        num_registers = 1 << precision
+        hashes = splitmix64(np.arange(self.num_nodes))
+        buckets = (hashes & np.uint64(num_registers - 1)).astype(np.int64)
+        rest = hashes >> np.uint64(precision)
+        # Rank = position of the lowest set bit of the remaining hash bits
+        lowest = rest & (~rest + np.uint64(1))
+        rank = np.where(rest == 0, 65 - precision, np.log2(lowest.astype(np.float64)) + 1).astype(np.uint8)
+
+        registers = np.zeros((self.num_nodes, num_registers), dtype=np.uint8)
+        registers[np.arange(self.num_nodes), buckets] = rank
+
+        has_edges = np.diff(self.indptr) > 0
+        starts = self.indptr[:-1][has_edges]
+        ends = self.indptr[1:][has_edges]
+        rows = np.flatnonzero(has_edges)
+        block = max(1, SKETCH_BLOCK_CELLS // num_registers)
+        for _ in range(radius):
+            # Each hop reads the previous hop's registers only
+            previous = registers.copy()
+            first = 0
+            while first < len(rows):
+                # Rows whose edges fit in one block of gathered registers
+                last = max(first + 1, int(np.searchsorted(ends, starts[first] + block, side='right')))
+                lo, hi = starts[first], ends[last - 1]
+                merged = np.maximum.reduceat(previous[self.indices[lo:hi]], starts[first:last] - lo, axis=0)
+                registers[rows[first:last]] = np.maximum(registers[rows[first:last]], merged)
+                first = last
+
+        self.estimates[radius] = self.estimate_counts(registers)
+        return self.estimates[radius]
+
+    @staticmethod
+    def estimate_counts(registers):
+        num_registers = registers.shape[1]
+        raw = hll_alpha(num_registers) * num_registers ** 2 / np.sum(np.ldexp(1.0, -registers.astype(np.int64)), axis=1)
+        zeros = np.count_nonzero(registers == 0, axis=1)
+        # Linear counting for small cardinalities
+        small = (raw <= 2.5 * num_registers) & (zeros > 0)
+        raw[small] = num_registers * np.log(num_registers / zeros[small])
+        return raw
+
+    def approximate_reach(self, node, radius=2):
+        if radius not in self.estimates:
+            self.build_sketches(radius)
+        return float(self.estimates[radius][self.to_index(node)])
@@ -0,0 +1,35 @@
+import hashlib
+import numpy as np
+
+# Stream kinds; a stream is identified by (kind, index, ...) under one root
+# seed. The values are part of every key, so they are never renumbered.
+DEFAULT_STREAM = 0
+MESSAGE_STREAM = 1
+JOB_STREAM = 2
+QUERY_STREAM = 5
+CONTAINMENT_STREAM = 6
+
+
+def stream_key(value):
+    # Non-negative ints are used as they are; anything else (usernames, node
+    # ids of other types) is hashed to a stable 64-bit int
+    if isinstance(value, (int, np.integer)) and value >= 0:
+        return int(value)
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class RandomStreams:
+    # Independent, reproducible random streams under one root seed. Each key
+    # maps to its own SeedSequence child (spawn_key) driving a Philox counter
+    # generator, so a stream depends only on (seed, key): not on which process
+    # asks for it or in what order. Messages, batch jobs, service queries and
+    # containment runs get disjoint streams, and sharded runs are
+    # bit-identical to serial ones.
+    def __init__(self, seed=None):
+        self.root = np.random.SeedSequence(seed)
+        self.seed = self.root.entropy
+
+    def stream(self, *key):
+        sequence = np.random.SeedSequence(self.root.entropy, spawn_key=tuple(stream_key(part) for part in key))
+        return np.random.Generator(np.random.Philox(sequence))
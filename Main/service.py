@@ -0,0 +1,306 @@
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
+from urllib.parse import parse_qsl, urlsplit
+import numpy as np
+from batchjobs import to_json
+from rngstreams import QUERY_STREAM
+
+ENDPOINTS = ("network_stats", "community_stats", "node_info", "potential_impact", "analyze_message_impact")
+MAX_BODY_BYTES = 1 << 20
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+# Set in the parent before the pool forks, as in batchjobs, so workers share
+# the resident graph copy-on-write
+service_queries = None
+
+
+class LouvainQueries:
+    # The service endpoints over a loaded LouvainCommunityDetection (mess2 or
+    # messdynmic). Requests name a node with "node"; the graph is undirected,
+    # so there is no follower/following split.
+    key = "node"
+
+    def __init__(self, lcd):
+        self.lcd = lcd
+        self.streams = lcd.streams
+        self.community_sizes = None
+
+    def node(self, params):
+        return self.lcd.parse_node(params[self.key])
+
+    def get_community_sizes(self):
+        # Built on first use; the resident partition does not change
+        if self.community_sizes is None:
+            communities = np.asarray(self.lcd.communities, dtype=np.int64)
+            self.community_sizes = np.bincount(communities[self.lcd.graph.get_nodes()], minlength=len(communities))
+        return self.community_sizes
+
+    def network_stats(self, params):
+        index = self.lcd.node_index(self.node(params))
+        return {
+            'direct_connections': len(self.lcd.graph.get_neighbors(index)),
+            'component_size': self.lcd.get_component_size(index),
+            'total_network_size': len(self.lcd.graph.get_nodes()),
+        }
+
+    def community_stats(self, params):
+        info = self.lcd.get_node_info(self.node(params))
+        sizes = self.get_community_sizes()
+        return {
+            'community': info.community,
+            'total_communities': int(np.count_nonzero(sizes)),
+            'user_community_size': sizes[info.community],
+            'connected_communities': len(info.connected_communities),
+            'directly_connected_nodes': len(info.directly_connected_nodes),
+        }
+
+    def node_info(self, params):
+        info = self.lcd.get_node_info(self.node(params), int(params.get("radius", 1)))
+        return {
+            'community': info.community,
+            'connected_communities': info.connected_communities,
+            'directly_connected_nodes': info.directly_connected_nodes,
+            'k_hop_nodes': info.k_hop_nodes,
+            'component_size': info.component_size,
+        }
+
+    def potential_impact(self, params):
+        # Share of the network within two hops, as in messapi
+        index = self.lcd.node_index(self.node(params))
+        return {'potential_impact': (len(self.lcd.get_k_hop_neighbors(index, 2)) + 1) / len(self.lcd.graph.get_nodes())}
+
+    def analyze_message_impact(self, params, rng):
+        return self.lcd.simulate_message_impact(self.node(params), params.get("message", ""),
+                                                int(params.get("num_trials", 1000)), rng)
+
+    def record_message_impact(self, params, impact):
+        impact['has_flagged_messages'] = self.lcd.record_message_impact(self.node(params), params.get("message", ""), impact)
+        return impact
+
+
+class AnalyzerQueries:
+    # The service endpoints over a MisinformationAnalyzer. Every username gets
+    # its own simulated network; consecutive queries for one user reuse it.
+    key = "username"
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.streams = analyzer.streams
+
+    def select(self, params):
+        username = str(params[self.key])
+        if self.analyzer.current_user != username:
+            self.analyzer.generate_simulated_network(username)
+        return username
+
+    def network_stats(self, params):
+        return self.analyzer.get_network_stats(self.select(params))
+
+    def community_stats(self, params):
+        return self.analyzer.get_community_stats(self.select(params))
+
+    def node_info(self, params):
+        username = self.select(params)
+        return {**self.analyzer.get_network_stats(username), **self.analyzer.get_community_stats(username)}
+
+    def potential_impact(self, params):
+        username = self.select(params)
+        return {'potential_impact': self.analyzer.calculate_potential_impact(username)}
+
+    def analyze_message_impact(self, params, rng):
+        username = self.select(params)
+        return self.analyzer.simulate_message_impact(username, params.get("message", ""), rng)
+
+    def record_message_impact(self, params, impact):
+        self.analyzer.record_message_impact(str(params[self.key]), params.get("message", ""), impact)
+        return impact
+
+
+def init_worker(queries=None):
+    # Ctrl-C reaches the whole process group; only the server handles it and
+    # then shuts the pool down
+    global service_queries
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if queries is not None:
+        service_queries = queries
+
+
+def run_query(queries, name, params, key):
+    # Propagation draws from a stream keyed by the request itself, so the
+    # same request gets the same answer from any worker
+    if name == "analyze_message_impact":
+        return queries.analyze_message_impact(params, queries.streams.stream(QUERY_STREAM, key))
+    return getattr(queries, name)(params)
+
+
+def record_query(queries, name, params, result):
+    # Runs in the server process, so every request's message lands in the one
+    # log that lookups read, whichever worker simulated it
+    if name == "analyze_message_impact":
+        return queries.record_message_impact(params, result)
+    return result
+
+
+def run_offloaded(name, params, key):
+    return run_query(service_queries, name, params, key)
+
+
+class QueryService:
+    # Local HTTP/JSON service over one resident analyzer. Lookups run on the
+    # event loop; propagation (analyze_message_impact) runs in a process pool
+    # whose workers only read the analyzer, and its message is then logged on
+    # the event loop.
+    # Requests with the same endpoint and parameters that arrive while one is
+    # still running share its result instead of running again.
+    offloaded = frozenset({"analyze_message_impact"})
+
+    def __init__(self, queries, workers=None):
+        global service_queries
+        self.queries = queries
+        self.in_flight = {}
+        self.stats = {'requests': 0, 'executed': 0, 'coalesced': 0, 'started': time.time()}
+        self.pool = None
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers > 0:
+            service_queries = queries
+            if 'fork' in get_all_start_methods():
+                self.pool = ProcessPoolExecutor(workers, mp_context=get_context('fork'), initializer=init_worker)
+            else:
+                self.pool = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(queries,))
+            # Start the workers now, before the event loop runs any threads
+            self.pool.submit(int).result()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    async def query(self, name, params):
+        if name not in ENDPOINTS:
+            raise LookupError(f"unknown endpoint {name!r}; expected one of {', '.join(ENDPOINTS)}")
+        self.stats['requests'] += 1
+        key = name + json.dumps(params, sort_keys=True, default=str)
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            self.stats['executed'] += 1
+            if self.pool is not None and name in self.offloaded:
+                result = await asyncio.get_running_loop().run_in_executor(self.pool, run_offloaded, name, params, key)
+            else:
+                result = run_query(self.queries, name, params, key)
+            result = record_query(self.queries, name, params, result)
+        except Exception as error:
+            future.set_exception(error)
+            # Mark it retrieved for when no other request was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.in_flight[key]
+
+    async def handle(self, method, target, body):
+        # Returns (status, payload). GET reads parameters from the query string,
+        # POST from a JSON object body.
+        url = urlsplit(target)
+        name = url.path.strip('/')
+        if name in ("", "stats"):
+            return 200, {**self.stats, 'uptime': time.time() - self.stats['started'],
+                         'in_flight': len(self.in_flight), 'endpoints': ENDPOINTS}
+        if name not in ENDPOINTS:
+            return 404, {'error': f"unknown endpoint {name!r}", 'endpoints': ENDPOINTS}
+        if method == "GET":
+            params = dict(parse_qsl(url.query))
+        elif method == "POST":
+            try:
+                params = json.loads(body or b"{}")
+            except ValueError as error:
+                return 400, {'error': f"invalid JSON body: {error}"}
+            if not isinstance(params, dict):
+                return 400, {'error': "JSON body must be an object"}
+        else:
+            return 405, {'error': f"method {method} not allowed"}
+        try:
+            return 200, await self.query(name, params)
+        except Exception as error:
+            return 400, {'error': f"{type(error).__name__}: {error}"}
+
+    async def serve_connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive: one request at a time per connection
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split(maxsplit=2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    field, _, value = line.decode('latin-1').partition(':')
+                    headers[field.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {'error': "request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = headers.get('connection', '').lower() != 'close' and version.strip() == "HTTP/1.1"
+                status, payload = await self.handle(method.upper(), target, body)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=to_json).encode('utf-8')
+        writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                      f"Content-Type: application/json\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=8080):
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+
+def serve(queries, host="127.0.0.1", port=8080, workers=None, log=None):
+    # Blocks until interrupted
+    service = QueryService(queries, workers)
+
+    async def run():
+        server = await service.start(host, port)
+        address = server.sockets[0].getsockname()
+        if log is not None:
+            print(f"Serving {', '.join(ENDPOINTS)} on http://{address[0]}:{address[1]}/", file=log, flush=True)
+        # SIGTERM stops the service as cleanly as Ctrl-C does
+        stop = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        except NotImplementedError:
+            pass
+        async with server:
+            await stop.wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
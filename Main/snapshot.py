@@ -0,0 +1,74 @@
+import json
+import os
+import uuid
+import weakref
+import numpy as np
+from edgeloader import source_signature
+
+SNAPSHOT_VERSION = 6
+
+# Arrays handed out by load_snapshot, by snapshot directory; a directory is
+# not saved over while any of them is alive
+mapped_arrays = {}
+
+
+def array_file(path, name, generation):
+    return os.path.join(path, f"{name}.{generation}.npy")
+
+
+def is_mapped(path):
+    references = mapped_arrays.get(os.path.realpath(path), [])
+    return any(reference() is not None for reference in references)
+
+
+def save_snapshot(path, arrays, meta, source_file=None):
+    # A snapshot is a directory of .npy arrays plus manifest.json. Every save
+    # writes its arrays under new file names (a fresh generation) and then
+    # swaps the manifest in atomically, so readers only ever see a complete
+    # old or a complete new snapshot. Files of older generations are removed
+    # once the new manifest is in place.
+    if is_mapped(path):
+        raise ValueError(f"snapshot {path} is memory-mapped by this process; save to another directory")
+    os.makedirs(path, exist_ok=True)
+    generation = uuid.uuid4().hex[:12]
+    for name, array in arrays.items():
+        np.save(array_file(path, name, generation), np.asarray(array))
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "generation": generation,
+        "source_file": os.path.abspath(source_file) if source_file else None,
+        "source": source_signature(source_file) if source_file else None,
+        "arrays": sorted(arrays),
+        "meta": meta,
+    }
+    temporary = os.path.join(path, f"manifest.{generation}.tmp")
+    with open(temporary, 'w') as file:
+        json.dump(manifest, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, os.path.join(path, "manifest.json"))
+
+    current = {os.path.basename(array_file(path, name, generation)) for name in arrays}
+    for entry in os.listdir(path):
+        if (entry.endswith(".npy") or entry.endswith(".tmp")) and entry not in current:
+            os.remove(os.path.join(path, entry))
+
+
+def load_snapshot(path, source_file=None):
+    # Arrays come back memory-mapped. Raises ValueError when the snapshot was
+    # written by another version or its source edge list has changed since.
+    with open(os.path.join(path, "manifest.json"), 'r') as file:
+        manifest = json.load(file)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"snapshot {path} has version {manifest.get('version')}, expected {SNAPSHOT_VERSION}")
+
+    if manifest["source"] is not None:
+        source_file = source_file or manifest["source_file"]
+        if not os.path.exists(source_file) or source_signature(source_file) != manifest["source"]:
+            raise ValueError(f"edge list {source_file} has changed since snapshot {path} was taken")
+
+    arrays = {name: np.load(array_file(path, name, manifest["generation"]), mmap_mode='r') for name in manifest["arrays"]}
+    references = [reference for reference in mapped_arrays.get(os.path.realpath(path), []) if reference() is not None]
+    mapped_arrays[os.path.realpath(path)] = references + [weakref.ref(array) for array in arrays.values()]
+    return arrays, manifest["meta"]
@@ -0,0 +1,114 @@
+import numpy as np
+from reach import splitmix64
+
+# Hash row salts for the count-min sketch (any distinct odd constants)
+ROW_SALTS = np.array([0x243F6A8885A308D3, 0x13198A2E03707345, 0xA4093822299F31D1, 0x082EFA98EC4E6C89,
+                      0x452821E638D01377, 0xBE5466CF34E90C6C, 0xC0AC29B7C97C50DD, 0x3F84D5B5B5470917], dtype=np.uint64)
+
+
+class SpreadDetector:
+    # Streaming rapid-spread detector. Share events (message id, time) go into
+    # a ring of count-min sketches, one per time bucket, covering the last
+    # `window` time units. A message's windowed share count is the sketch
+    # estimate, which can only overestimate, and memory is fixed whatever the
+    # number of messages. A message is flagged once its windowed shares reach
+    # rate_threshold * (1 - content_weight * content_score). Suspicious content
+    # (score 1) is flagged at a lower rate; other content needs the full rate.
+    # Events are taken in batches, and all work is vectorized per time bucket.
+    # The detector keeps no per-message state: which messages are already
+    # flagged is the caller's (e.g. the MessageStore state column).
+    def __init__(self, rate_threshold, window=1.0, buckets=16, depth=4, width=1 << 14, content_weight=0.5):
+        if depth > len(ROW_SALTS):
+            raise ValueError(f"depth is at most {len(ROW_SALTS)}")
+        self.rate_threshold = rate_threshold
+        self.window = window
+        self.num_buckets = buckets
+        self.bucket_width = window / buckets
+        self.depth = depth
+        self.width = width
+        self.content_weight = content_weight
+        self.tables = np.zeros((buckets, depth * width), dtype=np.int32)
+        # Sum of the tables currently inside the window
+        self.window_table = np.zeros(depth * width, dtype=np.int64)
+        self.current_bucket = None
+        self.events = 0
+
+    def cells(self, messages):
+        # Flat cell of every message in each sketch row, shape (depth, n)
+        keys = messages.astype(np.uint64)
+        rows = [splitmix64(keys ^ salt) & np.uint64(self.width - 1) for salt in ROW_SALTS[:self.depth]]
+        return (np.stack(rows).astype(np.int64) + (np.arange(self.depth) * self.width)[:, None])
+
+    def advance(self, bucket):
+        # Moves the window so it ends at `bucket`, dropping buckets that fall out
+        if self.current_bucket is None or bucket - self.current_bucket >= self.num_buckets:
+            self.tables[:] = 0
+            self.window_table[:] = 0
+        else:
+            for expired in range(self.current_bucket + 1, bucket + 1):
+                slot = expired % self.num_buckets
+                self.window_table -= self.tables[slot]
+                self.tables[slot] = 0
+        self.current_bucket = bucket
+
+    def estimate(self, messages):
+        # Windowed share count estimate for each message
+        messages = np.asarray(messages, dtype=np.int64)
+        return self.window_table[self.cells(messages)].min(axis=0)
+
+    def ingest(self, messages, times, content_scores=None, is_flagged=None):
+        # messages[i] was shared at times[i] (times in non-decreasing order
+        # within and across batches; events older than the window are
+        # ignored). content_scores[i] in [0, 1] scores that event's message.
+        # is_flagged(ids) gives a boolean mask of messages flagged before this
+        # batch, which are not reported again. Returns the messages newly
+        # flagged by this batch and the time of the share that crossed the
+        # threshold.
+        messages = np.asarray(messages, dtype=np.int64)
+        times = np.asarray(times, dtype=np.float64)
+        scores = np.zeros(len(messages)) if content_scores is None else np.asarray(content_scores, dtype=np.float64)
+        self.events += len(messages)
+        if not len(messages):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        buckets = np.floor(times / self.bucket_width).astype(np.int64)
+        cells = self.cells(messages)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)]
+        flagged, flag_times = [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            bucket = int(buckets[start])
+            if self.current_bucket is not None and bucket <= self.current_bucket - self.num_buckets:
+                continue
+            if self.current_bucket is None or bucket > self.current_bucket:
+                self.advance(bucket)
+            # Each message seen in this bucket once, with its highest score;
+            # order keeps a message's events in time order
+            segment = messages[start:end]
+            order = np.argsort(segment, kind='stable')
+            group_starts = np.flatnonzero(np.r_[True, segment[order][1:] != segment[order][:-1]])
+            sizes = np.diff(np.r_[group_starts, len(order)])
+            candidates = order[group_starts]
+            candidate_cells = cells[:, start:end][:, candidates]
+            before = self.window_table[candidate_cells].min(axis=0)
+
+            added = np.bincount(cells[:, start:end].reshape(-1), minlength=self.depth * self.width)
+            self.tables[bucket % self.num_buckets] += added.astype(np.int32)
+            self.window_table += added
+
+            counts = self.window_table[candidate_cells].min(axis=0)
+            thresholds = self.rate_threshold * (1 - self.content_weight * np.maximum.reduceat(scores[start:end][order], group_starts))
+            crossed = counts >= thresholds
+            if is_flagged is not None:
+                crossed &= ~np.asarray(is_flagged(segment[candidates]), dtype=bool)
+            crossed &= ~np.isin(segment[candidates], np.concatenate(flagged))
+            # The estimate reached the threshold at the message's k-th share
+            # in this bucket (the last one if colliding messages pushed it over)
+            needed = np.clip(np.ceil(thresholds - before), 1, sizes).astype(np.int64)
+            events = order[group_starts + needed - 1][crossed]
+            flagged.append(segment[events])
+            flag_times.append(times[start:end][events])
+        return np.concatenate(flagged), np.concatenate(flag_times)
+
+    def memory_usage(self):
+        return self.tables.nbytes + self.window_table.nbytes
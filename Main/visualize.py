@@ -0,0 +1,183 @@
+import hashlib
+import os
+import numpy as np
+import networkx as nx
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from cascade import expand_frontier
+
+LAYOUT_CACHE_DIR = ".layout_cache"
+# Communities beyond this many (smallest first) are left out of the super-graph
+MAX_COMMUNITIES = 500
+MAX_NEIGHBORHOOD_NODES = 300
+
+
+def array_hash(*arrays):
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(array.dtype.str.encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class LayoutCache:
+    # Node positions saved as .npz files, keyed by graph version, partition
+    # hash and the view's parameters, so a report re-renders without a re-layout
+    def __init__(self, directory=LAYOUT_CACHE_DIR):
+        self.directory = directory
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        try:
+            with np.load(self.path(key)) as data:
+                return data['nodes'], data['positions']
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def put(self, key, nodes, positions):
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = self.path(key) + ".tmp.npz"
+        np.savez(temporary, nodes=nodes, positions=positions)
+        os.replace(temporary, self.path(key))
+
+
+def spring_positions(nodes, sources, targets, weights=None, seed=42):
+    # Fixed seed, so the same view always gets the same picture
+    graph = nx.Graph()
+    graph.add_nodes_from(nodes.tolist())
+    weights = np.ones(len(sources)) if weights is None else weights
+    graph.add_weighted_edges_from(zip(sources.tolist(), targets.tolist(), weights.tolist()))
+    layout = nx.spring_layout(graph, seed=seed)
+    return np.array([layout[node] for node in nodes.tolist()]).reshape(len(nodes), 2)
+
+
+def community_supergraph(indptr, indices, communities, max_communities=MAX_COMMUNITIES):
+    # One node per community with its membership; edges between communities
+    # weighted by how many graph edges join them. Only the largest
+    # max_communities are kept.
+    communities = np.asarray(communities, dtype=np.int64)
+    n = len(indptr) - 1
+    sizes = np.bincount(communities[:n])
+    labels = np.flatnonzero(sizes)
+    labels = labels[np.argsort(sizes[labels], kind='stable')[::-1][:max_communities]]
+
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    a, b = communities[rows], communities[indices]
+    kept = np.zeros(len(sizes), dtype=bool)
+    kept[labels] = True
+    mask = kept[a] & kept[b] & (a < b)
+    keys = np.sort(a[mask] * len(sizes) + b[mask])
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    weights = np.diff(np.r_[starts, len(keys)]).astype(np.float64)
+    unique_keys = keys[starts]
+    return labels, sizes[labels], unique_keys // len(sizes), unique_keys % len(sizes), weights
+
+
+def sample_neighborhood(indptr, indices, node, radius=2, max_nodes=MAX_NEIGHBORHOOD_NODES, rng=None):
+    # The node, then its direct neighbours, then farther hops, each ring
+    # sampled down to what is left of max_nodes. Only sampled nodes are
+    # expanded, so every drawn node hangs off the drawn part. Returns the chosen
+    # nodes (sorted) and the edges among them.
+    if rng is None:
+        rng = np.random.default_rng(0)
+    chosen = np.array([node], dtype=np.int64)
+    visited = chosen
+    frontier = chosen
+    for _ in range(radius):
+        room = max_nodes - len(chosen)
+        if room <= 0 or not len(frontier):
+            break
+        positions, _ = expand_frontier(indptr, indices, frontier)
+        ring = np.setdiff1d(indices[positions], visited)
+        visited = np.union1d(visited, ring)
+        if len(ring) > room:
+            ring = np.sort(rng.choice(ring, room, replace=False))
+        chosen = np.union1d(chosen, ring)
+        frontier = ring
+
+    positions, counts = expand_frontier(indptr, indices, chosen)
+    sources = np.repeat(chosen, counts)
+    targets = indices[positions]
+    inside = np.isin(targets, chosen) & (sources != targets)
+    return chosen, sources[inside], targets[inside]
+
+
+def save_figure(figure, filename):
+    FigureCanvasAgg(figure)
+    figure.savefig(filename, dpi=100)
+
+
+def render_communities(filename, indptr, indices, communities, highlight=None, title="",
+                       cache=None, max_communities=MAX_COMMUNITIES, graph_key=None):
+    # Community super-graph: marker area follows membership, edge width the
+    # number of edges between two communities. Cost depends on the number of
+    # communities drawn, not on the graph size (past one pass to aggregate).
+    # graph_key names the graph version for the layout cache; without one the
+    # CSR arrays are hashed.
+    if cache is None:
+        cache = LayoutCache()
+    if graph_key is None:
+        graph_key = array_hash(indptr, indices)
+    labels, sizes, sources, targets, weights = community_supergraph(indptr, indices, communities, max_communities)
+    key = f"communities-{graph_key}-{array_hash(communities)}-{max_communities}"
+    cached = cache.get(key)
+    if cached is not None and np.array_equal(cached[0], labels):
+        positions = cached[1]
+    else:
+        positions = spring_positions(labels, sources, targets, weights)
+        cache.put(key, labels, positions)
+
+    where = {label: i for i, label in enumerate(labels.tolist())}
+    figure = Figure(figsize=(12, 8))
+    axes = figure.add_subplot()
+    if len(sources):
+        segments = [(positions[where[a]], positions[where[b]]) for a, b in zip(sources.tolist(), targets.tolist())]
+        widths = 0.5 + 3 * weights / weights.max()
+        axes.add_collection(LineCollection(segments, linewidths=widths, colors='gray', alpha=0.4, zorder=1))
+    area = 2000 * sizes / sizes.max() if len(sizes) else sizes
+    axes.scatter(positions[:, 0], positions[:, 1], s=area, c=np.arange(len(labels)), cmap='Set3',
+                 edgecolors='black', linewidths=0.5, zorder=2)
+    if highlight is not None and highlight in where:
+        point = positions[where[highlight]]
+        axes.scatter([point[0]], [point[1]], s=area[where[highlight]], facecolors='none',
+                     edgecolors='red', linewidths=2.5, zorder=3)
+    axes.set_title(title)
+    axes.axis('off')
+    save_figure(figure, filename)
+
+
+def render_neighborhood(filename, indptr, indices, node, radius=2, labels=None, title="",
+                        cache=None, max_nodes=MAX_NEIGHBORHOOD_NODES, graph_key=None):
+    # Sampled neighbourhood of one node; labels (node index -> name) are drawn
+    # only when the view is small enough to read them
+    if cache is None:
+        cache = LayoutCache()
+    if graph_key is None:
+        graph_key = array_hash(indptr, indices)
+    nodes, sources, targets = sample_neighborhood(indptr, indices, node, radius, max_nodes)
+    key = f"neighborhood-{graph_key}-{node}-{radius}-{max_nodes}"
+    cached = cache.get(key)
+    if cached is not None and np.array_equal(cached[0], nodes):
+        positions = cached[1]
+    else:
+        positions = spring_positions(nodes, sources, targets)
+        cache.put(key, nodes, positions)
+
+    where = np.searchsorted(nodes, sources), np.searchsorted(nodes, targets)
+    figure = Figure(figsize=(12, 8))
+    axes = figure.add_subplot()
+    axes.add_collection(LineCollection(np.stack([positions[where[0]], positions[where[1]]], axis=1),
+                                       colors='gray', linewidths=0.5, alpha=0.5, zorder=1))
+    axes.scatter(positions[:, 0], positions[:, 1], s=60, c='lightblue', edgecolors='black', linewidths=0.3, zorder=2)
+    center = np.searchsorted(nodes, node)
+    axes.scatter([positions[center, 0]], [positions[center, 1]], s=200, c='red', zorder=3)
+    if labels is not None and len(nodes) <= 60:
+        for i, index in enumerate(nodes.tolist()):
+            axes.annotate(str(labels[index]), positions[i], fontsize=8, ha='center', va='bottom')
+    axes.set_title(title)
+    axes.axis('off')
+    save_figure(figure, filename)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules in Main/ import each other flat, as the scripts there run
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Main"))
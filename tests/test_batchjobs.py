@@ -0,0 +1,38 @@
+import json
+import pytest
+from batchjobs import read_jobs, run_batch
+
+
+def handler(state, job, index):
+    if job["node"] == "bad":
+        raise ValueError("bad node")
+    return {"double": 2 * int(job["node"]), "index": index}
+
+
+def record(state, job, index, result):
+    state.append(job["node"])
+    result["logged_before"] = len(state) - 1
+    return result
+
+
+def test_read_jobs_formats():
+    lines = ['# comment\n', '\n', '5\thello world\n', '{"node": 6}\n', '7\n']
+    assert list(read_jobs(lines, "node")) == [
+        {"node": "5", "message": "hello world"}, {"node": 6, "message": ""}, {"node": "7", "message": ""}]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_results_and_records_follow_input_order(tmp_path, workers):
+    jobs = tmp_path / "jobs.tsv"
+    jobs.write_text("".join(f"{node}\tm\n" for node in ["1", "2", "bad", "4", "5"] * 10))
+    output = tmp_path / "out.jsonl"
+    state = []
+    run_batch(state, handler, record, str(jobs), str(output), "node", workers, chunksize=2)
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row["node"] for row in rows] == ["1", "2", "bad", "4", "5"] * 10
+    assert rows[2]["error"] == "ValueError: bad node"
+    good = [row for row in rows if "error" not in row]
+    assert [row["logged_before"] for row in good] == list(range(40))
+    assert all(row["double"] == 2 * int(row["node"]) for row in good)
+    # The parent's state saw every recorded job, in input order
+    assert state == [row["node"] for row in good]
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from cascade import expand_frontier, simulate_cascades
+from csrgraph import CSRGraph, connected_components
+
+
+def path_graph(n):
+    nodes = np.arange(n - 1)
+    return CSRGraph.from_edges(nodes, nodes + 1)
+
+
+def test_expand_frontier_gathers_edge_positions():
+    graph = path_graph(5)
+    positions, counts = expand_frontier(graph.indptr, graph.indices, np.array([0, 2, 4]))
+    assert counts.tolist() == [1, 2, 1]
+    expected = list(range(graph.indptr[0], graph.indptr[1])) + list(range(graph.indptr[2], graph.indptr[3])) \
+        + list(range(graph.indptr[4], graph.indptr[5]))
+    assert positions.tolist() == expected
+
+
+def test_certain_and_impossible_spread():
+    rng = np.random.default_rng(0)
+    edges = rng.integers(0, 200, (300, 2))
+    graph = CSRGraph.from_edges(edges[:, 0], edges[:, 1], 200)
+    labels, sizes = connected_components(graph)
+    source = int(edges[0, 0])
+    everyone = simulate_cascades(graph, source, 1.0, num_trials=20, rng=rng)
+    assert np.all(everyone.reach == sizes[labels[source]])
+    nobody = simulate_cascades(graph, source, 0.0, num_trials=20, rng=rng)
+    assert np.all(nobody.reach == 1)
+    assert nobody.infection_probability[source] == 1.0
+
+
+def test_path_reach_distribution():
+    # From one end of a path, reach is 1 + a geometric number of hops
+    graph = path_graph(50)
+    p = 0.5
+    result = simulate_cascades(graph, 0, p, num_trials=20000, rng=np.random.default_rng(1))
+    expected = sum(p ** k for k in range(50))
+    assert result.mean() == pytest.approx(expected, rel=0.03)
+    assert result.infection_probability[1] == pytest.approx(p, abs=0.02)
+
+
+def test_batches_do_not_change_the_distribution():
+    graph = path_graph(30)
+    one = simulate_cascades(graph, [0, 29], 0.6, num_trials=5000, rng=np.random.default_rng(2), batch_size=5000)
+    many = simulate_cascades(graph, [0, 29], 0.6, num_trials=5000, rng=np.random.default_rng(3), batch_size=7)
+    assert one.mean() == pytest.approx(many.mean(), rel=0.05)
+    assert np.all(many.reach >= 2)
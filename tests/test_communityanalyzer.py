@@ -0,0 +1,54 @@
+import networkx as nx
+import pytest
+from communityanalyzer import CommunityAnalyzer
+
+
+def analyzer(tmp_path, seed=5, extra_edges=()):
+    graph = nx.karate_club_graph()
+    source = tmp_path / "karate.txt"
+    # Sparse ids, so ids and dense indices differ
+    source.write_text("".join(f"{10 * u + 1} {10 * v + 1}\n" for u, v in list(graph.edges()) + list(extra_edges)))
+    lcd = CommunityAnalyzer(seed=seed)
+    lcd.load_graph(str(source))
+    lcd.detect_communities()
+    return lcd
+
+
+def test_containment_accepts_sets(tmp_path):
+    lcd = analyzer(tmp_path)
+    as_list = lcd.simulate_containment(blocked_nodes=[1, 331], blocked_edges=[(1, 21)], sources=[11], num_trials=200)
+    as_set = lcd.simulate_containment(blocked_nodes={1, 331}, blocked_edges={(1, 21)}, sources=[11], num_trials=200)
+    assert as_set['contained_reach'] == pytest.approx(as_list['contained_reach'])
+    assert as_set['reach_reduction'] > 0
+
+
+def test_node_info_covers_the_whole_component(tmp_path):
+    # Karate plus a separate path 500 - 501 - 502 (ids 5001, 5011, 5021)
+    lcd = analyzer(tmp_path, extra_edges=[(500, 501), (501, 502)])
+    info = lcd.get_node_info(11)
+    karate = [10 * node + 1 for node in range(34)]
+    assert info.connected_communities == {lcd.communities[lcd.node_index(node)] for node in karate}
+    assert info.component_size == 34
+    assert sorted(info.directly_connected_nodes) == sorted(info.k_hop_nodes.tolist())
+    assert len(lcd.get_node_info(11, radius=2).k_hop_nodes) > len(info.k_hop_nodes)
+    path = lcd.get_node_info(5011)
+    assert path.component_size == 3 and len(path.connected_communities) == 1
+
+
+def test_query_caches_follow_graph_changes(tmp_path):
+    lcd = analyzer(tmp_path, extra_edges=[(500, 501), (501, 502)])
+    lcd.k_hop_cache_size = 2
+    start = lcd.node_index(5001)
+    for node in (11, 21, 5001):
+        lcd.get_node_info(node)
+    # Least recently used first; the first query was evicted
+    assert list(lcd.k_hop_cache) == [(lcd.node_index(21), 1), (start, 1)]
+    assert lcd.get_k_hop_neighbors(start).tolist() == [lcd.node_index(5011)]
+
+    # An edge added to the dict graph joins the two components
+    lcd.graph.add_edge(start, lcd.node_index(11))
+    info = lcd.get_node_info(5001)
+    assert info.component_size == 37
+    assert sorted(info.directly_connected_nodes) == [11, 5011]
+    assert info.connected_communities == lcd.get_node_info(11).connected_communities
+    assert len(info.connected_communities) == len(set(lcd.communities))
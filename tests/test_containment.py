@@ -0,0 +1,84 @@
+import networkx as nx
+import numpy as np
+import pytest
+from containment import ContainmentModel, bridge_edges
+from csrgraph import CSRGraph
+
+
+def small_graph():
+    graph = nx.karate_club_graph()
+    edges = np.array(list(graph.edges()), dtype=np.int64)
+    return CSRGraph.from_edges(edges[:, 0], edges[:, 1]), edges
+
+
+def model(probability=0.35, sources=None):
+    graph, edges = small_graph()
+    return ContainmentModel(graph, probability, sources=sources, num_trials=300, key=7), edges
+
+
+def brute_force_gains(model, chosen, candidates, block):
+    # Reach reduction of every remaining candidate on top of the earlier picks
+    before = model.evaluate(**block(chosen))[1].mean()
+    return {candidate: before - model.evaluate(**block(chosen + [candidate]))[1].mean()
+            for candidate in candidates if candidate not in chosen}
+
+
+@pytest.mark.parametrize("sources", [None, [0]])
+def test_greedy_node_picks_match_brute_force(sources):
+    containment, _ = model(sources=sources)
+    # Blocking a fixed source would stop everything in one pick
+    candidates = list(range(1 if sources else 0, 34))
+    picks = containment.rank_blockers(4, nodes=candidates, max_evaluations=len(candidates))
+    assert len(picks) == 4
+    chosen = []
+    for candidate, reduction, reach_after in picks:
+        gains = brute_force_gains(containment, chosen, candidates, lambda nodes: {"nodes": nodes})
+        # Picks are positions in the candidate list
+        node = candidates[candidate]
+        assert reduction == pytest.approx(max(gains.values()))
+        assert gains[node] == pytest.approx(reduction)
+        chosen.append(node)
+        assert reach_after == pytest.approx(containment.evaluate(nodes=chosen)[1].mean())
+
+
+def test_greedy_edge_picks_match_brute_force():
+    containment, edges = model(probability=0.5, sources=[0])
+    picks = containment.rank_blockers(3, edges=edges, max_evaluations=len(edges))
+    chosen = []
+    for candidate, reduction, reach_after in picks:
+        gains = brute_force_gains(containment, chosen, range(len(edges)), lambda picked: {"edges": edges[picked]})
+        assert reduction == pytest.approx(max(gains.values()))
+        chosen.append(candidate)
+        assert reach_after == pytest.approx(containment.evaluate(edges=edges[chosen])[1].mean())
+
+
+def test_reach_never_increases_trial_by_trial():
+    containment, edges = model(probability=0.45)
+    reach, _, _ = containment.run()
+    picks = containment.rank_blockers(5, nodes=np.arange(34))
+    for i in range(1, len(picks) + 1):
+        contained, _, _ = containment.run(blocked_nodes=containment.node_mask([c for c, _, _ in picks[:i]]))
+        assert np.all(contained <= reach)
+        reach = contained
+
+    reach, _, _ = containment.run()
+    for i in range(1, len(edges) + 1, 13):
+        contained, _, _ = containment.run(blocked_edges=containment.edge_mask(*edges[:i].T))
+        assert np.all(contained <= reach)
+        reach = contained
+
+
+def test_bridge_edges_cross_communities():
+    graph, edges = small_graph()
+    communities = np.array([0] * 17 + [1] * 17)
+    sources, targets = bridge_edges(graph, communities)
+    expected = {(min(u, v), max(u, v)) for u, v in edges.tolist() if communities[u] != communities[v]}
+    assert set(zip(sources.tolist(), targets.tolist())) == expected
+
+
+def test_needs_exactly_one_candidate_kind():
+    containment, edges = model()
+    with pytest.raises(ValueError):
+        containment.rank_blockers(1)
+    with pytest.raises(ValueError):
+        containment.rank_blockers(1, nodes=[0], edges=edges)
@@ -0,0 +1,82 @@
+import networkx as nx
+import numpy as np
+from csrgraph import CSRGraph, connected_components, k_hop_neighborhood
+from messdynmic import Graph
+
+
+def random_edges(num_nodes=300, num_edges=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, num_nodes, (num_edges, 2))
+
+
+def test_from_edges_matches_dict_graph():
+    edges = np.concatenate([random_edges(), [[5, 5], [7, 8], [7, 8]]])
+    dict_graph = Graph()
+    for from_node, to_node in edges.tolist():
+        dict_graph.add_edge(from_node, to_node)
+    csr = CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+    assert csr.get_total_edges() == dict_graph.get_total_edges()
+    assert sorted(csr.get_nodes().tolist()) == sorted(dict_graph.get_nodes())
+    for node in dict_graph.get_nodes():
+        assert sorted(csr.get_neighbors(node).tolist()) == sorted(dict_graph.get_neighbors(node))
+        assert csr.get_degree(node) == dict_graph.get_degree(node)
+
+
+def test_from_graph_round_trips():
+    edges = np.concatenate([random_edges(seed=1), [[3, 3]]])
+    dict_graph = Graph()
+    for from_node, to_node in edges.tolist():
+        dict_graph.add_edge(from_node, to_node)
+    direct = CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+    converted = CSRGraph.from_graph(dict_graph, direct.num_nodes)
+    assert np.array_equal(converted.indptr, direct.indptr)
+    for node in range(direct.num_nodes):
+        assert sorted(converted.get_neighbors(node).tolist()) == sorted(direct.get_neighbors(node).tolist())
+
+
+def test_connected_components_match_networkx():
+    edges = random_edges(num_edges=250, seed=2)
+    csr = CSRGraph.from_edges(edges[:, 0], edges[:, 1], 300)
+    labels, sizes = connected_components(csr)
+    graph = nx.Graph()
+    graph.add_nodes_from(range(300))
+    graph.add_edges_from(edges.tolist())
+    for component in nx.connected_components(graph):
+        members = np.array(sorted(component))
+        assert len(set(labels[members].tolist())) == 1
+        assert sizes[labels[members[0]]] == len(members)
+    assert len(set(labels.tolist())) == nx.number_connected_components(graph)
+
+
+def test_k_hop_neighborhood_matches_ego_graph():
+    edges = random_edges(seed=3)
+    csr = CSRGraph.from_edges(edges[:, 0], edges[:, 1], 300)
+    graph = nx.Graph()
+    graph.add_nodes_from(range(300))
+    graph.add_edges_from(edges.tolist())
+    for node in range(0, 300, 37):
+        for radius in (1, 2, 3):
+            expected = set(nx.ego_graph(graph, node, radius).nodes()) - {node}
+            assert set(k_hop_neighborhood(csr, node, radius).tolist()) == expected
+
+
+def test_patched_matches_rebuild():
+    edges = np.concatenate([random_edges(num_nodes=50, num_edges=120, seed=4), [[6, 6], [7, 8], [7, 8]]])
+    csr = CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+    deletions = [[6, 6], [7, 8], edges[0].tolist()]
+    insertions = [[7, 8], [3, 55], [55, 55], [60, 2]]
+    patched = csr.patched(insertions, deletions, 62)
+
+    remaining = edges.tolist()
+    for edge in deletions:
+        remaining.remove(edge if edge in remaining else edge[::-1])
+    expected = np.array(remaining + insertions)
+    rebuilt = CSRGraph.from_edges(expected[:, 0], expected[:, 1], 62)
+    assert patched.get_total_edges() == rebuilt.get_total_edges()
+    assert np.array_equal(patched.indptr, rebuilt.indptr)
+    assert np.array_equal(patched.degree, rebuilt.degree)
+    assert np.array_equal(patched.get_nodes(), rebuilt.get_nodes())
+    for node in range(62):
+        assert sorted(patched.get_neighbors(node).tolist()) == sorted(rebuilt.get_neighbors(node).tolist())
+    # The original is left as it was
+    assert csr.get_total_edges() == len(edges)
@@ -0,0 +1,74 @@
+import os
+import numpy as np
+from edgeloader import count_nodes, index_cache_paths, load_edge_list, load_indexed_edges, read_edge_list
+
+
+def write(path, text, mtime_ns=None):
+    path.write_text(text)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def test_comments_and_chunk_boundaries(tmp_path):
+    path = write(tmp_path / "g.txt", "# header\n# Nodes: 4\n0\t1\n1 2\n  # indented comment\n2\t3\n3 0")
+    for chunk_size in (3, 7, 1 << 20):
+        edges = read_edge_list(path, chunk_size)
+        assert edges.tolist() == [[0, 1], [1, 2], [2, 3], [3, 0]]
+        assert edges.dtype == np.int32
+    assert count_nodes(read_edge_list(path)) == 4
+
+
+def test_large_ids_stay_64_bit(tmp_path):
+    path = write(tmp_path / "g.txt", f"{2 ** 40} 5\n5 {2 ** 62}\n")
+    edges = read_edge_list(path)
+    assert edges.dtype == np.int64 and edges[1, 1] == 2 ** 62
+
+
+def test_non_numeric_token_does_not_depend_on_chunking(tmp_path):
+    # One username among integer ids makes every id a string, but an integer
+    # id reads the same whichever chunk it is in
+    path = write(tmp_path / "g.txt", "1 2\n007 3\n+5 6\n7 bob\n8 9\n5 1\n")
+    expected = [["1", "2"], ["7", "3"], ["5", "6"], ["7", "bob"], ["8", "9"], ["5", "1"]]
+    for chunk_size in (4, 8, 12, 1 << 20):
+        assert read_edge_list(path, chunk_size).tolist() == expected
+    edges, node_ids = load_indexed_edges(path, use_cache=False, chunk_size=8)
+    assert len(node_ids) == 9
+    assert node_ids.to_index("7") == edges[1, 0] == edges[3, 0]
+
+
+def test_indexed_edges_round_trip_sparse_and_string_ids(tmp_path):
+    rng = np.random.default_rng(1)
+    ids = rng.choice(2 ** 60, 50, replace=False)
+    pairs = ids[rng.integers(0, 50, (300, 2))]
+    path = write(tmp_path / "sparse.txt", "".join(f"{u}\t{v}\n" for u, v in pairs.tolist()))
+    edges, node_ids = load_indexed_edges(path)
+    assert np.array_equal(node_ids.to_ids(edges), pairs)
+
+    names = np.array([f"user_{i}" for i in range(20)])
+    named = names[rng.integers(0, 20, (100, 2))]
+    path = write(tmp_path / "names.txt", "".join(f"{u} {v}\n" for u, v in named.tolist()))
+    edges, node_ids = load_indexed_edges(path)
+    assert np.array_equal(node_ids.to_ids(edges), named)
+    cached_edges, cached_ids = load_indexed_edges(path)
+    assert isinstance(cached_edges, np.memmap)
+    assert np.array_equal(cached_ids.to_ids(cached_edges), named)
+
+
+def test_cache_is_invalidated_by_size_or_mtime(tmp_path):
+    path = write(tmp_path / "g.txt", "10 20\n20 30\n", mtime_ns=10 ** 18)
+    edges, node_ids = load_indexed_edges(path)
+    assert os.path.exists(index_cache_paths(path)[0])
+    assert node_ids.to_ids(edges).tolist() == [[10, 20], [20, 30]]
+
+    # Same size, new mtime
+    write(tmp_path / "g.txt", "10 20\n20 40\n", mtime_ns=10 ** 18 + 1)
+    edges, node_ids = load_indexed_edges(path)
+    assert node_ids.to_ids(edges).tolist() == [[10, 20], [20, 40]]
+    assert load_edge_list(path).tolist() == [[10, 20], [20, 40]]
+
+    # New size, same mtime
+    write(tmp_path / "g.txt", "10 20\n20 400\n", mtime_ns=10 ** 18 + 1)
+    edges, node_ids = load_indexed_edges(path)
+    assert node_ids.to_ids(edges).tolist() == [[10, 20], [20, 400]]
+    assert load_edge_list(path).tolist() == [[10, 20], [20, 400]]
@@ -0,0 +1,21 @@
+import numpy as np
+from egonet import generate_ego_networks
+
+
+def test_ego_networks_are_simple_and_cover_the_egos():
+    networks = generate_ego_networks(20, np.random.default_rng(0), pool_size=500)
+    assert networks.num_nodes == 520
+    keys = networks.sources * networks.num_nodes + networks.targets
+    assert np.all(np.diff(keys) > 0)
+    assert not np.any(networks.sources == networks.targets)
+    # Every ego has followers and followings, drawn from the pool after the egos
+    assert np.all(networks.followers_count[:20] > 0) and np.all(networks.following_count[:20] > 0)
+    reach_index = networks.reach_index()
+    assert reach_index.num_nodes == 520 and len(reach_index.indices) == len(keys)
+
+
+def test_no_egos_give_an_empty_graph():
+    networks = generate_ego_networks(0, np.random.default_rng(0))
+    assert networks.num_nodes == 0 and len(networks.sources) == 0
+    reach_index = networks.reach_index()
+    assert reach_index.num_nodes == 0 and reach_index.indptr.tolist() == [0]
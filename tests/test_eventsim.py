@@ -0,0 +1,69 @@
+import networkx as nx
+import numpy as np
+import pytest
+from csrgraph import CSRGraph
+from eventsim import EventSimulator, CREATED, SHARED, VIRAL
+
+
+def path_simulator():
+    # 0 - 1 - 2 - 3 - 4, every edge shares after exactly one time unit
+    graph = CSRGraph.from_edges([0, 1, 2, 3], [1, 2, 3, 4])
+    return EventSimulator(graph.indptr, graph.indices, 1.0, shared_threshold=1, viral_threshold=2)
+
+
+def test_states_advance_in_order():
+    trace = path_simulator().run([0, 4], start_times=[0.0, 10.0], rng=np.random.default_rng(0))
+    assert trace.share_count.tolist() == [4, 4]
+    assert trace.state.tolist() == [VIRAL, VIRAL]
+    for message, start in enumerate([0.0, 10.0]):
+        hits = trace.transition_message == message
+        assert trace.transition_state[hits].tolist() == [CREATED, SHARED, VIRAL]
+        assert (trace.transition_time[hits] - start).tolist() == [0.0, 2.0, 3.0]
+    assert trace.time_to_viral().tolist() == [3.0, 3.0]
+
+
+def test_unreached_state_is_nan():
+    trace = path_simulator().run([0], horizon=2.5, rng=np.random.default_rng(0))
+    assert trace.state.tolist() == [SHARED]
+    assert np.isnan(trace.time_to_viral()).all()
+
+
+def test_shares_per_window():
+    trace = path_simulator().run([0, 4], start_times=[0.0, 10.0], rng=np.random.default_rng(0))
+    # Shares at 1, 2, 3, 4 and 11, 12, 13, 14
+    assert trace.shares_per_window(2).tolist() == [1, 2, 1, 0, 0, 1, 2, 1]
+    assert trace.shares_per_window(5, message=1).tolist() == [0, 0, 4]
+    assert trace.peak_shares_per_window(1).tolist() == [2, 2]
+    assert trace.peak_shares_per_window(2.5).tolist() == [3, 3]
+
+
+def brute_force_peaks(trace, window):
+    peaks = []
+    for message in range(trace.num_messages):
+        times = trace.share_time[trace.share_message == message]
+        peaks.append(max((np.sum((times >= t - window) & (times <= t)) for t in times), default=0))
+    return peaks
+
+
+def karate_run(seed):
+    edges = np.array(nx.karate_club_graph().edges())
+    graph = CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+    simulator = EventSimulator.from_graph(graph, 0.3, rng=np.random.default_rng(seed), shared_threshold=3,
+                                          viral_threshold=10)
+    return simulator.run([0, 33, 5, 0], start_times=[0.0, 0.5, 1.0, 4.0], rng=np.random.default_rng(seed + 1))
+
+
+def test_seeded_runs_are_reproducible():
+    first, second = karate_run(3), karate_run(3)
+    for name in first.__slots__:
+        assert np.array_equal(getattr(first, name), getattr(second, name))
+    assert not np.array_equal(first.share_time, karate_run(4).share_time)
+
+    # Per message, states only move forward and times never go back
+    for message in range(first.num_messages):
+        hits = first.transition_message == message
+        assert np.all(np.diff(first.transition_state[hits]) > 0)
+        assert np.all(np.diff(first.transition_time[hits]) >= 0)
+    assert first.peak_shares_per_window(1.5).tolist() == brute_force_peaks(first, 1.5)
+    assert first.shares_per_window(1.0).sum() == first.share_count.sum()
+    assert first.time_to_state(CREATED) == pytest.approx(np.zeros(4))
@@ -0,0 +1,36 @@
+from itertools import combinations
+import numpy as np
+import pytest
+from cascade import simulate_cascades
+from csrgraph import CSRGraph
+from influence import find_superspreaders, sample_rr_sets, select_seeds
+
+
+def star_and_path():
+    # Star around 0 with leaves 1-5, and a separate path 6 - 7 - 8
+    return CSRGraph.from_edges([0, 0, 0, 0, 0, 6, 7], [1, 2, 3, 4, 5, 7, 8])
+
+
+def brute_force_best(graph, k, probability):
+    reach = {}
+    for seeds in combinations(range(graph.num_nodes), k):
+        result = simulate_cascades(graph, list(seeds), probability, num_trials=2000, rng=np.random.default_rng(0))
+        reach[seeds] = result.reach.mean()
+    return max(reach, key=reach.get)
+
+
+@pytest.mark.parametrize("k", [1, 2])
+def test_greedy_coverage_finds_the_best_seeds(k):
+    graph = star_and_path()
+    rr_sets = sample_rr_sets(graph, 0.5, 20000, rng=np.random.default_rng(1))
+    seeds, covered = select_seeds(rr_sets, k)
+    assert sorted(seeds) == sorted(brute_force_best(graph, k, 0.5))
+    assert 0 < covered <= 1
+
+
+def test_reported_reach_matches_simulation():
+    graph = star_and_path()
+    probability = np.random.default_rng(2).uniform(0.2, 0.8, len(graph.indices))
+    seeds, reach = find_superspreaders(graph, 2, probability, num_samples=20000, rng=np.random.default_rng(3))
+    simulated = simulate_cascades(graph, seeds, probability, num_trials=20000, rng=np.random.default_rng(4))
+    assert reach == pytest.approx(simulated.reach.mean(), rel=0.05)
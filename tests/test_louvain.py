@@ -0,0 +1,150 @@
+import networkx as nx
+import numpy as np
+import pytest
+from csrgraph import CSRGraph
+from dynamic import DynamicLouvain
+from louvain import Louvain, ModularityTracker, ParallelLouvain
+from messdynmic import Graph
+
+
+def nx_modularity(graph, community):
+    # karate_club_graph carries interaction weights; the CSR graphs are unweighted
+    groups = {}
+    for node in graph.nodes():
+        groups.setdefault(int(community[node]), set()).add(node)
+    return nx.community.modularity(graph, list(groups.values()), weight=None)
+
+
+def karate_edges():
+    graph = nx.karate_club_graph()
+    return graph, np.array(list(graph.edges()), dtype=np.int64)
+
+
+def multigraph_edges():
+    # Karate with every fifth edge doubled and two self-loops
+    graph, edges = karate_edges()
+    edges = np.concatenate([edges, edges[::5], [[0, 0], [33, 33]]])
+    multigraph = nx.MultiGraph()
+    multigraph.add_edges_from(edges.tolist())
+    return multigraph, edges
+
+
+def planted_partition_edges(groups=8, size=200, p_in=0.05, p_out=0.002, seed=3):
+    graph = nx.planted_partition_graph(groups, size, p_in, p_out, seed=seed)
+    return graph, np.array(list(graph.edges()), dtype=np.int64)
+
+
+@pytest.mark.parametrize("make_edges", [karate_edges, multigraph_edges])
+def test_louvain_modularity_matches_networkx(make_edges):
+    graph, edges = make_edges()
+    csr = CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+    louvain = Louvain.from_graph(csr)
+    louvain.run()
+    assert louvain.modularity == pytest.approx(nx_modularity(graph, louvain.communities), abs=1e-9)
+    assert louvain.modularity > 0.35
+
+
+def test_louvain_levels_increase_modularity():
+    _, edges = karate_edges()
+    louvain = Louvain.from_graph(CSRGraph.from_edges(edges[:, 0], edges[:, 1]))
+    louvain.run()
+    assert np.all(np.diff(louvain.modularities) > 0)
+    for sweeps in louvain.sweep_modularities:
+        assert np.all(np.diff(sweeps) >= -1e-12)
+
+
+@pytest.mark.parametrize("make_edges", [karate_edges, multigraph_edges])
+def test_tracker_from_arrays_matches_networkx(make_edges):
+    graph, edges = make_edges()
+    csr = CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+    community = np.random.default_rng(0).integers(0, 4, csr.num_nodes)
+    tracker = ModularityTracker.from_arrays(csr.indptr, csr.indices, None, community)
+    assert tracker.modularity == pytest.approx(nx_modularity(graph, community), abs=1e-12)
+
+
+@pytest.mark.parametrize("make_edges", [karate_edges, multigraph_edges])
+def test_tracker_from_graph_matches_networkx(make_edges):
+    graph, edges = make_edges()
+    dict_graph = Graph()
+    for from_node, to_node in edges.tolist():
+        dict_graph.add_edge(from_node, to_node)
+    community = np.random.default_rng(1).integers(0, 4, 34).tolist()
+    tracker = ModularityTracker.from_graph(dict_graph, community)
+    assert tracker.modularity == pytest.approx(nx_modularity(graph, community), abs=1e-12)
+
+
+def test_tracker_moves_match_recomputation():
+    graph, edges = multigraph_edges()
+    csr = CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+    rng = np.random.default_rng(2)
+    community = rng.integers(0, 4, csr.num_nodes)
+    tracker = ModularityTracker.from_arrays(csr.indptr, csr.indices, None, community)
+    for node in rng.integers(0, csr.num_nodes, 50).tolist():
+        target = int(rng.integers(0, 4))
+        neighbors = csr.get_neighbors(node)
+        self_loop = float(np.count_nonzero(neighbors == node))
+        others = neighbors[neighbors != node]
+        from_links = float(np.count_nonzero(community[others] == community[node]))
+        to_links = float(np.count_nonzero(community[others] == target))
+        tracker.move(csr.get_degree(node), community[node], target, from_links, to_links, self_loop)
+        community[node] = target
+        assert tracker.modularity == pytest.approx(nx_modularity(graph, community), abs=1e-9)
+
+
+def test_dynamic_louvain_tracks_edge_changes():
+    graph, edges = karate_edges()
+    dict_graph = Graph()
+    for from_node, to_node in edges.tolist():
+        dict_graph.add_edge(from_node, to_node)
+    louvain = Louvain.from_graph(CSRGraph.from_edges(edges[:, 0], edges[:, 1]))
+    louvain.run()
+    dynamic = DynamicLouvain(dict_graph, louvain.communities.tolist())
+
+    insertions = [(0, 33), (5, 30), (34, 0), (34, 1)]
+    deletions = [tuple(edge) for edge in edges[:3].tolist()]
+    dynamic.apply(insertions, deletions)
+    graph.remove_edges_from(deletions)
+    graph.add_edges_from(insertions)
+    assert dynamic.modularity == pytest.approx(nx_modularity(graph, dynamic.communities), abs=1e-9)
+
+
+def test_parallel_modularity_close_to_serial():
+    graph, edges = planted_partition_edges()
+    csr = CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+    serial = Louvain.from_graph(csr)
+    serial.run()
+    # min_parallel_nodes=0 sends even this small graph through the workers
+    parallel = ParallelLouvain.from_graph(csr, workers=2, min_parallel_nodes=0)
+    parallel.run()
+    assert parallel.modularity == pytest.approx(nx_modularity(graph, parallel.communities), abs=1e-9)
+    assert parallel.modularity == pytest.approx(serial.modularity, abs=0.02)
+
+
+def test_parallel_rounds_never_lower_modularity(monkeypatch):
+    # Karate with one round per sweep has stale-snapshot moves that cut
+    # modularity; they are reverted and the level finishes serially
+    graph, edges = karate_edges()
+    csr = CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+    parallel = ParallelLouvain.from_graph(csr, workers=3, rounds_per_sweep=1, min_parallel_nodes=0)
+    fallbacks = []
+    finish_serially = parallel.finish_serially
+    monkeypatch.setattr(parallel, "finish_serially", lambda *args: fallbacks.append(1) or finish_serially(*args))
+    parallel.run()
+    assert fallbacks
+    for sweeps in parallel.sweep_modularities:
+        assert all(later >= earlier for earlier, later in zip(sweeps, sweeps[1:]))
+    assert all(later > earlier for earlier, later in zip(parallel.modularities, parallel.modularities[1:]))
+    assert parallel.modularity == pytest.approx(nx_modularity(graph, parallel.communities), abs=1e-9)
+
+
+def test_parallel_starts_no_workers_for_small_graphs(monkeypatch):
+    graph, edges = karate_edges()
+    csr = CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("worker pool started")
+
+    monkeypatch.setattr("louvain.Pool", no_pool)
+    parallel = ParallelLouvain.from_graph(csr, workers=2)
+    parallel.run()
+    assert parallel.modularity == pytest.approx(nx_modularity(graph, parallel.communities), abs=1e-9)
@@ -0,0 +1,58 @@
+import pytest
+import messagebatch
+from messagebatch import MessageScorer, content_key, keyword_score, sentiment_score, MISINFO_PATTERN
+
+STOP_WORDS = {'the', 'is'}
+KEYWORDS = {'fake', 'hoax', 'scam'}
+MESSAGES = [
+    "the moon landing is a hoax",
+    "lovely weather today",
+    "the moon landing is a hoax",
+    "this is a fake scam",
+    "",
+    "lovely weather today",
+    "great news for everyone",
+]
+
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer(monkeypatch):
+    # The punkt models may not be installed; forked workers inherit the patch
+    monkeypatch.setattr(messagebatch, "word_tokenize", str.split)
+
+
+def test_batch_matches_single_message_scores():
+    scorer = MessageScorer(STOP_WORDS, KEYWORDS, workers=2, chunk_size=3)
+    results = list(scorer.score(MESSAGES))
+    assert results == [
+        {
+            'misinformation_score': keyword_score(message, STOP_WORDS, KEYWORDS),
+            'sentiment': sentiment_score(message),
+            'is_misinformation': bool(MISINFO_PATTERN.search(message)),
+        }
+        for message in MESSAGES
+    ]
+
+
+def test_reposts_are_served_from_the_memo():
+    scorer = MessageScorer(STOP_WORDS, KEYWORDS, workers=2, chunk_size=4)
+    list(scorer.score(MESSAGES))
+    assert set(scorer.cache) == {content_key(message) for message in MESSAGES}
+
+    # A memoized text is never sent to the workers again
+    scorer.cache[content_key("lovely weather today")] = {'misinformation_score': -1.0}
+    results = list(scorer.score(["lovely weather today", "the moon landing is a hoax"]))
+    assert results[0] == {'misinformation_score': -1.0}
+    assert results[1]['misinformation_score'] == pytest.approx(1 / 4)
+    # Callers get copies, so they cannot change the memo
+    results[0]['misinformation_score'] = 2.0
+    assert scorer.cache[content_key("lovely weather today")] == {'misinformation_score': -1.0}
+
+
+def test_memo_evicts_least_recently_used():
+    scorer = MessageScorer(STOP_WORDS, KEYWORDS, workers=1, cache_size=2)
+    list(scorer.score(["a", "b"]))
+    # Hitting "a" makes "b" the oldest entry, so "c" evicts it
+    list(scorer.score(["a"]))
+    list(scorer.score(["c"]))
+    assert list(scorer.cache) == [content_key("a"), content_key("c")]
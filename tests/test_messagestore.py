@@ -0,0 +1,62 @@
+import numpy as np
+from messagestore import Message, MessageStore
+
+
+def test_states_advance_and_never_go_back():
+    store = MessageStore(shared_threshold=2, viral_threshold=5)
+    message = store.add("hello", "alice")
+    assert message.get_state() == Message.State.CREATED
+    message.increment_share_count(3)
+    assert message.get_state() == Message.State.SHARED
+    message.increment_share_count(3)
+    assert message.get_state() == Message.State.VIRAL
+    message.set_share_count(0)
+    assert message.get_state() == Message.State.VIRAL
+    message.flag_as_misinformation()
+    message.increment_share_count(10)
+    assert message.get_state() == Message.State.FLAGGED
+
+
+def test_per_source_counts_and_index():
+    store = MessageStore()
+    ids = store.add_many(["a", "b", "a", "c"], ["alice", "bob", "alice", "carol"])
+    store.add("d", "bob")
+    assert store.count_from("alice") == 2
+    assert store.count_from("nobody") == 0
+    assert store.from_source("bob").tolist() == [1, 4]
+    assert not store.has_flagged("alice")
+    assert store.flag([ids[0], ids[0], ids[2]]) == 2
+    assert store.flag([ids[0]]) == 0
+    assert store.has_flagged("alice") and not store.has_flagged("bob")
+    assert store[2].get_content() == "a" and store[-1].get_source_node() == "bob"
+
+
+def test_add_shares_accumulates_repeats():
+    store = MessageStore(shared_threshold=1, viral_threshold=3)
+    ids = store.add_many(["x", "y"], [1, 2])
+    store.add_shares(np.array([ids[0], ids[0], ids[1]]), np.array([2, 2, 1]))
+    assert store.share_count[:2].tolist() == [4, 1]
+    assert store.state[:2].tolist() == [Message.State.VIRAL, Message.State.CREATED]
+
+
+def test_grows_past_initial_capacity():
+    store = MessageStore(capacity=2)
+    for i in range(100):
+        store.add(f"m{i % 3}", i % 7)
+    assert len(store) == 100 and len(store.contents) == 3
+    assert store.count_from(3) == len(range(3, 100, 7))
+    assert [message.get_id() for message in store][-1] == 99
+
+
+def test_snapshot_round_trip():
+    store = MessageStore(shared_threshold=1, viral_threshold=3)
+    ids = store.add_many(["x", "y", "x"], ["alice", "bob", "bob"])
+    store.add_shares(ids, [5, 2, 0])
+    store.flag([ids[1]])
+    restored = MessageStore.from_snapshot(store.arrays(), store.meta(), 1, 3)
+    for name, column in store.arrays().items():
+        assert np.array_equal(restored.arrays()[name], column)
+    assert restored.has_flagged("bob") and not restored.has_flagged("alice")
+    assert restored.from_source("bob").tolist() == [1, 2]
+    restored.add("z", "alice")
+    assert restored.count_from("alice") == 2
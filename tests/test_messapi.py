@@ -0,0 +1,55 @@
+import networkx as nx
+import pytest
+import messapi
+from messapi import CommunityIndex, MisinformationAnalyzer
+
+
+def small_network():
+    graph = nx.DiGraph()
+    graph.add_edges_from([("ann", "bob"), ("bob", "ann"), ("bob", "cat"), ("cat", "dan"), ("dan", "eve")])
+    communities = {"ann": 0, "bob": 0, "cat": 1, "dan": 1, "eve": 2}
+    return graph, communities
+
+
+def test_community_index_add_edge_matches_rebuild():
+    graph, communities = small_network()
+    index = CommunityIndex(graph, dict(communities))
+    for from_node, to_node in [("eve", "ann"), ("ann", "eve"), ("fay", "bob"), ("gus", "fay"), ("cat", "cat")]:
+        index.add_edge(graph, from_node, to_node)
+        graph.add_edge(from_node, to_node)
+
+    # New users got fresh, distinct communities
+    assert index.communities["fay"] == 3 and index.communities["gus"] == 4
+    assert index.next_community == 5
+    rebuilt = CommunityIndex(graph, index.communities)
+    for node in graph.nodes():
+        assert index.get_stats(node) == rebuilt.get_stats(node)
+        assert +index.neighbor_communities[node] == +rebuilt.neighbor_communities[node]
+    assert index.get_stats("bob") == {
+        'total_communities': 5,
+        'user_community_size': 2,
+        'connected_communities': 3,
+        'directly_connected_nodes': 3,
+    }
+
+
+class OfflineStopwords:
+    # The NLTK corpus may not be installed
+    @staticmethod
+    def words(language):
+        return ['the']
+
+
+def test_ego_mode_network_stats(monkeypatch):
+    monkeypatch.setattr(messapi, "stopwords", OfflineStopwords)
+    analyzer = MisinformationAnalyzer(seed=1)
+    networks = analyzer.generate_ego_networks(5, pool_size=200, seed=3)
+    stats = analyzer.get_network_stats(2)
+    assert stats['followers'] == networks.followers_count[2]
+    assert stats['following'] == networks.following_count[2]
+    assert stats['total_network_size'] == 205
+    for username in ("alice", "2", 205, -1):
+        with pytest.raises(KeyError):
+            analyzer.get_network_stats(username)
+    with pytest.raises(ValueError):
+        analyzer.add_edge(0, 1)
@@ -0,0 +1,74 @@
+import networkx as nx
+import numpy as np
+import pytest
+from csrgraph import CSRGraph
+from probabilities import edge_probabilities
+import messdynmic
+from messdynmic import LouvainCommunityDetection
+
+
+def analyzer(tmp_path, seed=5):
+    graph = nx.karate_club_graph()
+    source = tmp_path / "karate.txt"
+    # Sparse ids, so ids and dense indices differ
+    source.write_text("".join(f"{10 * u + 1} {10 * v + 1}\n" for u, v in graph.edges()))
+    lcd = LouvainCommunityDetection(graph_size=graph.number_of_nodes(), seed=seed)
+    lcd.load_graph(str(source))
+    lcd.detect_communities()
+    return lcd
+
+
+def test_edge_updates_with_node_attributes(tmp_path):
+    lcd = analyzer(tmp_path)
+    attributes = tmp_path / "attributes.txt"
+    attributes.write_text("".join(f"{10 * node + 1} {5 + node} {40 - node}\n" for node in range(34)))
+    lcd.load_node_attributes(str(attributes))
+    before = lcd.get_share_probabilities()
+    csr = lcd.get_csr_graph()
+    assert len(before) == len(csr.indices)
+
+    # New users 999 and 1001 among the inserted edges
+    lcd.apply_edge_updates(insertions=[(1, 999), (999, 1001), (331, 11)], deletions=[(1, 21)])
+    assert len(lcd.node_ids) == 36
+    assert lcd.influence[-2:].tolist() == [1.0, 1.0] and lcd.susceptibility[-2:].tolist() == [1.0, 1.0]
+
+    patched = lcd.get_csr_graph()
+    rebuilt = CSRGraph.from_graph(lcd.graph, len(lcd.node_ids))
+    assert patched is not csr and np.array_equal(patched.indptr, rebuilt.indptr)
+    probabilities = lcd.get_share_probabilities()
+    assert probabilities == pytest.approx(edge_probabilities(patched.indptr, patched.indices, lcd.share_probability,
+                                                            lcd.influence, lcd.susceptibility))
+    assert lcd.estimate_message_reach(1001, num_trials=50).mean() >= 1
+    assert lcd.get_node_info(999).component_size == 36
+
+
+def run_main(monkeypatch, capsys, *args):
+    monkeypatch.setattr("sys.argv", ["messdynmic.py", *args])
+    messdynmic.main()
+    return capsys.readouterr().err
+
+
+def test_snapshot_keeps_node_attributes_and_checks_base_parameters(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "karate.txt"
+    source.write_text("".join(f"{u} {v}\n" for u, v in nx.karate_club_graph().edges()))
+    attributes = tmp_path / "attributes.txt"
+    attributes.write_text("".join(f"{node} {5 + node} {40 - node}\n" for node in range(34)))
+    jobs = tmp_path / "jobs.tsv"
+    jobs.write_text("3\tfake news\n")
+    snapshot = str(tmp_path / "state")
+    args = ["--graph-file", str(source), "--node-attributes", str(attributes), "--snapshot", snapshot,
+            "--batch", str(jobs), "--output", str(tmp_path / "out.jsonl"), "--seed", "1"]
+
+    run_main(monkeypatch, capsys, *args)
+    lcd = LouvainCommunityDetection.from_snapshot(snapshot, str(source))
+    assert lcd.influence is not None and lcd.graph_size == 34
+    assert lcd.share_probability == pytest.approx(0.3 / np.log10(35))
+    assert lcd.graph_version is not None
+    # Unmaps the arrays, so the runs below may save over the snapshot
+    del lcd
+
+    assert "Ignoring snapshot" not in run_main(monkeypatch, capsys, *args)
+    assert "different base_share_probability" in run_main(monkeypatch, capsys, *args, "--base-share-prob", "0.5")
+    without_attributes = args[:2] + args[4:]
+    assert "different base_share_probability, node_attributes" in run_main(monkeypatch, capsys, *without_attributes)
+    assert "Ignoring snapshot" not in run_main(monkeypatch, capsys, *without_attributes)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from nodeids import NodeIdMap
+
+
+def test_sparse_64_bit_ids_round_trip():
+    rng = np.random.default_rng(0)
+    ids = rng.choice(2 ** 62, 500, replace=False).astype(np.int64)
+    edges = ids[rng.integers(0, 500, (2000, 2))]
+    node_ids, indexed = NodeIdMap.from_edges(edges)
+    assert len(node_ids) == len(np.unique(edges))
+    assert indexed.max() < len(node_ids) and indexed.dtype == np.int32
+    assert np.array_equal(node_ids.to_ids(indexed), edges)
+    assert node_ids.to_index(int(edges[5, 1])) == indexed[5, 1]
+    assert not node_ids.is_identity
+
+
+def test_string_ids_round_trip():
+    node_ids = NodeIdMap.from_ids(["carol", "alice", "bob"])
+    assert node_ids.to_index(["alice", "carol"]).tolist() == [1, 0]
+    assert node_ids.to_id(2) == "bob"
+    assert node_ids.lookup("dave") == -1
+    assert 7 not in node_ids
+    assert node_ids.parse(" 12 ".strip()) == "12"
+    restored = NodeIdMap.from_arrays(node_ids.arrays())
+    assert restored.to_index("bob") == 2
+
+
+def test_unknown_ids_raise():
+    node_ids = NodeIdMap.from_ids([10, 20, 30])
+    with pytest.raises(KeyError, match="25"):
+        node_ids.to_index([10, 25])
+    with pytest.raises(ValueError):
+        NodeIdMap.from_ids([1, 2, 1])
+
+
+def test_identity_and_extend():
+    node_ids = NodeIdMap.identity(4)
+    assert node_ids.is_identity and node_ids.parse("3") == 3
+    assert node_ids.extend([2, 9, 7, 9]).tolist() == [2, 4, 5, 4]
+    assert node_ids.to_ids([4, 5]).tolist() == [9, 7]
+    assert node_ids.to_index(3) == 3 and not node_ids.is_identity
+
+
+def test_extend_matches_a_map_built_from_scratch():
+    rng = np.random.default_rng(1)
+    node_ids = NodeIdMap.from_ids(rng.choice(10 ** 6, 50, replace=False))
+    for _ in range(5):
+        batch = rng.choice(10 ** 6, (20, 2))
+        indices = node_ids.extend(batch)
+        assert np.array_equal(node_ids.to_ids(indices), batch)
+        rebuilt = NodeIdMap.from_ids(node_ids.ids)
+        assert np.array_equal(node_ids.sorted_ids, rebuilt.sorted_ids)
+        assert np.array_equal(node_ids.order, rebuilt.order)
+
+
+def test_extend_keeps_sorted_maps_unordered_and_widens_strings():
+    node_ids = NodeIdMap.identity(3)
+    assert node_ids.extend([[3, 4], [5, 2]]).tolist() == [[3, 4], [5, 2]]
+    assert node_ids.order is None and node_ids.to_index(5) == 5
+
+    names = NodeIdMap.from_ids(["bob", "al"])
+    assert names.extend(["christopher", "al", "aaron"]).tolist() == [2, 1, 3]
+    assert names.to_index(["aaron", "christopher", "bob"]).tolist() == [3, 2, 0]
@@ -0,0 +1,75 @@
+import networkx as nx
+import numpy as np
+import pytest
+from csrgraph import CSRGraph
+from nodeids import NodeIdMap
+from probabilities import edge_probabilities, read_node_attributes, transpose_probabilities
+
+
+def karate_csr():
+    edges = np.array(nx.karate_club_graph().edges())
+    return CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+
+
+def test_edge_probabilities_keep_the_base_mean():
+    graph = karate_csr()
+    rng = np.random.default_rng(0)
+    influence, susceptibility = rng.uniform(1, 3, 34), rng.uniform(1, 3, 34)
+    probabilities = edge_probabilities(graph.indptr, graph.indices, 0.2, influence, susceptibility)
+    assert len(probabilities) == len(graph.indices)
+    assert probabilities.mean() == pytest.approx(0.2)
+    # Entry j belongs to the edge row(j) -> indices[j]
+    rows = np.repeat(np.arange(34), np.diff(graph.indptr))
+    ratio = probabilities / (influence[rows] * susceptibility[graph.indices])
+    assert ratio == pytest.approx(np.full(len(ratio), ratio[0]))
+
+    # Uniform factors leave every edge at the base probability
+    flat = edge_probabilities(graph.indptr, graph.indices, 0.2, np.full(34, 5.0), np.ones(34))
+    assert flat == pytest.approx(np.full(len(flat), 0.2))
+
+
+def test_edge_probabilities_are_clipped():
+    graph = karate_csr()
+    influence = np.ones(34)
+    influence[0] = 1000.0
+    probabilities = edge_probabilities(graph.indptr, graph.indices, 0.9, influence, np.ones(34))
+    assert probabilities.max() == 1.0 and probabilities.min() >= 0.0
+    assert np.all(probabilities[graph.indptr[0]:graph.indptr[1]] == 1.0)
+    empty = edge_probabilities(np.zeros(3, dtype=np.int64), np.zeros(0, dtype=np.int64), 0.5, np.ones(2), np.ones(2))
+    assert len(empty) == 0
+
+
+def test_transpose_matches_reverse_lookup():
+    graph = karate_csr()
+    probabilities = np.random.default_rng(1).random(len(graph.indices))
+    transposed = transpose_probabilities(graph.indptr, graph.indices, probabilities)
+    forward = {}
+    for node in range(graph.num_nodes):
+        for j in range(graph.indptr[node], graph.indptr[node + 1]):
+            forward[node, int(graph.indices[j])] = probabilities[j]
+    for node in range(graph.num_nodes):
+        for j in range(graph.indptr[node], graph.indptr[node + 1]):
+            assert transposed[j] == forward[int(graph.indices[j]), node]
+
+
+def test_missing_nodes_get_the_mean(tmp_path):
+    attributes = tmp_path / "attributes.txt"
+    attributes.write_text("# node followers following\n0 10 4\n2 30 8\n")
+    followers, following = read_node_attributes(str(attributes), num_nodes=4)
+    assert followers.tolist() == [10, 20, 30, 20]
+    assert following.tolist() == [4, 6, 8, 6]
+    # Without num_nodes the array ends at the largest id in the file
+    assert len(read_node_attributes(str(attributes))[0]) == 3
+
+
+def test_unknown_ids_are_ignored(tmp_path):
+    attributes = tmp_path / "attributes.txt"
+    attributes.write_text("20 10 1\n999 50 9\n10 30 3\n")
+    node_ids = NodeIdMap.from_ids([10, 20, 30])
+    followers, following = read_node_attributes(str(attributes), node_ids=node_ids)
+    # Indexed by node_ids; id 30 has no line and gets the mean of all lines
+    assert followers.tolist() == [30, 10, 30]
+    assert following.tolist() == [3, 1, pytest.approx(13 / 3)]
+    # So are ids past num_nodes: none of these fit, so both nodes get the mean
+    followers, _ = read_node_attributes(str(attributes), num_nodes=2)
+    assert followers.tolist() == [30, 30]
@@ -0,0 +1,18 @@
+import numpy as np
+from rngstreams import JOB_STREAM, MESSAGE_STREAM, RandomStreams, stream_key
+
+
+def test_streams_depend_only_on_seed_and_key():
+    first = RandomStreams(7)
+    second = RandomStreams(7)
+    second.stream(JOB_STREAM, 99).random(10)
+    assert np.array_equal(first.stream(MESSAGE_STREAM, 3).random(5), second.stream(MESSAGE_STREAM, 3).random(5))
+    assert not np.array_equal(first.stream(MESSAGE_STREAM, 3).random(5), first.stream(MESSAGE_STREAM, 4).random(5))
+    assert not np.array_equal(first.stream(MESSAGE_STREAM, 3).random(5), first.stream(JOB_STREAM, 3).random(5))
+    assert not np.array_equal(first.stream(MESSAGE_STREAM).random(5), RandomStreams(8).stream(MESSAGE_STREAM).random(5))
+
+
+def test_stream_keys():
+    assert stream_key(12) == 12 and stream_key(np.int64(12)) == 12
+    assert stream_key("alice") == stream_key("alice") != stream_key("bob")
+    assert stream_key(-1) >= 0
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import networkx as nx
+from communityanalyzer import CommunityAnalyzer
+from service import LouvainQueries, QueryService
+
+
+def analyzer(tmp_path):
+    source = tmp_path / "karate.txt"
+    source.write_text("".join(f"{u} {v}\n" for u, v in nx.karate_club_graph().edges()))
+    lcd = CommunityAnalyzer(seed=3)
+    lcd.load_graph(str(source))
+    lcd.detect_communities()
+    return lcd
+
+
+def test_identical_requests_share_one_run(tmp_path):
+    lcd = analyzer(tmp_path)
+    service = QueryService(LouvainQueries(lcd), workers=1)
+    params = {"node": "0", "message": "fake news", "num_trials": 200}
+
+    async def run():
+        # Both are in flight at once: the second waits on the first's future
+        return await asyncio.gather(service.query("analyze_message_impact", params),
+                                    service.query("analyze_message_impact", dict(params)))
+
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        service.close()
+    assert first is second
+    assert service.stats['executed'] == 1 and service.stats['coalesced'] == 1
+    assert not service.in_flight
+    # Logged once, in this process
+    assert len(lcd.messages) == 1 and first['has_flagged_messages']
+
+
+class RecordingWriter:
+    # Stands in for the socket: notes the message log's size when the
+    # response goes out
+    def __init__(self, lcd):
+        self.lcd = lcd
+        self.responses = []
+
+    def write(self, data):
+        self.responses.append((len(self.lcd.messages), data))
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_message_is_logged_before_the_response(tmp_path):
+    lcd = analyzer(tmp_path)
+    service = QueryService(LouvainQueries(lcd), workers=0)
+    writer = RecordingWriter(lcd)
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"GET /analyze_message_impact?node=5&num_trials=50 HTTP/1.1\r\n\r\n"
+                         b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n")
+        reader.feed_eof()
+        await service.serve_connection(reader, writer)
+
+    asyncio.run(run())
+    (logged, response), (_, stats) = writer.responses
+    assert logged == 1 and response.startswith(b"HTTP/1.1 200 OK")
+    payload = json.loads(response.split(b"\r\n\r\n", 1)[1])
+    assert payload['has_flagged_messages'] == lcd.messages.has_flagged(5)
+    assert b"Connection: close" in stats
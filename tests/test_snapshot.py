@@ -0,0 +1,66 @@
+import json
+import os
+import numpy as np
+import pytest
+import snapshot
+from snapshot import load_snapshot, save_snapshot
+
+
+def test_round_trip_with_source_check(tmp_path):
+    source = tmp_path / "edges.txt"
+    source.write_text("0 1\n1 2\n")
+    path = str(tmp_path / "snap")
+    save_snapshot(path, {"a": np.arange(5), "b": np.ones((2, 3))}, {"note": "x"}, str(source))
+    arrays, meta = load_snapshot(path)
+    assert arrays["a"].tolist() == list(range(5)) and arrays["b"].shape == (2, 3)
+    assert meta == {"note": "x"}
+    del arrays
+
+    source.write_text("0 1\n1 2\n2 3\n")
+    with pytest.raises(ValueError, match="has changed"):
+        load_snapshot(path)
+
+
+def test_refuses_to_save_over_mapped_arrays(tmp_path):
+    path = str(tmp_path / "snap")
+    save_snapshot(path, {"a": np.arange(3)}, {})
+    arrays, _ = load_snapshot(path)
+    with pytest.raises(ValueError, match="memory-mapped"):
+        save_snapshot(path, {"a": np.arange(4)}, {})
+    assert arrays["a"].tolist() == [0, 1, 2]
+    del arrays
+    save_snapshot(path, {"a": np.arange(4)}, {})
+    assert load_snapshot(path)[0]["a"].tolist() == [0, 1, 2, 3]
+
+
+def test_interrupted_save_keeps_old_snapshot(tmp_path, monkeypatch):
+    path = str(tmp_path / "snap")
+    save_snapshot(path, {"a": np.arange(3)}, {"generation": 1})
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(snapshot.os, "replace", fail)
+    with pytest.raises(OSError):
+        save_snapshot(path, {"a": np.arange(10)}, {"generation": 2})
+    monkeypatch.undo()
+
+    arrays, meta = load_snapshot(path)
+    assert arrays["a"].tolist() == [0, 1, 2] and meta == {"generation": 1}
+    del arrays
+    save_snapshot(path, {"a": np.arange(4)}, {})
+    with open(os.path.join(path, "manifest.json")) as file:
+        generation = json.load(file)["generation"]
+    assert sorted(os.listdir(path)) == sorted(["manifest.json", f"a.{generation}.npy"])
+
+
+def test_rejects_other_versions(tmp_path):
+    path = str(tmp_path / "snap")
+    save_snapshot(path, {"a": np.arange(3)}, {})
+    manifest_path = os.path.join(path, "manifest.json")
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+    manifest["version"] = -1
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file)
+    with pytest.raises(ValueError, match="version"):
+        load_snapshot(path)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from spreaddetector import SpreadDetector
+
+
+def test_flags_at_the_crossing_share():
+    detector = SpreadDetector(5, window=1.0)
+    messages = np.array([7, 3, 7, 7, 3, 7, 7, 7, 7])
+    times = np.linspace(0.01, 0.09, 9)
+    flagged, flag_times = detector.ingest(messages, times)
+    # Message 7's fifth share is the seventh event
+    assert flagged.tolist() == [7]
+    assert flag_times.tolist() == [pytest.approx(0.07)]
+
+
+def test_already_flagged_messages_are_not_reported_again():
+    detector = SpreadDetector(3, window=1.0)
+    flagged_before = set()
+    is_flagged = lambda ids: np.isin(ids, list(flagged_before))
+    first, _ = detector.ingest([1, 1, 1, 1, 2], [0.1, 0.2, 0.3, 0.4, 0.5], is_flagged=is_flagged)
+    assert first.tolist() == [1]
+    flagged_before.update(first.tolist())
+    second, _ = detector.ingest([1, 2, 2], [0.6, 0.7, 0.8], is_flagged=is_flagged)
+    assert second.tolist() == [2]
+
+
+def test_window_forgets_old_shares():
+    detector = SpreadDetector(4, window=1.0, buckets=4)
+    flagged, _ = detector.ingest([5, 5, 5], [0.0, 0.1, 0.2])
+    assert not len(flagged)
+    # Two windows later the first three shares have expired
+    flagged, _ = detector.ingest([5, 5, 5], [2.0, 2.1, 2.2])
+    assert not len(flagged)
+    assert detector.estimate([5]).tolist() == [3]
+
+
+def test_suspicious_content_needs_a_lower_rate():
+    detector = SpreadDetector(4, window=1.0, content_weight=0.5)
+    messages = np.array([1, 2, 1, 2])
+    flagged, _ = detector.ingest(messages, [0.1, 0.1, 0.2, 0.2], content_scores=np.array([0.0, 1.0, 0.0, 1.0]))
+    assert flagged.tolist() == [2]
+
+
+def test_estimates_never_undercount():
+    rng = np.random.default_rng(0)
+    detector = SpreadDetector(10 ** 9, window=1.0, width=1 << 8)
+    messages = rng.integers(0, 5000, 20000)
+    detector.ingest(messages, np.zeros(len(messages)))
+    true_counts = np.bincount(messages, minlength=5000)
+    assert np.all(detector.estimate(np.arange(5000)) >= true_counts)
@@ -0,0 +1,52 @@
+import os
+import networkx as nx
+import numpy as np
+from csrgraph import CSRGraph
+from messdynmic import LouvainCommunityDetection
+from visualize import LayoutCache, render_communities, render_neighborhood
+
+
+def karate_csr():
+    edges = np.array(nx.karate_club_graph().edges())
+    return CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+
+
+def test_renders_write_files_within_the_caps(tmp_path):
+    graph = karate_csr()
+    cache = LayoutCache(str(tmp_path / "layouts"))
+    communities = np.arange(34) % 5
+    render_communities(str(tmp_path / "communities.png"), graph.indptr, graph.indices, communities, highlight=0,
+                       cache=cache, max_communities=3, graph_key="karate")
+    render_neighborhood(str(tmp_path / "neighborhood.png"), graph.indptr, graph.indices, 0, radius=2,
+                        cache=cache, max_nodes=10, graph_key="karate")
+    assert os.path.getsize(tmp_path / "communities.png") > 0
+    assert os.path.getsize(tmp_path / "neighborhood.png") > 0
+
+    # Cached under the supplied key, one layout per view, with the caps applied
+    keys = sorted(name[:-len(".npz")] for name in os.listdir(cache.directory))
+    assert len(keys) == 2 and all("-karate-" in key for key in keys)
+    community_nodes, _ = cache.get(keys[0])
+    neighborhood_nodes, positions = cache.get(keys[1])
+    assert len(community_nodes) == 3
+    assert len(neighborhood_nodes) == 10 and 0 in neighborhood_nodes and positions.shape == (10, 2)
+
+
+def test_graph_version_follows_edge_updates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = tmp_path / "karate.txt"
+    source.write_text("".join(f"{u} {v}\n" for u, v in nx.karate_club_graph().edges()))
+    lcd = LouvainCommunityDetection(graph_size=34, seed=1)
+    lcd.load_graph(str(source))
+    lcd.detect_communities()
+    loaded = lcd.graph_version
+    lcd.visualize_neighborhood("before.png", 0)
+    lcd.apply_edge_updates(insertions=[(0, 9)])
+    assert lcd.graph_version not in (None, loaded)
+    lcd.visualize_neighborhood("after.png", 0)
+    keys = os.listdir(".layout_cache")
+    assert any(loaded in key for key in keys) and any(lcd.graph_version in key for key in keys)
+
+    # Edits that bypass apply_edge_updates drop the version, so the arrays are hashed
+    lcd.graph.add_edge(1, 20)
+    lcd.get_csr_graph()
+    assert lcd.graph_version is None